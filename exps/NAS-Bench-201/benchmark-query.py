@@ -0,0 +1,46 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The micro-benchmark for the query functions of NASBench201API with different query modes.
+# python exps/NAS-Bench-201/benchmark-query.py --api_path $HOME/.torch/NAS-Bench-201-v1_0-e61699.pth
+############################################################################################
+import os, sys, time, random, argparse
+from pathlib import Path
+lib_dir = (Path(__file__).parent / '..' / '..' / 'lib').resolve()
+if str(lib_dir) not in sys.path: sys.path.insert(0, str(lib_dir))
+from log_utils    import time_string
+from nas_201_api  import NASBench201API as API
+
+
+def benchmark(name, func, indexes):
+  start_time = time.time()
+  for index in indexes: func(index)
+  cost_time = time.time() - start_time
+  print('{:} {:40s} : {:6d} calls in {:7.3f} s, {:8.2f} us per call.'.format(time_string(), name, len(indexes), cost_time, cost_time * 1e6 / len(indexes)))
+  return cost_time
+
+
+def main(api, num):
+  indexes = [random.choice(api.evaluated_indexes) for _ in range(num)]
+  benchmark('__getitem__', lambda i: api[i], indexes)
+  benchmark('arch', lambda i: api.arch(i), indexes)
+  costs = {}
+  for mode in ('copy', 'view', 'cow'):
+    api.set_query_mode(mode)
+    costs[mode] = benchmark('query_meta_info_by_index [{:}]'.format(mode), lambda i: api.query_meta_info_by_index(i), indexes)
+    benchmark('query_by_index(cifar10-valid) [{:}]'.format(mode), lambda i: api.query_by_index(i, 'cifar10-valid'), indexes)
+    benchmark('query_meta_info_by_index+get_metrics [{:}]'.format(mode), lambda i: api.query_meta_info_by_index(i).get_metrics('cifar10-valid', 'x-valid'), indexes)
+  api.set_query_mode('copy')
+  print('speedup over the deep copy : view = {:.1f}x, cow = {:.1f}x'.format(costs['copy'] / costs['view'], costs['copy'] / costs['cow']))
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Benchmark the query of NAS-Bench-201', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument('--api_path', type=str,              help='The path to the NAS-Bench-201 benchmark file or store.')
+  parser.add_argument('--num'     , type=int, default=2000, help='The number of queries.')
+  parser.add_argument('--rand_seed',type=int, default=0,    help='The random seed.')
+  args = parser.parse_args()
+  random.seed(args.rand_seed)
+  print('{:} build NAS-Benchmark-API from {:}'.format(time_string(), args.api_path))
+  api = API(args.api_path, verbose=False)
+  main(api, args.num)
@@ -16,7 +16,7 @@ from procedures   import save_checkpoint, copy_checkpoint
 from procedures   import get_machine_info
 from datasets     import get_datasets
 from log_utils    import Logger, AverageMeter, time_string, convert_secs2time
-from models       import CellStructure, CellArchitectures, get_search_spaces
+from models       import CellStructure, CellStructureSpace, CellArchitectures, get_search_spaces
 from functions    import evaluate_for_seed
 
 
@@ -104,7 +104,6 @@ def main(save_dir, workers, datasets, xpaths, splits, use_less, srange, arch_ind
     sub_dir = Path(save_dir) / '{:06d}-{:06d}-C{:}-N{:}'.format(srange[0], srange[1], arch_config['channel'], arch_config['num_cells'])
   logger  = Logger(str(sub_dir), 0, False)
 
-  all_archs = meta_info['archs']
   assert srange[1] < meta_info['total'], 'invalid range : {:}-{:} vs. {:}'.format(srange[0], srange[1], meta_info['total'])
   assert arch_index == -1 or srange[0] <= arch_index <= srange[1], 'invalid range : {:} vs. {:} vs. {:}'.format(srange[0], arch_index, srange[1])
   if arch_index == -1:
@@ -124,7 +123,7 @@ def main(save_dir, workers, datasets, xpaths, splits, use_less, srange, arch_ind
 
   start_time, epoch_time = time.time(), AverageMeter()
   for i, index in enumerate(to_evaluate_indexes):
-    arch = all_archs[index]
+    arch = get_meta_arch(meta_info, index)
     logger.log('\n{:} evaluate {:06d}/{:06d} ({:06d}/{:06d})-th architecture [seeds={:}] {:}'.format('-'*15, i, len(to_evaluate_indexes), index, meta_info['total'], seeds, '-'*15))
     #logger.log('{:} {:} {:}'.format('-'*15, arch.tostr(), '-'*15))
     logger.log('{:} {:} {:}'.format('-'*15, arch, '-'*15))
@@ -212,20 +211,31 @@ def train_single_model(save_dir, workers, datasets, xpaths, splits, use_less, se
   logger.close()
 
 
-def generate_meta_info(save_dir, max_node, divide=40):
+# return the architecture string of the `index`-th architecture in the meta file,
+# which saves either all strings ('archs') or only the ranks in the search space ('ranks', see generate_meta_info).
+def get_meta_arch(meta_info, index):
+  if 'archs' in meta_info: return meta_info['archs'][index]
+  space = CellStructureSpace(meta_info['op_names'], meta_info['max_node'])
+  return space[ meta_info['ranks'][index] ].tostr()
+
+
+def generate_meta_info(save_dir, max_node, divide=40, save_archs=True):
   aa_nas_bench_ss = get_search_spaces('cell', 'nas-bench-201')
-  archs = CellStructure.gen_all(aa_nas_bench_ss, max_node, False)
-  print ('There are {:} archs vs {:}.'.format(len(archs), len(aa_nas_bench_ss) ** ((max_node-1)*max_node/2)))
+  space = CellStructureSpace(aa_nas_bench_ss, max_node)
+  print ('There are {:} archs vs {:}.'.format(len(space), len(aa_nas_bench_ss) ** ((max_node-1)*max_node/2)))
 
+  # shuffle the ranks instead of the architectures, random.shuffle only depends on the length and thus gives the same order
+  ranks = list(range(len(space)))
   random.seed( 88 ) # please do not change this line for reproducibility
-  random.shuffle( archs )
+  random.shuffle( ranks )
   # to test fixed-random shuffle 
-  #print ('arch [0] : {:}\n---->>>>   {:}'.format( archs[0], archs[0].tostr() ))
-  #print ('arch [9] : {:}\n---->>>>   {:}'.format( archs[9], archs[9].tostr() ))
-  assert archs[0  ].tostr() == '|avg_pool_3x3~0|+|nor_conv_1x1~0|skip_connect~1|+|nor_conv_1x1~0|skip_connect~1|skip_connect~2|', 'please check the 0-th architecture : {:}'.format(archs[0])
-  assert archs[9  ].tostr() == '|avg_pool_3x3~0|+|none~0|none~1|+|skip_connect~0|none~1|nor_conv_3x3~2|', 'please check the 9-th architecture : {:}'.format(archs[9])
-  assert archs[123].tostr() == '|avg_pool_3x3~0|+|avg_pool_3x3~0|nor_conv_1x1~1|+|none~0|avg_pool_3x3~1|nor_conv_3x3~2|', 'please check the 123-th architecture : {:}'.format(archs[123])
-  total_arch = len(archs)
+  #print ('arch [0] : {:}\n---->>>>   {:}'.format( space[ranks[0]], space[ranks[0]].tostr() ))
+  #print ('arch [9] : {:}\n---->>>>   {:}'.format( space[ranks[9]], space[ranks[9]].tostr() ))
+  if max_node == 4:
+    assert space[ranks[0  ]].tostr() == '|avg_pool_3x3~0|+|nor_conv_1x1~0|skip_connect~1|+|nor_conv_1x1~0|skip_connect~1|skip_connect~2|', 'please check the 0-th architecture : {:}'.format(space[ranks[0]])
+    assert space[ranks[9  ]].tostr() == '|avg_pool_3x3~0|+|none~0|none~1|+|skip_connect~0|none~1|nor_conv_3x3~2|', 'please check the 9-th architecture : {:}'.format(space[ranks[9]])
+    assert space[ranks[123]].tostr() == '|avg_pool_3x3~0|+|avg_pool_3x3~0|nor_conv_1x1~1|+|none~0|avg_pool_3x3~1|nor_conv_3x3~2|', 'please check the 123-th architecture : {:}'.format(space[ranks[123]])
+  total_arch = len(space)
   
   num = 50000
   indexes_5W = list(range(num))
@@ -237,10 +247,12 @@ def generate_meta_info(save_dir, max_node, divide=40):
   assert train_split[0] == 0 and train_split[10] == 26 and train_split[111] == 203 and valid_split[0] == 1 and valid_split[10] == 18 and valid_split[111] == 242, '{:} {:} {:} - {:} {:} {:}'.format(train_split[0], train_split[10], train_split[111], valid_split[0], valid_split[10], valid_split[111])
   splits = {num: {'train': train_split, 'valid': valid_split} }
 
-  info = {'archs' : [x.tostr() for x in archs],
+  info = {'ranks' : ranks,
+          'op_names': tuple(aa_nas_bench_ss),
           'total' : total_arch,
           'max_node' : max_node,
           'splits': splits}
+  if save_archs: info['archs'] = [space[rank].tostr() for rank in ranks]
 
   save_dir = Path(save_dir)
   save_dir.mkdir(parents=True, exist_ok=True)
@@ -278,6 +290,7 @@ if __name__ == '__main__':
   parser.add_argument('--mode'   ,     type=str,   required=True,  help='The script mode.')
   parser.add_argument('--save_dir',    type=str,                   help='Folder to save checkpoints and log.')
   parser.add_argument('--max_node',    type=int,                   help='The maximum node in a cell.')
+  parser.add_argument('--meta_archs',  type=int,   default=1, choices=[0,1], help='Save all architecture strings in the meta file or only save their ranks.')
   # use for train the model
   parser.add_argument('--workers',     type=int,   default=8,      help='number of data loading workers (default: 2)')
   parser.add_argument('--srange' ,     type=int,   nargs='+',      help='The range of models to be evaluated')
@@ -294,7 +307,7 @@ if __name__ == '__main__':
   assert args.mode in ['meta', 'new', 'cover'] or args.mode.startswith('specific-'), 'invalid mode : {:}'.format(args.mode)
 
   if args.mode == 'meta':
-    generate_meta_info(args.save_dir, args.max_node)
+    generate_meta_info(args.save_dir, args.max_node, save_archs=args.meta_archs>0)
   elif args.mode.startswith('specific'):
     assert len(args.mode.split('-')) == 2, 'invalid mode : {:}'.format(args.mode)
     model_str = args.mode.split('-')[1]
@@ -0,0 +1,37 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# Start a local query server of NAS-Bench-201 (see lib/nas_201_api/server.py), then the clients connect to it:
+# python exps/NAS-Bench-201/query-server.py --api_path $HOME/.torch/NAS-Bench-201-v1_0-e61699.pth --address /tmp/NAS-Bench-201.sock
+#   from nas_201_api import NASBench201Client
+#   api = NASBench201Client('/tmp/NAS-Bench-201.sock')
+#   info = api.get_more_info(123, 'cifar10-valid', None, True, False)
+############################################################################################
+import os, sys, time, argparse
+from pathlib import Path
+lib_dir = (Path(__file__).parent / '..' / '..' / 'lib').resolve()
+if str(lib_dir) not in sys.path: sys.path.insert(0, str(lib_dir))
+from log_utils    import time_string
+from nas_201_api  import NASBench201API as API, QueryServer
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='The query server of NAS-Bench-201', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument('--api_path' , type=str, help='The path to the NAS-Bench-201 benchmark file, store or shared directory.')
+  parser.add_argument('--address'  , type=str, default='/tmp/NAS-Bench-201.sock', help='The path of the Unix socket or host:port.')
+  parser.add_argument('--query_mode', type=str, default='view', choices=['copy', 'view', 'cow'], help='The query mode of the API.')
+  args = parser.parse_args()
+  assert args.api_path is not None and os.path.exists(args.api_path), 'invalid api path : {:}'.format(args.api_path)
+
+  start_time = time.time()
+  api = API(args.api_path, verbose=False, query_mode=args.query_mode)
+  api.get_tables(False) # create the tables before serving, so that the first batched query is not slow
+  print('{:} create {:} with {:.1f} s.'.format(time_string(), api, time.time()-start_time))
+  server = QueryServer(api, args.address)
+  print('{:} start {:}'.format(time_string(), server))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    print('{:} stop the server.'.format(time_string()))
+  finally:
+    server.shutdown()
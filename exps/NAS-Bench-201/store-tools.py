@@ -0,0 +1,104 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# Convert NAS-Bench-201-v1_0-e61699.pth into the lazy and memory-mapped store (see lib/nas_201_api/store.py)
+# python exps/NAS-Bench-201/store-tools.py --mode convert --api_path $HOME/.torch/NAS-Bench-201-v1_0-e61699.pth --store_dir $HOME/.torch/NAS-Bench-201-v1_0-e61699
+# Append new trials as a delta shard, where delta_path is a file with 'arch2infos' (the same format as the benchmark file)
+# or a directory of the per-architecture files (e.g., 000157-FULL.pth used by `api.reload`):
+# python exps/NAS-Bench-201/store-tools.py --mode append --delta_path ./output/NEW-TRIALS --store_dir $HOME/.torch/NAS-Bench-201-v1_0-e61699
+# Convert the per-architecture archives with the trained weights into the weight store of a store (see lib/nas_201_api/weights.py):
+# python exps/NAS-Bench-201/store-tools.py --mode weights --archive_root $HOME/.torch/NAS-BENCH-201-4-v1.0-archive --store_dir $HOME/.torch/NAS-Bench-201-v1_0-e61699
+# Fold all delta shards into the base shard:
+# python exps/NAS-Bench-201/store-tools.py --mode compact --store_dir $HOME/.torch/NAS-Bench-201-v1_0-e61699
+# Share the benchmark file or store in the shared memory for the search workers on this host (see lib/nas_201_api/shared.py):
+# python exps/NAS-Bench-201/store-tools.py --mode share --api_path $HOME/.torch/NAS-Bench-201-v1_0-e61699 --share_dir /dev/shm/NAS-Bench-201
+############################################################################################
+import os, sys, time, argparse, torch
+from pathlib import Path
+lib_dir = (Path(__file__).parent / '..' / '..' / 'lib').resolve()
+if str(lib_dir) not in sys.path: sys.path.insert(0, str(lib_dir))
+from log_utils    import time_string
+from nas_201_api  import NASBench201API as API, convert_to_store, append_delta, compact_store, write_weight_store, share_api
+
+
+def convert(api_path, store_dir, split_weights):
+  start_time = time.time()
+  convert_to_store(api_path, store_dir, split_weights=split_weights)
+  print('{:} convert {:} into {:} with {:.1f} s.'.format(time_string(), api_path, store_dir, time.time()-start_time))
+  start_time = time.time()
+  api = API(store_dir, verbose=False)
+  print('{:} create {:} from the store with {:.4f} s.'.format(time_string(), api, time.time()-start_time))
+
+
+def append(delta_path, store_dir):
+  start_time = time.time()
+  if os.path.isdir(delta_path):
+    arch2infos = dict()
+    for xfile in sorted(os.listdir(delta_path)):
+      if not xfile.endswith('-FULL.pth'): continue
+      xdata = torch.load(os.path.join(delta_path, xfile), map_location='cpu')
+      assert isinstance(xdata, dict) and 'full' in xdata and 'less' in xdata, 'invalid format of data in {:}'.format(xfile)
+      arch2infos[ int(xfile.split('-')[0]) ] = {'less': xdata['less'], 'full': xdata['full']}
+    evaluated_indexes = None
+  else:
+    xdata = torch.load(delta_path, map_location='cpu')
+    assert isinstance(xdata, dict) and 'arch2infos' in xdata, 'invalid format of data in {:}'.format(delta_path)
+    arch2infos, evaluated_indexes = xdata['arch2infos'], xdata.get('evaluated_indexes', None)
+  delta_dir = append_delta(store_dir, arch2infos, evaluated_indexes)
+  print('{:} append {:} into {:} with {:.1f} s.'.format(time_string(), delta_path, delta_dir, time.time()-start_time))
+
+
+def weights(archive_root, store_dir):
+  start_time = time.time()
+  def archives(): # load the archives one by one to avoid holding all weights in memory
+    for xfile in sorted(os.listdir(archive_root)):
+      if not xfile.endswith('-FULL.pth'): continue
+      xdata = torch.load(os.path.join(archive_root, xfile), map_location='cpu')
+      yield int(xfile.split('-')[0]), {'less': xdata['less'], 'full': xdata['full']}
+  write_weight_store(os.path.join(store_dir, 'weights'), archives())
+  print('{:} convert the weights in {:} into {:} with {:.1f} s.'.format(time_string(), archive_root, store_dir, time.time()-start_time))
+
+
+def compact(store_dir):
+  start_time = time.time()
+  compact_store(store_dir)
+  print('{:} compact {:} with {:.1f} s.'.format(time_string(), store_dir, time.time()-start_time))
+
+
+def share(api_path, share_dir):
+  start_time = time.time()
+  share_dir  = share_api(API(api_path, verbose=False), share_dir)
+  print('{:} share {:} into {:} with {:.1f} s.'.format(time_string(), api_path, share_dir, time.time()-start_time))
+  start_time = time.time()
+  api = API(share_dir, verbose=False)
+  print('{:} create {:} from the shared directory with {:.4f} s.'.format(time_string(), api, time.time()-start_time))
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='The store of NAS-Bench-201', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument('--mode'     , type=str, choices=['convert', 'append', 'compact', 'weights', 'share'], help='The running mode for this script.')
+  parser.add_argument('--api_path' , type=str, help='The path to the NAS-Bench-201 benchmark file.')
+  parser.add_argument('--delta_path', type=str, help='The file or directory of the new trials to be appended.')
+  parser.add_argument('--archive_root', type=str, help='The directory of the per-architecture archives with the trained weights.')
+  parser.add_argument('--split_weights', type=int, default=0, choices=[0,1], help='Move the trained weights into the weight store when converting.')
+  parser.add_argument('--store_dir', type=str, help='The directory of the store.')
+  parser.add_argument('--share_dir', type=str, help='The shared directory, e.g., /dev/shm/NAS-Bench-201.')
+  args = parser.parse_args()
+
+  if args.mode == 'convert':
+    assert args.api_path is not None and os.path.isfile(args.api_path), 'invalid api path : {:}'.format(args.api_path)
+    convert(args.api_path, args.store_dir, args.split_weights > 0)
+  elif args.mode == 'append':
+    assert args.delta_path is not None and os.path.exists(args.delta_path), 'invalid delta path : {:}'.format(args.delta_path)
+    append(args.delta_path, args.store_dir)
+  elif args.mode == 'compact':
+    compact(args.store_dir)
+  elif args.mode == 'weights':
+    assert args.archive_root is not None and os.path.isdir(args.archive_root), 'invalid archive root : {:}'.format(args.archive_root)
+    weights(args.archive_root, args.store_dir)
+  elif args.mode == 'share':
+    assert args.api_path is not None and os.path.exists(args.api_path), 'invalid api path : {:}'.format(args.api_path)
+    assert args.share_dir is not None, 'the default shared directory is removed when this script exits, please set --share_dir'
+    share(args.api_path, args.share_dir)
+  else:
+    raise ValueError('invalid mode : {:}'.format(args.mode))
@@ -132,28 +132,22 @@ def visualize_info(meta_file, dataset, vis_save_dir):
   if not cache_file_path.exists():
     print ('Do not find cache file : {:}'.format(cache_file_path))
     nas_bench = API(str(meta_file))
-    params, flops, train_accs, valid_accs, test_accs, otest_accs = [], [], [], [], [], []
-    for index in range( len(nas_bench) ):
-      info = nas_bench.query_by_index(index, use_12epochs_result=False)
-      resx = info.get_comput_costs(dataset) ; flop, param = resx['flops'], resx['params']
-      if dataset == 'cifar10':
-        res = info.get_metrics('cifar10', 'train')         ; train_acc = res['accuracy']
-        res = info.get_metrics('cifar10-valid', 'x-valid') ; valid_acc = res['accuracy']
-        res = info.get_metrics('cifar10', 'ori-test')      ; test_acc  = res['accuracy']
-        res = info.get_metrics('cifar10', 'ori-test')      ; otest_acc = res['accuracy']
-      else:
-        res = info.get_metrics(dataset, 'train')    ; train_acc = res['accuracy']
-        res = info.get_metrics(dataset, 'x-valid')  ; valid_acc = res['accuracy']
-        res = info.get_metrics(dataset, 'x-test')   ; test_acc  = res['accuracy']
-        res = info.get_metrics(dataset, 'ori-test') ; otest_acc = res['accuracy']
-      if index == 11472: # resnet
-        resnet = {'params':param, 'flops': flop, 'index': 11472, 'train_acc': train_acc, 'valid_acc': valid_acc, 'test_acc': test_acc, 'otest_acc': otest_acc}
-      flops.append( flop )
-      params.append( param )
-      train_accs.append( train_acc )
-      valid_accs.append( valid_acc )
-      test_accs.append( test_acc )
-      otest_accs.append( otest_acc )
+    # the seed-averaged metrics of all architectures are read from the columnar tables, which are cached next to the benchmark file
+    tables = nas_bench.get_tables(use_12epochs_result=False)
+    costs  = tables.costs(dataset)
+    flops, params = costs['flops'].tolist(), costs['params'].tolist()
+    if dataset == 'cifar10':
+      train_accs = tables.seed_mean('cifar10', 'train').tolist()
+      valid_accs = tables.seed_mean('cifar10-valid', 'x-valid').tolist()
+      test_accs  = tables.seed_mean('cifar10', 'ori-test').tolist()
+      otest_accs = tables.seed_mean('cifar10', 'ori-test').tolist()
+    else:
+      train_accs = tables.seed_mean(dataset, 'train').tolist()
+      valid_accs = tables.seed_mean(dataset, 'x-valid').tolist()
+      test_accs  = tables.seed_mean(dataset, 'x-test').tolist()
+      otest_accs = tables.seed_mean(dataset, 'ori-test').tolist()
+    index  = 11472 # resnet
+    resnet = {'params': params[index], 'flops': flops[index], 'index': index, 'train_acc': train_accs[index], 'valid_acc': valid_accs[index], 'test_acc': test_accs[index], 'otest_acc': otest_accs[index]}
     #resnet = {'params': 0.559, 'flops': 78.56, 'index': 11472, 'train_acc': 99.99, 'valid_acc': 90.84, 'test_acc': 93.97}
     info = {'params': params, 'flops': flops, 'train_accs': train_accs, 'valid_accs': valid_accs, 'test_accs': test_accs, 'otest_accs': otest_accs}
     info['resnet'] = resnet
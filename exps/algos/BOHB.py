@@ -25,6 +25,7 @@ import ConfigSpace
 from hpbandster.optimizers.bohb import BOHB
 import hpbandster.core.nameserver as hpns
 from hpbandster.core.worker import Worker
+from driver       import run_experiments
 
 
 def get_configuration_space(max_nodes, search_space):
@@ -107,7 +108,7 @@ def main(xargs, nas_bench):
   torch.backends.cudnn.deterministic = True
   torch.set_num_threads( xargs.workers )
   prepare_seed(xargs.rand_seed)
-  logger = prepare_logger(args)
+  logger = prepare_logger(xargs)
 
   assert xargs.dataset == 'cifar10', 'currently only support CIFAR-10'
   if xargs.data_path is not None:
@@ -136,7 +137,7 @@ def main(xargs, nas_bench):
     extra_info = {'config': config, 'train_loader': None, 'valid_loader': None}
 
   # nas dataset load
-  assert xargs.arch_nas_dataset is not None and os.path.isfile(xargs.arch_nas_dataset)
+  assert xargs.arch_nas_dataset is not None and os.path.exists(xargs.arch_nas_dataset)
   search_space = get_search_spaces('cell', xargs.search_space_name)
   cs = get_configuration_space(xargs.max_nodes, search_space)
 
@@ -210,23 +211,20 @@ if __name__ == '__main__':
   parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
   parser.add_argument('--arch_nas_dataset',   type=str,   help='The path to load the architecture dataset (tiny-nas-benchmark).')
   parser.add_argument('--print_freq',         type=int,   help='print frequency (default: 200)')
+  parser.add_argument('--num_runs',           type=int,   default=500,  help='The number of runs if rand_seed < 0.')
+  parser.add_argument('--num_procs',          type=int,   default=1,    help='The number of processes for the runs if rand_seed < 0.')
+  parser.add_argument('--runs_seed',          type=int,   default=0,    help='The seed to generate the seeds of the runs, which should be kept when resuming.')
   parser.add_argument('--rand_seed',          type=int,   help='manual seed')
   args = parser.parse_args()
   #if args.rand_seed is None or args.rand_seed < 0: args.rand_seed = random.randint(1, 100000)
-  if args.arch_nas_dataset is None or not os.path.isfile(args.arch_nas_dataset):
+  if args.arch_nas_dataset is None or not os.path.exists(args.arch_nas_dataset):
     nas_bench = None
   else:
     print ('{:} build NAS-Benchmark-API from {:}'.format(time_string(), args.arch_nas_dataset))
     nas_bench = API(args.arch_nas_dataset)
   if args.rand_seed < 0:
-    save_dir, all_indexes, num, all_times = None, [], 500, []
-    for i in range(num):
-      print ('{:} : {:03d}/{:03d}'.format(time_string(), i, num))
-      args.rand_seed = random.randint(1, 100000)
-      save_dir, index, ctime = main(args, nas_bench)
-      all_indexes.append( index ) 
-      all_times.append( ctime )
-    print ('\n average time : {:.3f} s'.format(sum(all_times)/len(all_times)))
-    torch.save(all_indexes, save_dir / 'results.pth')
+    records = run_experiments(main, args, nas_bench, args.num_runs, args.num_procs, seed=args.runs_seed)
+    print ('\n average time : {:.3f} s'.format(sum(record['search-time'] for record in records)/len(records)))
+    torch.save([record['index'] for record in records], Path(args.save_dir) / 'results.pth')
   else:
     main(args, nas_bench)
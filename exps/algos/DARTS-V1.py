@@ -14,7 +14,7 @@ if str(lib_dir) not in sys.path: sys.path.insert(0, str(lib_dir))
 from config_utils import load_config, dict2config, configure2str
 from datasets     import get_datasets, get_nas_search_loaders
 from procedures   import prepare_seed, prepare_logger, save_checkpoint, copy_checkpoint, get_optim_scheduler
-from utils        import get_model_infos, obtain_accuracy
+from utils        import get_model_infos, obtain_accuracy, reset_peak_memory, peak_memory_str
 from log_utils    import AverageMeter, time_string, convert_secs2time
 from models       import get_cell_based_tiny_net, get_search_spaces
 from nas_201_api  import NASBench201API as API
@@ -25,6 +25,7 @@ def search_func(xloader, network, criterion, scheduler, w_optimizer, a_optimizer
   base_losses, base_top1, base_top5 = AverageMeter(), AverageMeter(), AverageMeter()
   arch_losses, arch_top1, arch_top5 = AverageMeter(), AverageMeter(), AverageMeter()
   network.train()
+  reset_peak_memory()
   end = time.time()
   for step, (base_inputs, base_targets, arch_inputs, arch_targets) in enumerate(xloader):
     scheduler.update(None, 1.0 * step / len(xloader))
@@ -65,6 +66,7 @@ def search_func(xloader, network, criterion, scheduler, w_optimizer, a_optimizer
     if step % print_freq == 0 or step + 1 == len(xloader):
       Sstr = '*SEARCH* ' + time_string() + ' [{:}][{:03d}/{:03d}]'.format(epoch_str, step, len(xloader))
       Tstr = 'Time {batch_time.val:.2f} ({batch_time.avg:.2f}) Data {data_time.val:.2f} ({data_time.avg:.2f})'.format(batch_time=batch_time, data_time=data_time)
+      Tstr+= ' Speed {:.1f} images/s {:}'.format(base_inputs.size(0) / batch_time.avg, peak_memory_str())
       Wstr = 'Base [Loss {loss.val:.3f} ({loss.avg:.3f})  Prec@1 {top1.val:.2f} ({top1.avg:.2f}) Prec@5 {top5.val:.2f} ({top5.avg:.2f})]'.format(loss=base_losses, top1=base_top1, top5=base_top5)
       Astr = 'Arch [Loss {loss.val:.3f} ({loss.avg:.3f})  Prec@1 {top1.val:.2f} ({top1.avg:.2f}) Prec@5 {top5.val:.2f} ({top5.avg:.2f})]'.format(loss=arch_losses, top1=arch_top1, top5=arch_top5)
       logger.log(Sstr + ' ' + Tstr + ' ' + Wstr + ' ' + Astr)
@@ -121,6 +123,8 @@ def main(xargs):
     model_config = load_config(xargs.model_config, {'num_classes': class_num, 'space'    : search_space,
                                                     'affine'     : False, 'track_running_stats': bool(xargs.track_running_stats)}, None)
   search_model = get_cell_based_tiny_net(model_config)
+  search_model.set_fused(xargs.fused_mixed_op > 0)
+  if xargs.checkpoint_stages: search_model.set_checkpoint([int(x) > 0 for x in xargs.checkpoint_stages.split(',')])
   logger.log('search-model :\n{:}'.format(search_model))
   
   w_optimizer, w_scheduler, criterion = get_optim_scheduler(search_model.get_weights(), config)
@@ -229,6 +233,8 @@ if __name__ == '__main__':
   # architecture leraning rate
   parser.add_argument('--arch_learning_rate', type=float, default=3e-4, help='learning rate for arch encoding')
   parser.add_argument('--arch_weight_decay',  type=float, default=1e-3, help='weight decay for arch encoding')
+  parser.add_argument('--fused_mixed_op',     type=int,   default=0, choices=[0,1], help='Compute the candidates of the edges from the same node together or not.')
+  parser.add_argument('--checkpoint_stages',  type=str,   default='', help='Checkpoint the search cells in each stage or not, e.g., 1,1,0 (empty means no checkpointing).')
   # log
   parser.add_argument('--workers',            type=int,   default=2,    help='number of data loading workers (default: 2)')
   parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
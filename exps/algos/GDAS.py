@@ -97,6 +97,7 @@ def main(xargs):
     model_config = load_config(xargs.model_config, {'num_classes': class_num, 'space'    : search_space,
                                                     'affine'     : False, 'track_running_stats': bool(xargs.track_running_stats)}, None)
   search_model = get_cell_based_tiny_net(model_config)
+  search_model.set_sparse(xargs.sparse_gdas > 0)
   logger.log('search-model :\n{:}'.format(search_model))
   logger.log('model-config : {:}'.format(model_config))
   
@@ -209,6 +210,7 @@ if __name__ == '__main__':
   parser.add_argument('--arch_weight_decay',  type=float, default=1e-3, help='weight decay for arch encoding')
   parser.add_argument('--tau_min',            type=float,               help='The minimum tau for Gumbel')
   parser.add_argument('--tau_max',            type=float,               help='The maximum tau for Gumbel')
+  parser.add_argument('--sparse_gdas',        type=int,   default=0, choices=[0,1], help='Skip the sampled none edges and the nodes not reaching the output or not.')
   # log
   parser.add_argument('--workers',            type=int,   default=2,    help='number of data loading workers (default: 2)')
   parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
@@ -16,7 +16,9 @@ from utils        import get_model_infos, obtain_accuracy
 from log_utils    import AverageMeter, time_string, convert_secs2time
 from models       import get_search_spaces
 from nas_201_api  import NASBench201API as API
-from R_EA         import train_and_eval, random_architecture_func
+from R_EA         import train_and_eval, random_architecture_func, skip_seen_class_func
+from simulator    import RandomSearcher, AsyncSimulator
+from driver       import run_experiments
 
 
 def main(xargs, nas_bench):
@@ -26,7 +28,7 @@ def main(xargs, nas_bench):
   torch.backends.cudnn.deterministic = True
   torch.set_num_threads( xargs.workers )
   prepare_seed(xargs.rand_seed)
-  logger = prepare_logger(args)
+  logger = prepare_logger(xargs)
 
   assert xargs.dataset == 'cifar10', 'currently only support CIFAR-10'
   if xargs.data_path is not None:
@@ -55,12 +57,22 @@ def main(xargs, nas_bench):
     extra_info = {'config': config, 'train_loader': None, 'valid_loader': None}
   search_space = get_search_spaces('cell', xargs.search_space_name)
   random_arch = random_architecture_func(xargs.max_nodes, search_space)
+  if xargs.skip_seen_class:
+    assert nas_bench is not None, 'skip_seen_class requires the NAS-Bench-201 API'
+    random_arch = skip_seen_class_func(random_arch, nas_bench)
   #x =random_arch() ; y = mutate_arch(x)
   x_start_time = time.time()
   logger.log('{:} use nas_bench : {:}'.format(time_string(), nas_bench))
   best_arch, best_acc, total_time_cost, history = None, -1, 0, []
+  if xargs.sim_workers > 0: # the random search with parallel workers on a simulated clock
+    simulator = AsyncSimulator(RandomSearcher(random_arch), lambda arch: train_and_eval(arch, nas_bench, extra_info), xargs.sim_workers, xargs.time_budget)
+    trials, total_time_cost = simulator.run()
+    logger.log('{:} {:} finish : {:}'.format(time_string(), simulator, AsyncSimulator.summary(trials, total_time_cost, xargs.sim_workers)))
+    history = [trial.candidate for trial in trials]
+    best_trial = max(trials, key=lambda x: x.accuracy)
+    best_arch, best_acc = best_trial.candidate, best_trial.accuracy
   #for idx in range(xargs.random_num):
-  while total_time_cost < xargs.time_budget:
+  while xargs.sim_workers <= 0 and total_time_cost < xargs.time_budget:
     arch = random_arch()
     accuracy, cost_time = train_and_eval(arch, nas_bench, extra_info)
     if total_time_cost + cost_time > xargs.time_budget: break
@@ -91,26 +103,27 @@ if __name__ == '__main__':
   parser.add_argument('--num_cells',          type=int,   help='The number of cells in one stage.')
   #parser.add_argument('--random_num',         type=int,   help='The number of random selected architectures.')
   parser.add_argument('--time_budget',        type=int,   help='The total time cost budge for searching (in seconds).')
+  parser.add_argument('--sim_workers',        type=int,   default=0,    help='The number of asynchronous workers on a simulated clock (0 means the sequential search).')
+  parser.add_argument('--skip_seen_class',    type=int,   default=0,    help='Do not sample the architectures isomorphic to a sampled one or not.')
   # log
   parser.add_argument('--workers',            type=int,   default=2,    help='number of data loading workers (default: 2)')
   parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
   parser.add_argument('--arch_nas_dataset',   type=str,   help='The path to load the architecture dataset (tiny-nas-benchmark).')
   parser.add_argument('--print_freq',         type=int,   help='print frequency (default: 200)')
+  parser.add_argument('--num_runs',           type=int,   default=500,  help='The number of runs if rand_seed < 0.')
+  parser.add_argument('--num_procs',          type=int,   default=1,    help='The number of processes for the runs if rand_seed < 0.')
+  parser.add_argument('--runs_seed',          type=int,   default=0,    help='The seed to generate the seeds of the runs, which should be kept when resuming.')
   parser.add_argument('--rand_seed',          type=int,   help='manual seed')
   args = parser.parse_args()
+  args.skip_seen_class = args.skip_seen_class > 0
   #if args.rand_seed is None or args.rand_seed < 0: args.rand_seed = random.randint(1, 100000)
-  if args.arch_nas_dataset is None or not os.path.isfile(args.arch_nas_dataset):
+  if args.arch_nas_dataset is None or not os.path.exists(args.arch_nas_dataset):
     nas_bench = None
   else:
     print ('{:} build NAS-Benchmark-API from {:}'.format(time_string(), args.arch_nas_dataset))
     nas_bench = API(args.arch_nas_dataset)
   if args.rand_seed < 0:
-    save_dir, all_indexes, num = None, [], 500
-    for i in range(num):
-      print ('{:} : {:03d}/{:03d}'.format(time_string(), i, num))
-      args.rand_seed = random.randint(1, 100000)
-      save_dir, index = main(args, nas_bench)
-      all_indexes.append( index )
-    torch.save(all_indexes, save_dir / 'results.pth')
+    records = run_experiments(main, args, nas_bench, args.num_runs, args.num_procs, seed=args.runs_seed)
+    torch.save([record['index'] for record in records], Path(args.save_dir) / 'results.pth')
   else:
     main(args, nas_bench)
@@ -17,7 +17,10 @@ from procedures   import prepare_seed, prepare_logger, save_checkpoint, copy_che
 from utils        import get_model_infos, obtain_accuracy
 from log_utils    import AverageMeter, time_string, convert_secs2time
 from nas_201_api  import NASBench201API as API
+from nas_201_api.encoding import num_codes, num_edges
 from models       import CellStructure, get_search_spaces
+from simulator    import EvolutionSearcher, AsyncSimulator
+from driver       import run_experiments
 
 
 class Model(object):
@@ -91,19 +94,34 @@ def mutate_arch_func(op_names):
   The parent architecture is cloned and mutated to produce the child architecture. The child architecture is mutated by randomly switch one operation to another.
   """
   def mutate_arch_func(parent_arch):
-    child_arch = deepcopy( parent_arch )
-    node_id = random.randint(0, len(child_arch.nodes)-1)
-    node_info = list( child_arch.nodes[node_id] )
+    # the structure is immutable, and `replace_op` creates the child without copying the parent
+    node_id = random.randint(0, len(parent_arch.nodes)-1)
+    node_info = parent_arch.nodes[node_id]
     snode_id = random.randint(0, len(node_info)-1)
     xop = random.choice( op_names )
     while xop == node_info[snode_id][0]:
       xop = random.choice( op_names )
-    node_info[snode_id] = (xop, node_info[snode_id][1])
-    child_arch.nodes[node_id] = tuple( node_info )
-    return child_arch
+    return parent_arch.replace_op(node_id, snode_id, xop)
   return mutate_arch_func
 
 
+def skip_seen_class_func(sample_func, nas_bench, seen_classes=None, max_tries=100):
+  """Wraps a sampler (e.g., random_architecture or mutate_arch_func) to skip the architectures that are isomorphic to a sampled one.
+  The equivalence classes are obtained from `nas_bench.canonical_index`. After `max_tries` failures, the last sample is returned.
+  The samplers of one run should share the same `seen_classes` set, and an architecture not in the benchmark is always unseen.
+  """
+  if seen_classes is None: seen_classes = set()
+  def sample_func_wrapper(*args):
+    for _ in range(max_tries):
+      arch  = sample_func(*args)
+      index = nas_bench.query_index_by_arch(arch)
+      xclass = None if index < 0 else nas_bench.canonical_index( index )
+      if xclass is None or xclass not in seen_classes: break
+    if xclass is not None: seen_classes.add( xclass )
+    return arch
+  return sample_func_wrapper
+
+
 def regularized_evolution(cycles, population_size, sample_size, time_budget, random_arch, mutate_arch, nas_bench, extra_info, dataname):
   """Algorithm for regularized evolution (i.e. aging evolution).
   
@@ -165,6 +183,63 @@ def regularized_evolution(cycles, population_size, sample_size, time_budget, ran
   return history, total_time_cost
 
 
+def vectorized_regularized_evolution(num_runs, population_size, sample_size, time_budget, nas_bench, dataname='cifar10-valid', rng=None, max_nodes=4, num_ops=5):
+  """The same algorithm as `regularized_evolution` with `train_and_eval` (use_converged_LR=True), but `num_runs` independent runs
+  are evolved together. The populations are a [num_runs, population_size] array of the integer codes of architectures (see
+  nas_201_api/encoding.py), and the tournaments, mutations and benchmark queries of all runs are batched array operations.
+  Each run stops when its next child exceeds its time budget (the real time of the algorithm itself is not counted).
+
+  Returns:
+    best_indexes, best_accs, total_costs, num_evals : [num_runs] arrays of the best architecture index in the history,
+        its accuracy, the simulated search cost and the number of evaluated architectures of each run.
+  """
+  if rng is None or isinstance(rng, int): rng = np.random.RandomState(rng)
+  def evaluate(codes):
+    indexes = nas_bench.query_index_by_code(codes)
+    assert (indexes >= 0).all(), 'can not find some codes in the benchmark : {:}'.format(codes[indexes < 0])
+    info = nas_bench.get_more_info_batch(indexes, dataname, None, True, 'random', rng)
+    return indexes, info['valid-accuracy'], info['train-all-time'] + info['valid-per-time']
+  total_edges, runs = num_edges(max_nodes), np.arange(num_runs)
+  # initialize the populations with random models
+  population  = rng.randint(0, num_codes(max_nodes, num_ops), size=(num_runs, population_size)).astype(np.int64)
+  indexes, accuracy, costs = (x.reshape(num_runs, population_size) for x in evaluate(population.ravel()))
+  total_costs = costs.sum(axis=1)
+  best_slots  = np.argmax(accuracy, axis=1)
+  best_indexes, best_accs = indexes[runs, best_slots], accuracy[runs, best_slots]
+  num_evals   = np.full(num_runs, population_size, dtype=np.int64)
+  oldest      = np.zeros(num_runs, dtype=np.int64) # the population is a ring buffer, and this is the slot of the oldest model
+  active      = total_costs < time_budget
+  while active.any():
+    xruns = np.nonzero(active)[0]
+    # the parent is the best of `sample_size` randomly chosen models (with replacement)
+    samples = rng.randint(0, population_size, size=(len(xruns), sample_size))
+    parents = samples[np.arange(len(xruns)), np.argmax(accuracy[xruns[:, None], samples], axis=1)]
+    codes   = population[xruns, parents]
+    # mutate one random edge into a different operation, where the edge is sampled as `mutate_arch_func`:
+    # a random node i in [1, max_nodes) and then a random input j in [0, i), and (i, j) is the (i*(i-1)/2+j)-th digit
+    nodes   = rng.randint(1, max_nodes, size=len(xruns))
+    edges   = nodes * (nodes - 1) // 2 + (rng.random_sample(len(xruns)) * nodes).astype(np.int64)
+    bases   = num_ops ** (total_edges - 1 - edges)
+    old_ops = (codes // bases) % num_ops
+    new_ops = (old_ops + rng.randint(1, num_ops, size=len(xruns))) % num_ops
+    codes   = codes + (new_ops - old_ops) * bases
+    xindexes, xaccs, xcosts = evaluate(codes)
+    # the runs that can not afford their children are finished
+    afford  = total_costs[xruns] + xcosts <= time_budget
+    active[xruns[~afford]] = False
+    xruns, codes, xindexes, xaccs, xcosts = xruns[afford], codes[afford], xindexes[afford], xaccs[afford], xcosts[afford]
+    total_costs[xruns] += xcosts
+    num_evals[xruns]   += 1
+    # the child replaces the oldest model
+    population[xruns, oldest[xruns]] = codes
+    accuracy[xruns, oldest[xruns]]   = xaccs
+    oldest[xruns] = (oldest[xruns] + 1) % population_size
+    better = xaccs > best_accs[xruns]
+    best_indexes[xruns[better]], best_accs[xruns[better]] = xindexes[better], xaccs[better]
+    active[xruns] &= total_costs[xruns] < time_budget
+  return best_indexes, best_accs, total_costs, num_evals
+
+
 def main(xargs, nas_bench):
   assert torch.cuda.is_available(), 'CUDA is not available.'
   torch.backends.cudnn.enabled   = True
@@ -172,7 +247,7 @@ def main(xargs, nas_bench):
   torch.backends.cudnn.deterministic = True
   torch.set_num_threads( xargs.workers )
   prepare_seed(xargs.rand_seed)
-  logger = prepare_logger(args)
+  logger = prepare_logger(xargs)
 
   assert xargs.dataset == 'cifar10', 'currently only support CIFAR-10'
   if xargs.dataset == 'cifar10':
@@ -207,14 +282,25 @@ def main(xargs, nas_bench):
   search_space = get_search_spaces('cell', xargs.search_space_name)
   random_arch = random_architecture_func(xargs.max_nodes, search_space)
   mutate_arch = mutate_arch_func(search_space)
+  if xargs.skip_seen_class:
+    assert nas_bench is not None, 'skip_seen_class requires the NAS-Bench-201 API'
+    seen_classes = set() # shared by the initial population and the mutations
+    random_arch = skip_seen_class_func(random_arch, nas_bench, seen_classes)
+    mutate_arch = skip_seen_class_func(mutate_arch, nas_bench, seen_classes)
   #x =random_arch() ; y = mutate_arch(x)
   x_start_time = time.time()
   logger.log('{:} use nas_bench : {:}'.format(time_string(), nas_bench))
   logger.log('-'*30 + ' start searching with the time budget of {:} s'.format(xargs.time_budget))
-  history, total_cost = regularized_evolution(xargs.ea_cycles, xargs.ea_population, xargs.ea_sample_size, xargs.time_budget, random_arch, mutate_arch, nas_bench if args.ea_fast_by_api else None, extra_info, dataname)
-  logger.log('{:} regularized_evolution finish with history of {:} arch with {:.1f} s (real-cost={:.2f} s).'.format(time_string(), len(history), total_cost, time.time()-x_start_time))
-  best_arch = max(history, key=lambda i: i.accuracy)
-  best_arch = best_arch.arch
+  if xargs.sim_workers > 0: # the asynchronous evolution with parallel workers on a simulated clock
+    searcher  = EvolutionSearcher(xargs.ea_population, xargs.ea_sample_size, random_arch, mutate_arch)
+    simulator = AsyncSimulator(searcher, lambda arch: train_and_eval(arch, nas_bench if xargs.ea_fast_by_api else None, extra_info), xargs.sim_workers, xargs.time_budget)
+    history, total_cost = simulator.run()
+    logger.log('{:} {:} finish : {:}'.format(time_string(), simulator, AsyncSimulator.summary(history, total_cost, xargs.sim_workers)))
+    best_arch = max(history, key=lambda i: i.accuracy).candidate
+  else:
+    history, total_cost = regularized_evolution(xargs.ea_cycles, xargs.ea_population, xargs.ea_sample_size, xargs.time_budget, random_arch, mutate_arch, nas_bench if xargs.ea_fast_by_api else None, extra_info, dataname)
+    logger.log('{:} regularized_evolution finish with history of {:} arch with {:.1f} s (real-cost={:.2f} s).'.format(time_string(), len(history), total_cost, time.time()-x_start_time))
+    best_arch = max(history, key=lambda i: i.accuracy).arch
   logger.log('{:} best arch is {:}'.format(time_string(), best_arch))
   
   info = nas_bench.query_by_arch( best_arch )
@@ -239,29 +325,41 @@ if __name__ == '__main__':
   parser.add_argument('--ea_population',      type=int,   help='The population size in EA.')
   parser.add_argument('--ea_sample_size',     type=int,   help='The sample size in EA.')
   parser.add_argument('--ea_fast_by_api',     type=int,   help='Use our API to speed up the experiments or not.')
+  parser.add_argument('--ea_vectorized',      type=int,   default=0,    help='Run all seeds together with the vectorized evolution over integer codes or not.')
+  parser.add_argument('--skip_seen_class',    type=int,   default=0,    help='Do not sample the architectures isomorphic to a sampled one or not.')
   parser.add_argument('--time_budget',        type=int,   help='The total time cost budge for searching (in seconds).')
+  parser.add_argument('--sim_workers',        type=int,   default=0,    help='The number of asynchronous workers on a simulated clock (0 means the sequential search).')
   # log
   parser.add_argument('--workers',            type=int,   default=2,    help='number of data loading workers (default: 2)')
   parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
   parser.add_argument('--arch_nas_dataset',   type=str,   help='The path to load the architecture dataset (tiny-nas-benchmark).')
   parser.add_argument('--print_freq',         type=int,   help='print frequency (default: 200)')
+  parser.add_argument('--num_runs',           type=int,   default=500,  help='The number of runs if rand_seed < 0 (also for ea_vectorized).')
+  parser.add_argument('--num_procs',          type=int,   default=1,    help='The number of processes for the runs if rand_seed < 0.')
+  parser.add_argument('--runs_seed',          type=int,   default=0,    help='The seed to generate the seeds of the runs, which should be kept when resuming.')
   parser.add_argument('--rand_seed',          type=int,   default=-1,   help='manual seed')
   args = parser.parse_args()
   #if args.rand_seed is None or args.rand_seed < 0: args.rand_seed = random.randint(1, 100000)
   args.ea_fast_by_api = args.ea_fast_by_api > 0
+  args.skip_seen_class = args.skip_seen_class > 0
 
-  if args.arch_nas_dataset is None or not os.path.isfile(args.arch_nas_dataset):
+  if args.arch_nas_dataset is None or not os.path.exists(args.arch_nas_dataset):
     nas_bench = None
   else:
     print ('{:} build NAS-Benchmark-API from {:}'.format(time_string(), args.arch_nas_dataset))
     nas_bench = API(args.arch_nas_dataset)
-  if args.rand_seed < 0:
-    save_dir, all_indexes, num = None, [], 500
-    for i in range(num):
-      print ('{:} : {:03d}/{:03d}'.format(time_string(), i, num))
-      args.rand_seed = random.randint(1, 100000)
-      save_dir, index = main(args, nas_bench)
-      all_indexes.append( index )
-    torch.save(all_indexes, save_dir / 'results.pth')
+  if args.ea_vectorized > 0:
+    assert nas_bench is not None, 'ea_vectorized requires the NAS-Bench-201 API'
+    assert not args.skip_seen_class and args.sim_workers <= 0, 'ea_vectorized does not support skip_seen_class and sim_workers'
+    num = args.num_runs if args.rand_seed < 0 else 1
+    start_time = time.time()
+    all_indexes, all_accs, all_costs, all_evals = vectorized_regularized_evolution(num, args.ea_population, args.ea_sample_size, args.time_budget, nas_bench, rng=args.runs_seed if args.rand_seed < 0 else args.rand_seed, max_nodes=args.max_nodes)
+    print ('{:} finish {:} runs with {:.2f} s : average accuracy = {:.2f}%, average evaluations = {:.1f}'.format(time_string(), num, time.time()-start_time, all_accs.mean(), all_evals.mean()))
+    save_dir = Path(args.save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    torch.save([int(x) for x in all_indexes], save_dir / 'results.pth')
+  elif args.rand_seed < 0:
+    records = run_experiments(main, args, nas_bench, args.num_runs, args.num_procs, seed=args.runs_seed)
+    torch.save([record['index'] for record in records], Path(args.save_dir) / 'results.pth')
   else:
     main(args, nas_bench)
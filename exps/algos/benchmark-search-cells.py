@@ -0,0 +1,143 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The micro-benchmark of the execution modes of the search cells on NAS-Bench-201.
+# Each mode is checked against the original execution (outputs, gradients and BN statistics), and then timed by
+# the forward and backward passes of one search step on random CIFAR-sized inputs.
+#   fused       : the fused mixed operations for DARTS (see lib/models/cell_searchs/fused_cells.py).
+#   gdas-sparse : the sparse execution for GDAS (see lib/models/cell_searchs/sparse_cells.py), where the BN statistics
+#                 of the skipped ops are not updated, and thus they are not compared.
+#   zero        : the symbolic zero for DARTS (see lib/models/cell_operations.py), compared with the zero tensors.
+#   checkpoint  : the activation checkpointing of the DARTS search cells in the stages of --stages
+#                 (see lib/models/cell_searchs/checkpoint_cells.py).
+# The memory (MB) of one step is the peak memory on GPU. On CPU, it is the total memory allocated (PyTorch >= 1.6)
+# and the memory of the tensors saved for backward (PyTorch >= 1.10), where the latter is reduced by checkpointing.
+# python exps/algos/benchmark-search-cells.py --mode fused --batch_size 64 --steps 20
+############################################################################################
+import os, sys, copy, time, argparse
+import torch
+import torch.nn as nn
+from pathlib import Path
+lib_dir = (Path(__file__).parent / '..' / '..' / 'lib').resolve()
+if str(lib_dir) not in sys.path: sys.path.insert(0, str(lib_dir))
+from log_utils    import time_string
+from models       import get_cell_based_tiny_net, get_search_spaces
+from models.cell_operations import set_symbolic_zero
+
+
+def create_model(name, xargs):
+  config = {'name': name, 'C': xargs.channel, 'N': xargs.num_cells, 'max_nodes': xargs.max_nodes, 'num_classes': 10,
+            'space': get_search_spaces('cell', xargs.search_space_name), 'affine': False, 'track_running_stats': True}
+  return get_cell_based_tiny_net(config)
+
+
+def step(model, inputs):
+  model.zero_grad()
+  _, logits = model(inputs)
+  logits.sum().backward()
+  return logits.detach()
+
+
+def check(base_model, model, inputs, check_buffers=True):
+  torch.manual_seed(0) # the same Gumbel noise for GDAS
+  base_logits = step(base_model, inputs)
+  torch.manual_seed(0)
+  logits = step(model, inputs)
+  max_diff = {'logits': (base_logits - logits).abs().max().item(), 'grads': 0., 'buffers': 0.}
+  for (name, xparam), (_, param) in zip(base_model.named_parameters(), model.named_parameters()):
+    if xparam.grad is None and param.grad is None: continue
+    xgrad = xparam.grad if xparam.grad is not None else torch.zeros_like(xparam)
+    grad  =  param.grad if  param.grad is not None else torch.zeros_like(param)
+    max_diff['grads'] = max(max_diff['grads'], (xgrad - grad).abs().max().item())
+  for xbuffer, buffer in zip(base_model.buffers(), model.buffers()):
+    if not check_buffers: break
+    max_diff['buffers'] = max(max_diff['buffers'], (xbuffer.double() - buffer.double()).abs().max().item())
+  return max_diff
+
+
+def timing(model, inputs, steps, warmup=3):
+  for _ in range(warmup): step(model, inputs)
+  if inputs.is_cuda: torch.cuda.synchronize()
+  start_time = time.time()
+  for _ in range(steps): step(model, inputs)
+  if inputs.is_cuda: torch.cuda.synchronize()
+  return (time.time() - start_time) / steps
+
+
+# the memory of the tensors saved for backward in the forward pass
+def saved_memory(model, inputs):
+  if not hasattr(torch.autograd, 'graph') or not hasattr(torch.autograd.graph, 'saved_tensors_hooks'): return None
+  saved = dict()
+  def pack(x):
+    saved[x.data_ptr()] = max(saved.get(x.data_ptr(), 0), x.numel() * x.element_size())
+    return x
+  model.zero_grad()
+  with torch.autograd.graph.saved_tensors_hooks(pack, lambda x: x):
+    _, logits = model(inputs)
+  logits.sum().backward()
+  return sum(saved.values()) / 1e6
+
+
+# the memory (in MB) of one step, where the unavailable values are None
+def memory(model, inputs):
+  if inputs.is_cuda:
+    torch.cuda.synchronize()
+    torch.cuda.reset_max_memory_allocated()
+    base_memory = torch.cuda.memory_allocated()
+    step(model, inputs)
+    torch.cuda.synchronize()
+    return {'peak': (torch.cuda.max_memory_allocated() - base_memory) / 1e6}
+  try:
+    with torch.autograd.profiler.profile(profile_memory=True) as prof:
+      step(model, inputs)
+    allocated = sum(max(getattr(event, 'self_cpu_memory_usage', 0), 0) for event in prof.function_events) / 1e6
+  except TypeError: # profile_memory is not supported
+    allocated = None
+  return {'allocated': allocated, 'saved': saved_memory(model, inputs)}
+
+
+def main(xargs):
+  torch.manual_seed(xargs.rand_seed)
+  torch.set_num_threads(xargs.workers)
+  inputs = torch.randn(xargs.batch_size, 3, 32, 32).to(xargs.device)
+  if xargs.mode == 'fused':
+    base_model = create_model('DARTS-V1', xargs)
+    model = copy.deepcopy(base_model)
+    model.set_fused(True)
+  elif xargs.mode == 'gdas-sparse':
+    base_model = create_model('GDAS', xargs)
+    model = copy.deepcopy(base_model)
+    model.set_sparse(True)
+  elif xargs.mode == 'zero':
+    model = create_model('DARTS-V1', xargs)
+    base_model = copy.deepcopy(model)
+    set_symbolic_zero(base_model, False)
+  elif xargs.mode == 'checkpoint':
+    base_model = create_model('DARTS-V1', xargs)
+    model = copy.deepcopy(base_model)
+    model.set_checkpoint([int(x) > 0 for x in xargs.stages.split(',')])
+  else:
+    raise ValueError('invalid mode : {:}'.format(xargs.mode))
+  base_model, model = base_model.to(xargs.device), model.to(xargs.device)
+  print('{:} check the {:} mode : max-abs-diff = {:}'.format(time_string(), xargs.mode, check(base_model, model, inputs, xargs.mode != 'gdas-sparse')))
+  base_time, time_cost = timing(base_model, inputs, xargs.steps), timing(model, inputs, xargs.steps)
+  base_memory, xmemory = memory(base_model, inputs), memory(model, inputs)
+  print('{:} original : {:8.2f} ms per step, {:7.1f} images/s, memory = {:}'.format(time_string(), base_time * 1000, xargs.batch_size / base_time, base_memory))
+  print('{:} {:8s} : {:8.2f} ms per step, {:7.1f} images/s, memory = {:}, {:.2f}x speedup'.format(time_string(), xargs.mode, time_cost * 1000, xargs.batch_size / time_cost, xmemory, base_time / time_cost))
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Benchmark the execution modes of the search cells', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument('--mode',              type=str, default='fused', choices=['fused', 'gdas-sparse', 'zero', 'checkpoint'], help='The execution mode.')
+  parser.add_argument('--search_space_name', type=str, default='nas-bench-201', help='The search space name.')
+  parser.add_argument('--max_nodes',         type=int, default=4,  help='The maximum number of nodes.')
+  parser.add_argument('--channel',           type=int, default=16, help='The number of channels.')
+  parser.add_argument('--num_cells',         type=int, default=5,  help='The number of cells in one stage.')
+  parser.add_argument('--batch_size',        type=int, default=64, help='The batch size.')
+  parser.add_argument('--steps',             type=int, default=20, help='The number of timed steps.')
+  parser.add_argument('--stages',            type=str, default='1,1,1', help='Checkpoint the search cells in each stage or not (for the checkpoint mode).')
+  parser.add_argument('--device',            type=str, default='cpu', help='The device, e.g., cpu or cuda.')
+  parser.add_argument('--workers',           type=int, default=4,  help='The number of CPU threads.')
+  parser.add_argument('--rand_seed',         type=int, default=0,  help='The random seed.')
+  args = parser.parse_args()
+  main(args)
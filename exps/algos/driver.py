@@ -0,0 +1,128 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+##############################################################################
+# Run a search algorithm with many random seeds, which replaces the serial loop of 500 runs in R_EA.py, reinforce.py, etc.
+# `main_func(xargs, nas_bench)` is the `main` function of a search script, which returns (log_dir, arch_index, ...).
+#   * The runs are distributed over `num_procs` processes, which share one NAS-Bench-201 API:
+#     the forked processes inherit the API of the parent process, otherwise (e.g., the spawn start method) each process
+#     loads the API once from its path, which is `bench_file` (default: xargs.arch_nas_dataset) or the shared directory of
+#     an API created from a shared directory (see nas_201_api/shared.py), which is memory-mapped by each process.
+#   * `main_func` should only read its `xargs`, as the module-level `args` of a script does not exist in a spawned process.
+#   * Each finished run is appended as one JSON line into `results_file` (default: save_dir/runs.jsonl),
+#     with its seed, the found architecture, the wall-clock / CPU time and the process id.
+#   * The seed of each run is decided by `seed`, so that a crashed or interrupted experiment is resumed
+#     by calling it again with the same arguments: the runs in `results_file` are skipped.
+##############################################################################
+import os, sys, copy, json, time, random, traceback, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+
+_WORKER_BENCH = None # the API of the worker processes, which is inherited by the forked processes or loaded by `init_worker`
+
+
+# the initializer of a (non-forked) worker process, which loads the API from `bench_path` once
+def init_worker(bench_path):
+  global _WORKER_BENCH
+  if bench_path is None:
+    _WORKER_BENCH = None
+  else:
+    from nas_201_api import NASBench201API
+    _WORKER_BENCH = NASBench201API(bench_path, verbose=False)
+
+
+def run_seeds(num_runs, seed=0):
+  rng = random.Random(seed)
+  return [rng.randint(1, 100000) for _ in range(num_runs)]
+
+
+def load_records(results_file):
+  records = dict()
+  if results_file is None or not os.path.isfile(results_file): return records
+  with open(results_file, 'r') as cfile:
+    for line in cfile:
+      try:
+        record = json.loads(line)
+      except ValueError: # the last line may be incomplete if the driver is killed
+        continue
+      records[record['run']] = record
+  return records
+
+
+def append_record(results_file, record):
+  with open(results_file, 'a') as cfile:
+    cfile.write(json.dumps(record) + '\n')
+    cfile.flush()
+    os.fsync(cfile.fileno())
+
+
+def run_one(main_func, xargs, run, seed, nas_bench, in_worker):
+  if in_worker: nas_bench = _WORKER_BENCH
+  xargs = copy.deepcopy(xargs)
+  xargs.rand_seed = seed
+  start_time, start_cpu = time.time(), time.process_time()
+  outputs = main_func(xargs, nas_bench)
+  index = outputs[1]
+  record = {'run'     : run,
+            'seed'    : seed,
+            'index'   : None if index is None else int(index),
+            'arch'    : None if index is None or index < 0 or nas_bench is None else nas_bench.arch(index),
+            'log_dir' : str(outputs[0]),
+            'start'   : start_time,
+            'time'    : time.time() - start_time,
+            'cpu-time': time.process_time() - start_cpu,
+            'pid'     : os.getpid()}
+  if len(outputs) > 2: record['search-time'] = float(outputs[2]) # the real search time reported by BOHB.py and hyperband.py
+  return record
+
+
+def run_experiments(main_func, xargs, nas_bench, num_runs, num_procs=1, results_file=None, seed=0, verbose=True, bench_file=None):
+  if results_file is None: results_file = str(Path(xargs.save_dir) / 'runs.jsonl')
+  os.makedirs(os.path.dirname(os.path.abspath(results_file)), exist_ok=True)
+  records = load_records(results_file)
+  seeds   = run_seeds(num_runs, seed)
+  for run, record in records.items():
+    if run < num_runs and record['seed'] != seeds[run]:
+      raise ValueError('the run-{:} in {:} uses seed={:} instead of {:}, please use the same seed or a new results file'.format(run, results_file, record['seed'], seeds[run]))
+  todo = [run for run in range(num_runs) if run not in records]
+  if verbose: print('{:} runs with {:} processes : {:} finished in {:}, {:} to go'.format(num_runs, num_procs, num_runs - len(todo), results_file, len(todo)))
+
+  start_time, failures = time.time(), []
+  def finish(run, record):
+    records[run] = record
+    append_record(results_file, record)
+    if verbose: print('[{:03d}/{:03d}] seed={:5d} : index={:} with {:.1f} s (pid={:})'.format(len(records), num_runs, record['seed'], record['index'], record['time'], record['pid']))
+  if num_procs <= 1:
+    for run in todo:
+      finish(run, run_one(main_func, xargs, run, seeds[run], nas_bench, False))
+  else:
+    global _WORKER_BENCH
+    # the forked processes inherit the API (copy-on-write), otherwise each process loads the API from its path once.
+    if multiprocessing.get_start_method() == 'fork' and getattr(nas_bench, 'shared', None) is None:
+      _WORKER_BENCH, initializer, initargs = nas_bench, None, ()
+    else:
+      if nas_bench is None:
+        bench_path = None
+      elif getattr(nas_bench, 'shared', None) is not None:
+        bench_path = nas_bench.shared.root
+      else:
+        bench_path = bench_file if bench_file is not None else getattr(xargs, 'arch_nas_dataset', None)
+      if nas_bench is not None and bench_path is None: raise ValueError('the path of {:} is required for the non-forked processes, please set bench_file'.format(nas_bench))
+      initializer, initargs = init_worker, (bench_path,)
+    with ProcessPoolExecutor(max_workers=num_procs, initializer=initializer, initargs=initargs) as executor:
+      futures = {executor.submit(run_one, main_func, xargs, run, seeds[run], None, True): run for run in todo}
+      for future in as_completed(futures):
+        run = futures[future]
+        try:
+          finish(run, future.result())
+        except Exception: # the failed run is not recorded, and it will be re-run when resuming
+          failures.append( run )
+          print('run-{:} (seed={:}) failed :\n{:}'.format(run, seeds[run], traceback.format_exc()), file=sys.stderr)
+    _WORKER_BENCH = None
+  total_time = time.time() - start_time
+  finished = [records[run] for run in todo if run in records]
+  if verbose and len(finished) > 0:
+    serial_time = sum(record['time'] for record in finished)
+    print('finish {:} runs within {:.1f} s : {:.2f} runs per minute, {:.2f}x speedup over the serial runs{:}'.format(len(finished), total_time, len(finished) * 60. / total_time, serial_time / total_time,
+                 '' if len(failures) == 0 else ', {:} runs failed and can be resumed'.format(len(failures))))
+  return [records[run] for run in sorted(records.keys()) if run < num_runs]
@@ -0,0 +1,226 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+###################################################################################
+# In-process Hyperband and BOHB (Falkner et al., ICML 2018) on NAS-Bench-201,     #
+# which do not need hpbandster, the Pyro nameserver and the worker threads.       #
+# A configuration is the [num-edges] array of operation indexes, in the same edge #
+# order as `get_configuration_space` in BOHB.py (1<-0, 2<-0, 2<-1, 3<-0, ...),   #
+# and all configurations of a rung of successive halving are evaluated together. #
+###################################################################################
+import os, sys, time, math, argparse
+import numpy as np
+import torch
+from pathlib import Path
+lib_dir = (Path(__file__).parent / '..' / '..' / 'lib').resolve()
+if str(lib_dir) not in sys.path: sys.path.insert(0, str(lib_dir))
+from procedures   import prepare_seed, prepare_logger
+from log_utils    import time_string
+from nas_201_api  import NASBench201API as API
+from nas_201_api.encoding import OP2INDEX, ops2codes, code2str, num_edges
+from models       import get_search_spaces
+from driver       import run_experiments
+
+
+class CategoricalKDE(object):
+  """The product of the Aitchison-Aitken kernels over the categorical dimensions:
+  k(x, xi) = 1 - h if x == xi else h / (K - 1), where h is the bandwidth of a dimension with K categories.
+  The bandwidth follows the normal reference rule (as statsmodels used by hpbandster) and is bounded by `min_bandwidth`.
+  """
+  def __init__(self, data, num_choices, min_bandwidth=1e-3):
+    self.data = np.asarray(data, dtype=np.int64)
+    self.num_choices = num_choices
+    num, dim = self.data.shape
+    bandwidth = 1.06 * self.data.std(axis=0) * num ** (-1. / (4 + dim))
+    self.bandwidth = np.clip(bandwidth, min_bandwidth, (num_choices - 1.) / num_choices)
+
+  def pdf(self, configs):
+    configs = np.asarray(configs, dtype=np.int64)
+    matched = configs[:, None, :] == self.data[None, :, :] # [num-configs, num-data, dim]
+    values  = np.where(matched, 1 - self.bandwidth, self.bandwidth / (self.num_choices - 1))
+    return values.prod(axis=-1).mean(axis=-1)
+
+
+class Hyperband(object):
+  """Hyperband with the budgets in [min_budget, max_budget] and the reduction factor `eta`.
+  If `use_model` is True, it is BOHB: the configurations are sampled from the good/bad KDEs of the largest budget
+  that has enough observations, except a `random_fraction` of random configurations.
+  `evaluate(configs, budget)` returns the arrays of the losses and the time costs of a [N, num-edges] array of configurations.
+  """
+  def __init__(self, evaluate, num_edges, num_choices, min_budget, max_budget, eta=3, rng=None, use_model=True,
+                     top_n_percent=15, num_samples=64, random_fraction=1/3., bandwidth_factor=3, min_bandwidth=1e-3):
+    self.evaluate    = evaluate
+    self.num_edges   = num_edges
+    self.num_choices = num_choices
+    self.eta         = eta
+    self.rng         = np.random.RandomState(rng) if rng is None or isinstance(rng, int) else rng
+    self.use_model   = use_model
+    self.top_n_percent    = top_n_percent
+    self.num_samples      = num_samples
+    self.random_fraction  = random_fraction
+    self.bandwidth_factor = bandwidth_factor
+    self.min_bandwidth    = min_bandwidth
+    self.min_points  = num_edges + 1
+    self.s_max       = int(math.floor(math.log(max_budget / min_budget) / math.log(eta) + 1e-9))
+    self.budgets     = [max_budget * eta ** (-i) for i in range(self.s_max, -1, -1)]
+    self.observations = dict() # budget -> ([configs], [losses])
+    self.total_cost  = 0.
+    self.history     = [] # (config, budget, loss)
+
+  def __repr__(self):
+    return ('{name}(budgets={budgets}, eta={eta}, model={use_model}, {num} evaluations, cost={cost:.1f})'.format(name=self.__class__.__name__, budgets=self.budgets, eta=self.eta, use_model=self.use_model, num=len(self.history), cost=self.total_cost))
+
+  def random_configs(self, num):
+    return self.rng.randint(0, self.num_choices, size=(num, self.num_edges))
+
+  def _model_budget(self):
+    budgets = [budget for budget, (configs, losses) in self.observations.items() if len(configs) >= self.min_points + 2]
+    return max(budgets) if len(budgets) > 0 else None
+
+  def sample_configs(self, num):
+    budget  = self._model_budget() if self.use_model else None
+    configs = self.random_configs(num)
+    if budget is None: return configs
+    data, losses = np.array(self.observations[budget][0]), np.array(self.observations[budget][1])
+    order  = np.argsort(losses, kind='stable')
+    n_good = max(self.min_points, (self.top_n_percent * len(order)) // 100)
+    n_bad  = max(self.min_points, ((100 - self.top_n_percent) * len(order)) // 100)
+    good   = CategoricalKDE(data[order[:n_good]], self.num_choices, self.min_bandwidth)
+    bad    = CategoricalKDE(data[order[-n_bad:]], self.num_choices, self.min_bandwidth)
+    for i in range(num):
+      if self.rng.rand() < self.random_fraction: continue
+      # perturb the randomly selected good points with the enlarged bandwidth, and keep the best candidate by l(x)/g(x)
+      centers   = good.data[self.rng.randint(0, len(good.data), size=self.num_samples)]
+      bandwidth = np.maximum(good.bandwidth * self.bandwidth_factor, self.min_bandwidth)
+      keep      = self.rng.rand(self.num_samples, self.num_edges) < (1 - bandwidth)
+      candidates = np.where(keep, centers, self.random_configs(self.num_samples))
+      scores    = good.pdf(candidates) / np.maximum(bad.pdf(candidates), 1e-32)
+      configs[i] = candidates[np.argmax(scores)]
+    return configs
+
+  # evaluate `configs` on `budget` in order and return their losses, the configurations exceeding the time budget are dropped.
+  # A configuration is kept iff the total cost with it <= time_budget, the same rule as R_EA.py, RANDOM.py, BOHB.py, simulator.py and the batched REINFORCE.
+  def _run_rung(self, configs, budget, time_budget):
+    losses, costs = self.evaluate(configs, budget)
+    keep = int((self.total_cost + np.cumsum(costs) <= time_budget).sum())
+    configs, losses = configs[:keep], losses[:keep]
+    self.total_cost += float(costs[:keep].sum())
+    xconfigs, xlosses = self.observations.setdefault(budget, ([], []))
+    for config, loss in zip(configs, losses):
+      if np.isnan(loss): continue
+      xconfigs.append( config.copy() )
+      xlosses.append( float(loss) )
+      self.history.append( (config.copy(), budget, float(loss)) )
+    return configs, losses, keep == len(costs)
+
+  # run `n_iterations` brackets of Hyperband, it stops early when the time budget is exhausted.
+  def run(self, n_iterations, time_budget=float('inf')):
+    for iteration in range(n_iterations):
+      s = self.s_max - (iteration % (self.s_max + 1))
+      num_configs = int(math.ceil( (self.s_max + 1) / (s + 1) * self.eta ** s ))
+      configs = self.sample_configs(num_configs)
+      for i in range(s + 1):
+        budget = self.budgets[self.s_max - s + i]
+        configs, losses, finished = self._run_rung(configs, budget, time_budget)
+        if not finished: return self.incumbent()
+        num_keep = int(math.floor(num_configs * self.eta ** (-i-1)))
+        if num_keep == 0 or len(configs) == 0: break
+        configs = configs[np.argsort(np.where(np.isnan(losses), np.inf, losses), kind='stable')[:num_keep]]
+    return self.incumbent()
+
+  # the configuration with the lowest loss on the largest evaluated budget, as the incumbent of hpbandster
+  def incumbent(self):
+    if len(self.history) == 0: return None, None
+    budget  = max(budget for _, budget, _ in self.history)
+    config, _, loss = min([x for x in self.history if x[1] == budget], key=lambda x: x[2])
+    return config, loss
+
+
+# The fidelity of a budget (in epochs) on cifar10-valid:
+#   'converged' : the same as `train_and_eval` in R_EA.py and BOHB.py, which uses the 12-epoch (converged LR) results for all budgets.
+#   'epoch'     : the results after `budget` epochs of the 200-epoch schedule.
+def evaluate_func(nas_bench, search_space, fidelity, rng):
+  op_indexes = np.array([OP2INDEX[op_name] for op_name in search_space], dtype=np.int64)
+  def evaluate(configs, budget):
+    indexes = nas_bench.query_index_by_code( ops2codes(op_indexes[configs]) )
+    assert (indexes >= 0).all(), 'can not find some configurations in the benchmark'
+    if fidelity == 'converged': info = nas_bench.get_more_info_batch(indexes, 'cifar10-valid', None, True, 'random', rng)
+    else                      : info = nas_bench.get_more_info_batch(indexes, 'cifar10-valid', int(round(budget))-1, False, 'random', rng)
+    return 100 - info['valid-accuracy'], info['train-all-time'] + info['valid-per-time']
+  return evaluate
+
+
+def main(xargs, nas_bench):
+  torch.set_num_threads( xargs.workers )
+  prepare_seed(xargs.rand_seed)
+  logger = prepare_logger(xargs)
+  assert xargs.dataset == 'cifar10', 'currently only support CIFAR-10'
+  assert nas_bench is not None, 'the in-process BOHB requires the NAS-Bench-201 API'
+
+  search_space = get_search_spaces('cell', xargs.search_space_name)
+  rng = np.random.RandomState(xargs.rand_seed)
+  optimizer = Hyperband(evaluate_func(nas_bench, search_space, xargs.fidelity, rng), num_edges(xargs.max_nodes), len(search_space),
+                        xargs.min_budget, xargs.max_budget, xargs.eta, rng, xargs.use_model > 0,
+                        num_samples=xargs.num_samples, random_fraction=xargs.random_fraction,
+                        bandwidth_factor=xargs.bandwidth_factor, min_bandwidth=xargs.min_bandwidth)
+  start_time = time.time()
+  config, loss = optimizer.run(xargs.n_iters, xargs.time_budget)
+  real_cost_time = time.time() - start_time
+  logger.log('{:} finish within {:.3f} s'.format(optimizer, real_cost_time))
+  if config is None: # the first rung already exceeds the time budget
+    logger.log('Did not evaluate any configuration within the time budget of {:} s.'.format(xargs.time_budget))
+    logger.log('-'*100)
+    logger.close()
+    return logger.log_dir, -1, real_cost_time
+  best_arch = code2str( int(ops2codes([OP2INDEX[search_space[x]] for x in config])) )
+  logger.log('Best found configuration: {:} with loss={:.3f}'.format(best_arch, loss))
+
+  info = nas_bench.query_by_arch( best_arch )
+  if info is None: logger.log('Did not find this architecture : {:}.'.format(best_arch))
+  else           : logger.log('{:}'.format(info))
+  logger.log('-'*100)
+  logger.close()
+  return logger.log_dir, nas_bench.query_index_by_arch( best_arch ), real_cost_time
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser("In-process BOHB")
+  parser.add_argument('--data_path',          type=str,   help='Path to dataset')
+  parser.add_argument('--dataset',            type=str,   choices=['cifar10', 'cifar100', 'ImageNet16-120'], help='Choose between Cifar10/100 and ImageNet-16.')
+  # channels and number-of-cells
+  parser.add_argument('--search_space_name',  type=str,   help='The search space name.')
+  parser.add_argument('--max_nodes',          type=int,   help='The maximum number of nodes.')
+  parser.add_argument('--channel',            type=int,   help='The number of channels.')
+  parser.add_argument('--num_cells',          type=int,   help='The number of cells in one stage.')
+  parser.add_argument('--time_budget',        type=int,   help='The total time cost budge for searching (in seconds).')
+  # Hyperband and BOHB
+  parser.add_argument('--use_model',        default=1,   type=int,   choices=[0,1], help='Use the KDE model (BOHB) or not (Hyperband).')
+  parser.add_argument('--fidelity',         default='converged', type=str, choices=['converged', 'epoch'], help='The fidelity of a budget.')
+  parser.add_argument('--min_budget',       default=12,  type=float, help='The minimum budget (in epochs).')
+  parser.add_argument('--max_budget',       default=200, type=float, help='The maximum budget (in epochs).')
+  parser.add_argument('--eta',              default=3,   type=int,   help='The reduction factor of successive halving.')
+  parser.add_argument('--min_bandwidth',    default=.3,  type=float, help='minimum bandwidth for KDE')
+  parser.add_argument('--num_samples',      default=64,  type=int,   help='number of samples for the acquisition function')
+  parser.add_argument('--random_fraction',  default=.33, type=float, help='fraction of random configurations')
+  parser.add_argument('--bandwidth_factor', default=3,   type=int,   help='factor multiplied to the bandwidth')
+  parser.add_argument('--n_iters',          default=100, type=int,   help='number of iterations for optimization method')
+  # log
+  parser.add_argument('--workers',            type=int,   default=2,    help='number of data loading workers (default: 2)')
+  parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
+  parser.add_argument('--arch_nas_dataset',   type=str,   help='The path to load the architecture dataset (tiny-nas-benchmark).')
+  parser.add_argument('--print_freq',         type=int,   help='print frequency (default: 200)')
+  parser.add_argument('--num_runs',           type=int,   default=500,  help='The number of runs if rand_seed < 0.')
+  parser.add_argument('--num_procs',          type=int,   default=1,    help='The number of processes for the runs if rand_seed < 0.')
+  parser.add_argument('--runs_seed',          type=int,   default=0,    help='The seed to generate the seeds of the runs, which should be kept when resuming.')
+  parser.add_argument('--rand_seed',          type=int,   default=-1,   help='manual seed')
+  args = parser.parse_args()
+  if args.arch_nas_dataset is None or not os.path.exists(args.arch_nas_dataset):
+    nas_bench = None
+  else:
+    print ('{:} build NAS-Benchmark-API from {:}'.format(time_string(), args.arch_nas_dataset))
+    nas_bench = API(args.arch_nas_dataset)
+  if args.rand_seed < 0:
+    records = run_experiments(main, args, nas_bench, args.num_runs, args.num_procs, seed=args.runs_seed)
+    print ('\n average time : {:.3f} s'.format(sum(record['search-time'] for record in records)/len(records)))
+    torch.save([record['index'] for record in records], Path(args.save_dir) / 'results.pth')
+  else:
+    main(args, nas_bench)
@@ -18,8 +18,11 @@ from procedures   import prepare_seed, prepare_logger, save_checkpoint, copy_che
 from utils        import get_model_infos, obtain_accuracy
 from log_utils    import AverageMeter, time_string, convert_secs2time
 from nas_201_api  import NASBench201API as API
+from nas_201_api.encoding import OP2INDEX, ops2codes
 from models       import CellStructure, get_search_spaces
 from R_EA import train_and_eval
+from simulator import Searcher, AsyncSimulator
+from driver import run_experiments
 
 
 class Policy(nn.Module):
@@ -81,6 +84,20 @@ class ExponentialMovingAverage(object):
     return self._numerator / self._denominator
 
 
+def select_actions(policy, batch_size):
+  m = Categorical(policy())
+  actions = m.sample((batch_size,)) # [batch_size, number-of-edges]
+  return m.log_prob(actions).sum(dim=-1), actions
+
+
+# the indexes in NAS-Bench-201 of a batch of actions, where the edges of the policy are in the same order as the integer code
+def actions2indexes(actions, search_space, nas_bench):
+  op_indexes = np.array([OP2INDEX[op_name] for op_name in search_space], dtype=np.int64)
+  indexes = nas_bench.query_index_by_code( ops2codes(op_indexes[actions.cpu().numpy()]) )
+  assert (indexes >= 0).all(), 'can not find some actions in the benchmark'
+  return indexes
+
+
 def select_action(policy):
   probs = policy()
   m = Categorical(probs)
@@ -89,6 +106,36 @@ def select_action(policy):
   return m.log_prob(action), action.cpu().tolist()
 
 
+class ReinforceSearcher(Searcher):
+  """REINFORCE with the propose/observe interface for AsyncSimulator.
+  The sampled actions are kept until their rewards are observed, and the log-probability of an action is
+  computed by the current policy when it is observed (the policy may be updated by other workers in the meantime).
+  """
+  def __init__(self, policy, optimizer, baseline):
+    self.policy    = policy
+    self.optimizer = optimizer
+    self.baseline  = baseline
+    self.actions   = dict()
+    self.steps     = 0
+
+  def propose(self):
+    with torch.no_grad():
+      _, action = select_action( self.policy )
+    arch = self.policy.generate_arch( action )
+    self.actions[id(arch)] = action
+    return arch
+
+  def observe(self, candidate, accuracy, cost):
+    action = torch.LongTensor( self.actions.pop(id(candidate)) )
+    self.baseline.update(accuracy)
+    log_prob = Categorical(self.policy()).log_prob(action)
+    policy_loss = ( -log_prob * (accuracy - self.baseline.value()) ).sum()
+    self.optimizer.zero_grad()
+    policy_loss.backward()
+    self.optimizer.step()
+    self.steps += 1
+
+
 def main(xargs, nas_bench):
   assert torch.cuda.is_available(), 'CUDA is not available.'
   torch.backends.cudnn.enabled   = True
@@ -96,7 +143,7 @@ def main(xargs, nas_bench):
   torch.backends.cudnn.deterministic = True
   torch.set_num_threads( xargs.workers )
   prepare_seed(xargs.rand_seed)
-  logger = prepare_logger(args)
+  logger = prepare_logger(xargs)
 
   assert xargs.dataset == 'cifar10', 'currently only support CIFAR-10'
   if xargs.data_path is not None:
@@ -143,8 +190,36 @@ def main(xargs, nas_bench):
   x_start_time = time.time()
   logger.log('Will start searching with time budget of {:} s.'.format(xargs.time_budget))
   total_steps, total_costs, trace = 0, 0, []
+  if xargs.sim_workers > 0: # the asynchronous REINFORCE with parallel workers on a simulated clock
+    searcher  = ReinforceSearcher(policy, optimizer, baseline)
+    simulator = AsyncSimulator(searcher, lambda arch: train_and_eval(arch, nas_bench, extra_info), xargs.sim_workers, xargs.time_budget)
+    trials, total_costs = simulator.run()
+    logger.log('{:} {:} finish : {:}'.format(time_string(), simulator, AsyncSimulator.summary(trials, total_costs, xargs.sim_workers)))
+    trace, total_steps = [(trial.accuracy, trial.candidate) for trial in trials], searcher.steps
+  elif xargs.batch_size > 1: # sample a batch of architectures per step, query them together and take one policy-gradient step
+    assert nas_bench is not None, 'batch_size > 1 requires the NAS-Bench-201 API'
+    rng = np.random.RandomState(xargs.rand_seed)
+    while total_costs < xargs.time_budget:
+      log_probs, actions = select_actions(policy, xargs.batch_size)
+      indexes = actions2indexes(actions, search_space, nas_bench)
+      info    = nas_bench.get_more_info_batch(indexes, 'cifar10-valid', None, True, 'random', rng)
+      rewards, costs = info['valid-accuracy'], info['train-all-time'] + info['valid-per-time']
+      # charge each sample against the time budget in order, the samples that exceed the budget are dropped
+      keep = int((total_costs + np.cumsum(costs) <= xargs.time_budget).sum())
+      trace += [(float(reward), nas_bench.arch(int(index))) for reward, index in zip(rewards[:keep], indexes[:keep])]
+      total_costs += float(costs[:keep].sum())
+      if keep == 0: break
+      baseline.update(float(rewards[:keep].mean()))
+      advantages  = torch.from_numpy(rewards[:keep] - baseline.value()).to(log_probs.dtype)
+      policy_loss = ( -log_probs[:keep] * advantages ).mean()
+      optimizer.zero_grad()
+      policy_loss.backward()
+      optimizer.step()
+      total_steps += 1
+      logger.log('step [{:3d}] : {:} samples : average-reward={:.3f} : policy_loss={:.4f} : {:}'.format(total_steps, keep, baseline.value(), policy_loss.item(), policy.genotype()))
+      if keep < xargs.batch_size: break
   #for istep in range(xargs.RL_steps):
-  while total_costs < xargs.time_budget:
+  while xargs.sim_workers <= 0 and xargs.batch_size <= 1 and total_costs < xargs.time_budget:
     start_time = time.time()
     log_prob, action = select_action( policy )
     arch   = policy.generate_arch( action )
@@ -192,27 +267,27 @@ if __name__ == '__main__':
   parser.add_argument('--learning_rate',      type=float, help='The learning rate for REINFORCE.')
   #parser.add_argument('--RL_steps',           type=int,   help='The steps for REINFORCE.')
   parser.add_argument('--EMA_momentum',       type=float, help='The momentum value for EMA.')
+  parser.add_argument('--batch_size',         type=int,   default=1,    help='The number of sampled architectures per policy-gradient step (1 means the original REINFORCE).')
   parser.add_argument('--time_budget',        type=int,   help='The total time cost budge for searching (in seconds).')
+  parser.add_argument('--sim_workers',        type=int,   default=0,    help='The number of asynchronous workers on a simulated clock (0 means the sequential search).')
   # log
   parser.add_argument('--workers',            type=int,   default=2,    help='number of data loading workers (default: 2)')
   parser.add_argument('--save_dir',           type=str,   help='Folder to save checkpoints and log.')
   parser.add_argument('--arch_nas_dataset',   type=str,   help='The path to load the architecture dataset (tiny-nas-benchmark).')
   parser.add_argument('--print_freq',         type=int,   help='print frequency (default: 200)')
+  parser.add_argument('--num_runs',           type=int,   default=500,  help='The number of runs if rand_seed < 0.')
+  parser.add_argument('--num_procs',          type=int,   default=1,    help='The number of processes for the runs if rand_seed < 0.')
+  parser.add_argument('--runs_seed',          type=int,   default=0,    help='The seed to generate the seeds of the runs, which should be kept when resuming.')
   parser.add_argument('--rand_seed',          type=int,   default=-1,   help='manual seed')
   args = parser.parse_args()
   #if args.rand_seed is None or args.rand_seed < 0: args.rand_seed = random.randint(1, 100000)
-  if args.arch_nas_dataset is None or not os.path.isfile(args.arch_nas_dataset):
+  if args.arch_nas_dataset is None or not os.path.exists(args.arch_nas_dataset):
     nas_bench = None
   else:
     print ('{:} build NAS-Benchmark-API from {:}'.format(time_string(), args.arch_nas_dataset))
     nas_bench = API(args.arch_nas_dataset)
   if args.rand_seed < 0:
-    save_dir, all_indexes, num = None, [], 500
-    for i in range(num):
-      print ('{:} : {:03d}/{:03d}'.format(time_string(), i, num))
-      args.rand_seed = random.randint(1, 100000)
-      save_dir, index = main(args, nas_bench)
-      all_indexes.append( index )
-    torch.save(all_indexes, save_dir / 'results.pth')
+    records = run_experiments(main, args, nas_bench, args.num_runs, args.num_procs, seed=args.runs_seed)
+    torch.save([record['index'] for record in records], Path(args.save_dir) / 'results.pth')
   else:
     main(args, nas_bench)
@@ -0,0 +1,105 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+##############################################################################
+# A discrete-event simulator of the asynchronous search with K parallel workers.
+# A search algorithm is written as a searcher with two functions:
+#   propose()                        : return the next candidate to be evaluated.
+#   observe(candidate, accuracy, cost) : receive the result of a finished candidate.
+# Each worker evaluates one candidate at a time, where the accuracy and time cost come from
+# `evaluate(candidate)` (e.g., `train_and_eval` with NAS-Bench-201), and the result is observed
+# when the simulated training finishes. The finish events are kept in a priority queue on a virtual clock,
+# so the wall-clock time of a search with K workers can be measured without any GPU.
+##############################################################################
+import heapq, random, collections
+
+
+Trial = collections.namedtuple('Trial', 'candidate accuracy cost start finish worker')
+
+
+class Searcher(object):
+
+  def propose(self):
+    raise NotImplementedError
+
+  def observe(self, candidate, accuracy, cost):
+    pass
+
+
+class RandomSearcher(Searcher):
+
+  def __init__(self, random_arch):
+    self.random_arch = random_arch
+
+  def propose(self):
+    return self.random_arch()
+
+
+class EvolutionSearcher(Searcher):
+  """The asynchronous version of regularized evolution (Real et al.):
+  the first `population_size` proposals are random, and then each proposal mutates the best of `sample_size`
+  random individuals in the population. When a child is observed, it replaces the oldest individual.
+  """
+  def __init__(self, population_size, sample_size, random_arch, mutate_arch):
+    self.population_size = population_size
+    self.sample_size     = sample_size
+    self.random_arch     = random_arch
+    self.mutate_arch     = mutate_arch
+    self.population      = collections.deque()
+    self.num_proposed    = 0
+
+  def propose(self):
+    self.num_proposed += 1
+    # some proposals of the initial population may be still in training, and the population can be empty
+    if self.num_proposed <= self.population_size or len(self.population) == 0:
+      return self.random_arch()
+    sample = [random.choice(self.population) for _ in range(self.sample_size)]
+    parent = max(sample, key=lambda x: x[1])
+    return self.mutate_arch(parent[0])
+
+  def observe(self, candidate, accuracy, cost):
+    self.population.append( (candidate, accuracy) )
+    if len(self.population) > self.population_size: self.population.popleft()
+
+
+class AsyncSimulator(object):
+
+  def __init__(self, searcher, evaluate, num_workers, time_budget):
+    assert num_workers > 0, 'invalid number of workers : {:}'.format(num_workers)
+    self.searcher    = searcher
+    self.evaluate    = evaluate
+    self.num_workers = num_workers
+    self.time_budget = time_budget
+
+  def __repr__(self):
+    return ('{name}({searcher}, workers={num_workers}, time_budget={time_budget})'.format(name=self.__class__.__name__, searcher=self.searcher.__class__.__name__, **self.__dict__))
+
+  # Return the list of finished trials (in the order of their finish time) and the simulated wall-clock time.
+  # A trial that can not finish within the time budget is dropped.
+  def run(self):
+    events, order, history, clock = [], 0, [], 0.
+    def submit(worker, now):
+      candidate = self.searcher.propose()
+      accuracy, cost = self.evaluate(candidate)
+      # `order` breaks the ties of the finish time in the submission order, so the candidates are never compared
+      heapq.heappush(events, (now + cost, order, worker, candidate, accuracy, cost))
+    for worker in range(self.num_workers):
+      submit(worker, clock)
+      order += 1
+    while len(events) > 0:
+      finish, _, worker, candidate, accuracy, cost = heapq.heappop(events)
+      if finish > self.time_budget: break # all other events finish even later
+      clock = finish
+      self.searcher.observe(candidate, accuracy, cost)
+      history.append( Trial(candidate, accuracy, cost, finish - cost, finish, worker) )
+      submit(worker, clock)
+      order += 1
+    return history, clock
+
+  @staticmethod
+  def summary(history, clock, num_workers):
+    serial_cost = sum(trial.cost for trial in history)
+    return {'trials'     : len(history),
+            'clock'      : clock,
+            'serial-cost': serial_cost,
+            'speedup'    : serial_cost / clock if clock > 0 else 0.,
+            'utilization': serial_cost / (clock * num_workers) if clock > 0 else 0.}
@@ -4,7 +4,7 @@
 
 import torch.nn as nn
 from copy import deepcopy
-from ..cell_operations import OPS
+from ..cell_operations import OPS, Identity, is_zero_op
 
 
 # Cell for NAS-Bench-201
@@ -34,6 +34,33 @@ class InferCell(nn.Module):
     self.nodes   = len(genotype)
     self.in_dim  = C_in
     self.out_dim = C_out
+    self.plan    = self.compile_plan()
+    self.zero_layers = [_il for _il, layer in enumerate(self.layers) if getattr(layer, 'is_zero', False)]
+
+  # Compile the genotype into a static plan, which is a list of (node, [(layer-index, input-node)], [input-node]):
+  #   * the `none` edges are dropped, except one edge for a node whose inputs are all `none` (to keep its shape),
+  #     and the plan is used only if all `none` layers are symbolic zeros (checked in the forward pass);
+  #   * the `skip_connect` edges (the Identity layers) are folded into the additions, which are the last list;
+  #   * the nodes that do not reach the output are removed.
+  # The layers are kept in `self.layers`, so that the state dict is the same as before.
+  def compile_plan(self):
+    edges = [[] for _ in range(self.nodes)]
+    for i, (node_layers, node_innods) in enumerate(zip(self.node_IX, self.node_IN)):
+      live = [(_il, _ii) for _il, _ii in zip(node_layers, node_innods) if not getattr(self.layers[_il], 'is_zero', False)]
+      if len(live) == 0 and len(node_layers) > 0: # all inputs are none, keep the one from the smallest node
+        live = [min(zip(node_layers, node_innods), key=lambda x: x[1])]
+      edges[i+1] = live
+    needed = [False] * (self.nodes - 1) + [True]
+    for i in range(self.nodes-1, 0, -1):
+      if not needed[i]: continue
+      for _, _ii in edges[i]: needed[_ii] = True
+    plan = []
+    for i in range(1, self.nodes):
+      if not needed[i]: continue
+      layers = [(_il, _ii) for _il, _ii in edges[i] if not isinstance(self.layers[_il], Identity)]
+      skips  = [_ii for _il, _ii in edges[i] if isinstance(self.layers[_il], Identity)]
+      plan.append( (i, layers, skips) )
+    return plan
 
   def extra_repr(self):
     string = 'info :: nodes={nodes}, inC={in_dim}, outC={out_dim}'.format(**self.__dict__)
@@ -45,6 +72,20 @@ class InferCell(nn.Module):
     return string + ', [{:}]'.format( ' | '.join(laystr) ) + ', {:}'.format(self.genotype.tostr())
 
   def forward(self, inputs):
+    if not all(is_zero_op(self.layers[_il]) for _il in self.zero_layers): return self.forward_full(inputs)
+    nodes = {0: inputs}
+    for i, node_layers, node_skips in self.plan:
+      node_feature = None
+      for _il, _ii in node_layers:
+        feature = self.layers[_il](nodes[_ii])
+        node_feature = feature if node_feature is None else node_feature + feature
+      for _ii in node_skips:
+        node_feature = nodes[_ii] if node_feature is None else node_feature + nodes[_ii]
+      nodes[i] = node_feature
+    return nodes[self.nodes-1]
+
+  # compute all edges of the genotype, including the `none` edges that are not symbolic zeros
+  def forward_full(self, inputs):
     nodes = [inputs]
     for i, (node_layers, node_innods) in enumerate(zip(self.node_IX,self.node_IN)):
       node_feature = sum( self.layers[_il](nodes[_ii]) for _il, _ii in zip(node_layers, node_innods) )
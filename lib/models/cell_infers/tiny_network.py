@@ -46,6 +46,21 @@ class TinyNetwork(nn.Module):
   def extra_repr(self):
     return ('{name}(C={_C}, N={_layerN}, L={_Layer})'.format(name=self.__class__.__name__, **self.__dict__))
 
+  # Export the network as a static graph for inference, where the cells follow their compiled plans:
+  #   'trace' : TorchScript by torch.jit.trace with the example `inputs`;
+  #   'fx'    : torch.fx.symbolic_trace (PyTorch >= 1.8).
+  def export(self, inputs, mode='trace'):
+    assert not self.training, 'please export the network in the evaluation mode'
+    if mode == 'trace':
+      with torch.no_grad():
+        return torch.jit.trace(self, inputs)
+    elif mode == 'fx':
+      if not hasattr(torch, 'fx'): raise ValueError('torch.fx is not available in PyTorch {:}'.format(torch.__version__))
+      import torch.fx
+      return torch.fx.symbolic_trace(self)
+    else:
+      raise ValueError('invalid export mode : {:}'.format(mode))
+
   def forward(self, inputs):
     feature = self.stem(inputs)
     for i, cell in enumerate(self.cells):
@@ -4,7 +4,7 @@
 import torch
 import torch.nn as nn
 
-__all__ = ['OPS', 'ResNetBasicblock', 'SearchSpaceNames']
+__all__ = ['OPS', 'ResNetBasicblock', 'SearchSpaceNames', 'is_zero_op', 'sum_nonzero', 'set_symbolic_zero']
 
 OPS = {
   'none'         : lambda C_in, C_out, stride, affine, track_running_stats: Zero(C_in, C_out, stride),
@@ -29,6 +29,27 @@ SearchSpaceNames = {'connect-nas'  : CONNECT_NAS_BENCHMARK,
                     'darts'        : DARTS_SPACE}
 
 
+# Symbolic zero: in the summation of a node, the output of a `Zero` op is not computed and represented by None,
+# and a zero tensor is materialized (by `Zero.forward`) only if the node receives nothing else.
+# It is an attribute of each `Zero` op (checked in the forward pass), and `set_symbolic_zero(model, False)` computes
+# and adds the zero tensors of this model as usual, which is used to benchmark the difference.
+def set_symbolic_zero(module, enabled):
+  for m in module.modules():
+    if isinstance(m, Zero): m.symbolic = bool(enabled)
+
+
+def is_zero_op(op):
+  return getattr(op, 'is_zero', False) and getattr(op, 'symbolic', False)
+
+
+# Sum the features of a node, where None is a symbolic zero. The scalars (e.g., the non-selected weights in GDAS)
+# are broadcasted, and `zero_func()` materializes the zero tensor if there is no feature map.
+def sum_nonzero(features, zero_func):
+  features = [x for x in features if x is not None]
+  if not any(x.dim() > 0 for x in features): features.append( zero_func() )
+  return sum(features)
+
+
 class ReLUConvBN(nn.Module):
 
   def __init__(self, C_in, C_out, kernel_size, stride, padding, dilation, affine, track_running_stats=True):
@@ -142,16 +163,18 @@ class Zero(nn.Module):
     self.C_out  = C_out
     self.stride = stride
     self.is_zero = True
+    self.symbolic = True
 
+  # Allocate the zeros of the output shape, instead of multiplying (a strided slice of) x by zero.
+  # The output shape is the same as before: strided if C_in == C_out, otherwise the spatial size of x is kept.
+  # Unlike x.mul(0.), the zeros are not linked to x in autograd, so x receives no gradient (instead of a zero gradient) from this op.
   def forward(self, x):
-    if self.C_in == self.C_out:
-      if self.stride == 1: return x.mul(0.)
-      else               : return x[:,:,::self.stride,::self.stride].mul(0.)
-    else:
-      shape = list(x.shape)
-      shape[1] = self.C_out
-      zeros = x.new_zeros(shape, dtype=x.dtype, device=x.device)
-      return zeros
+    shape = list(x.shape)
+    shape[1] = self.C_out
+    if self.C_in == self.C_out and self.stride > 1:
+      shape[2] = (shape[2] + self.stride - 1) // self.stride
+      shape[3] = (shape[3] + self.stride - 1) // self.stride
+    return x.new_zeros(shape)
 
   def extra_repr(self):
     return 'C_in={C_in}, C_out={C_out}, stride={stride}'.format(**self.__dict__)
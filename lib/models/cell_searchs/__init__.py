@@ -7,7 +7,7 @@ from .search_model_gdas     import TinyNetworkGDAS
 from .search_model_setn     import TinyNetworkSETN
 from .search_model_enas     import TinyNetworkENAS
 from .search_model_random   import TinyNetworkRANDOM
-from .genotypes             import Structure as CellStructure, architectures as CellArchitectures
+from .genotypes             import Structure as CellStructure, StructureSpace as CellStructureSpace, architectures as CellArchitectures
 # NASNet-based macro structure
 from .search_model_gdas_nasnet import NASNetworkGDAS
 from .search_model_darts_nasnet import NASNetworkDARTS
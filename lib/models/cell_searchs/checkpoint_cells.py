@@ -0,0 +1,61 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# Activation checkpointing for the search cells of DARTS (NAS201SearchCell and NASNetSearchCell).
+# A checkpointed cell only keeps its inputs for backward, and its forward is re-computed during backward,
+# so that the activations of all candidate ops in a cell are not kept, at the cost of one more forward of this cell.
+# The BN layers in the re-computation should not update their running statistics again,
+# thus they are saved before the re-computation and restored after it.
+# Configure it by stages, e.g., `network.set_checkpoint([True, True, False])` for the cells in the first two stages.
+# The non-reentrant checkpointing (PyTorch >= 1.11) is used, which supports `torch.autograd.grad` (e.g., in DARTS-V2),
+# and the reentrant one of the older PyTorch only supports `backward`.
+############################################################################################
+import inspect
+import torch
+import torch.nn as nn
+from contextlib import contextmanager
+from torch.utils.checkpoint import checkpoint
+
+
+NON_REENTRANT = 'use_reentrant' in inspect.signature(checkpoint).parameters
+
+
+@contextmanager
+def frozen_bn_statistics(module):
+  bns = [m for m in module.modules() if isinstance(m, nn.modules.batchnorm._BatchNorm) and m.track_running_stats]
+  states = [(m.running_mean.clone(), m.running_var.clone(), None if m.num_batches_tracked is None else m.num_batches_tracked.clone()) for m in bns]
+  try:
+    yield
+  finally:
+    with torch.no_grad():
+      for m, (mean, var, num) in zip(bns, states):
+        m.running_mean.copy_(mean)
+        m.running_var.copy_(var)
+        if num is not None: m.num_batches_tracked.copy_(num)
+
+
+# Call `function(*inputs)` of the `cell` with checkpointing. The first call is the forward and the others are re-computations,
+# which does not depend on whether the re-computation of torch.utils.checkpoint is reentrant or not.
+def checkpoint_cell(cell, function, *inputs):
+  calls = [0]
+  def run(*xinputs):
+    calls[0] += 1
+    if calls[0] == 1: return function(*xinputs)
+    with frozen_bn_statistics(cell):
+      return function(*xinputs)
+  if NON_REENTRANT: return checkpoint(run, *inputs, use_reentrant=False)
+  else            : return checkpoint(run, *inputs)
+
+
+# Return the flags of checkpointing for each cell, where `stages` is a bool (or a list of one bool) for all cells or a list of bools for each stage.
+# A stage starts from a reduction layer (or the first cell), i.e., stage k has the cells after the k-th reduction layer.
+def stage_flags(reductions, stages):
+  num_stages = sum(reductions[1:]) + 1
+  if isinstance(stages, bool) or isinstance(stages, int): stages = [bool(stages)] * num_stages
+  elif len(stages) == 1: stages = list(stages) * num_stages
+  assert len(stages) == num_stages, 'invalid stages : {:} vs. {:} stages'.format(stages, num_stages)
+  flags, stage = [], 0
+  for index, reduction in enumerate(reductions):
+    if reduction and index > 0: stage += 1
+    flags.append( bool(stages[stage]) )
+  return flags
@@ -0,0 +1,99 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The fused execution of the mixed operations in NAS201SearchCell.forward (DARTS).
+# All edges from the same node j (i.e., i<-j for i > j) read the same input, and they have the same candidates, thus:
+#   * the ReLUConvBN candidates with the same convolution setting are computed by one convolution, whose weight is
+#     the concatenation of the weights of these candidates on all edges, followed by one batch normalization;
+#   * the candidates without parameters and buffers (e.g., skip_connect and avg_pool_3x3) are computed once;
+#   * the other candidates are computed edge by edge as in `forward`, where the symbolic `none` candidates are skipped
+#     (checked in the forward pass, see `is_zero_op` in cell_operations.py), since they contribute zero.
+# The outputs of each group are reduced by the architecture weights with one einsum.
+# The plan only keeps the names and indexes, so that it is valid for the replicas in nn.DataParallel.
+############################################################################################
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from collections import namedtuple
+from ..cell_operations import ReLUConvBN, is_zero_op
+
+
+# targets : the edge names of i<-source, edges : their indexes in weightss, convs : the op indexes of each convolution group
+SourcePlan = namedtuple('SourcePlan', 'source targets edges convs shared others')
+
+
+def conv_key(op):
+  if not isinstance(op, ReLUConvBN) or len(op.op) != 3: return None
+  relu, conv, bn = op.op
+  if not isinstance(relu, nn.ReLU) or type(conv) is not nn.Conv2d or type(bn) is not nn.BatchNorm2d: return None
+  if conv.bias is not None or conv.groups != 1 or getattr(conv, 'padding_mode', 'zeros') != 'zeros': return None
+  return (conv.in_channels, conv.out_channels, conv.kernel_size, conv.stride, conv.padding, conv.dilation,
+          bn.eps, bn.momentum, bn.affine, bn.track_running_stats)
+
+
+def is_shared(op):
+  return len(list(op.parameters())) == 0 and len(list(op.buffers())) == 0
+
+
+def fused_plan(cell):
+  plans = []
+  for j in range(cell.max_nodes - 1):
+    targets = ['{:}<-{:}'.format(i, j) for i in range(j+1, cell.max_nodes)]
+    groups, shared, others = dict(), [], []
+    for k, op in enumerate(cell.edges[targets[0]]):
+      key = conv_key(op)
+      # all edges from the same node should have the same kind of candidates
+      if any(conv_key(cell.edges[target][k]) != key or type(cell.edges[target][k]) is not type(op) for target in targets):
+        others.append( k )
+      elif getattr(op, 'is_zero', False): others.append( k ) # skipped in fused_forward if it is symbolic
+      elif key is not None              : groups.setdefault(key, []).append( k )
+      elif is_shared(op)                : shared.append( k )
+      else                              : others.append( k )
+    plans.append( SourcePlan(j, targets, [cell.edge2index[target] for target in targets], list(groups.values()), shared, others) )
+  return plans
+
+
+def fused_batch_norm(x, bns):
+  bn = bns[0]
+  factor = 0.0 if bn.momentum is None else bn.momentum
+  if bn.training and bn.track_running_stats:
+    for xbn in bns:
+      if xbn.num_batches_tracked is not None: xbn.num_batches_tracked += 1
+    if bn.momentum is None and bn.num_batches_tracked is not None: factor = 1.0 / float(bn.num_batches_tracked)
+  use_running = bn.track_running_stats
+  running_mean = torch.cat([xbn.running_mean for xbn in bns]) if use_running else None
+  running_var  = torch.cat([xbn.running_var  for xbn in bns]) if use_running else None
+  weight = torch.cat([xbn.weight for xbn in bns]) if bn.affine else None
+  bias   = torch.cat([xbn.bias   for xbn in bns]) if bn.affine else None
+  out = F.batch_norm(x, running_mean, running_var, weight, bias, bn.training or not bn.track_running_stats, factor, bn.eps)
+  if bn.training and use_running: # write the updated statistics back to each BN
+    with torch.no_grad():
+      for xbn, mean, var in zip(bns, running_mean.chunk(len(bns)), running_var.chunk(len(bns))):
+        xbn.running_mean.copy_(mean)
+        xbn.running_var.copy_(var)
+  return out
+
+
+def fused_forward(cell, inputs, weightss, plans):
+  nodes, inter_nodes = [inputs], [[] for _ in range(cell.max_nodes)]
+  for plan in plans:
+    x, outs = nodes[plan.source], []
+    edge_weights = weightss[plan.edges] # [num-targets, num-ops]
+    if len(plan.convs) > 0: relu_x = F.relu(x)
+    for op_indexes in plan.convs:
+      ops   = [cell.edges[target][k].op for target in plan.targets for k in op_indexes]
+      conv  = ops[0][1]
+      xconv = F.conv2d(relu_x, torch.cat([op[1].weight for op in ops]), None, conv.stride, conv.padding, conv.dilation)
+      xconv = fused_batch_norm(xconv, [op[2] for op in ops])
+      N, _, H, W = xconv.shape
+      xconv = xconv.view(N, len(plan.targets), len(op_indexes), -1, H, W)
+      outs.append( torch.einsum('nekchw,ek->nechw', xconv, edge_weights[:, op_indexes]) )
+    if len(plan.shared) > 0:
+      xshared = torch.stack([cell.edges[plan.targets[0]][k](x) for k in plan.shared], dim=1)
+      outs.append( torch.einsum('nkchw,ek->nechw', xshared, edge_weights[:, plan.shared]) )
+    for e, target in enumerate(plan.targets):
+      xsum = sum(out[:, e] for out in outs) + sum(cell.edges[target][k](x) * edge_weights[e, k] for k in plan.others if not is_zero_op(cell.edges[target][k]))
+      if not torch.is_tensor(xsum): xsum = cell.zero_node(plan.source + 1 + e, inputs) # all candidates are none
+      inter_nodes[plan.source + 1 + e].append( xsum )
+    nodes.append( sum(inter_nodes[plan.source + 1]) )
+  return nodes[-1]
@@ -1,7 +1,6 @@
 ##################################################
 # Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2019 #
 ##################################################
-from copy import deepcopy
 
 
 
@@ -22,21 +21,68 @@ def get_combination(space, num):
   
 
 
+"""
+A cell structure, where nodes[i] is a tuple of (op-name, input-node-index) pairs for the (i+1)-th node.
+It is immutable and hashable (two structures are equal if they have the same nodes), so that it can be used as a dict key,
+and the string (tostr), the unique string (to_unique_str) and the integer encoding (tocode) are computed only once.
+The genotype is validated once in the constructor, and `check=False` skips the validation for the trusted genotypes.
+"""
 class Structure:
 
-  def __init__(self, genotype):
-    assert isinstance(genotype, list) or isinstance(genotype, tuple), 'invalid class of genotype : {:}'.format(type(genotype))
-    self.node_num = len(genotype) + 1
-    self.nodes    = []
-    self.node_N   = []
-    for idx, node_info in enumerate(genotype):
-      assert isinstance(node_info, list) or isinstance(node_info, tuple), 'invalid class of node_info : {:}'.format(type(node_info))
-      assert len(node_info) >= 1, 'invalid length : {:}'.format(len(node_info))
-      for node_in in node_info:
-        assert isinstance(node_in, list) or isinstance(node_in, tuple), 'invalid class of in-node : {:}'.format(type(node_in))
-        assert len(node_in) == 2 and node_in[1] <= idx, 'invalid in-node : {:}'.format(node_in)
-      self.node_N.append( len(node_info) )
-      self.nodes.append( tuple(deepcopy(node_info)) )
+  __slots__ = ('node_num', 'nodes', 'node_N', '_cache')
+
+  def __init__(self, genotype, check=True):
+    if check:
+      assert isinstance(genotype, list) or isinstance(genotype, tuple), 'invalid class of genotype : {:}'.format(type(genotype))
+      for idx, node_info in enumerate(genotype):
+        assert isinstance(node_info, list) or isinstance(node_info, tuple), 'invalid class of node_info : {:}'.format(type(node_info))
+        assert len(node_info) >= 1, 'invalid length : {:}'.format(len(node_info))
+        for node_in in node_info:
+          assert isinstance(node_in, list) or isinstance(node_in, tuple), 'invalid class of in-node : {:}'.format(type(node_in))
+          assert len(node_in) == 2 and node_in[1] <= idx, 'invalid in-node : {:}'.format(node_in)
+    # the op-name and the index are immutable, so re-packing them into tuples is enough (no deepcopy)
+    nodes = tuple( tuple( (op, xin) for op, xin in node_info ) for node_info in genotype )
+    object.__setattr__(self, 'node_num', len(nodes) + 1)
+    object.__setattr__(self, 'nodes'   , nodes)
+    object.__setattr__(self, 'node_N'  , tuple(len(node_info) for node_info in nodes))
+    object.__setattr__(self, '_cache'  , dict())
+
+  def __setattr__(self, name, value):
+    raise TypeError('{:} is immutable, can not set {:}'.format(self.__class__.__name__, name))
+
+  def __delattr__(self, name):
+    raise TypeError('{:} is immutable, can not delete {:}'.format(self.__class__.__name__, name))
+
+  def __eq__(self, other):
+    return isinstance(other, Structure) and self.nodes == other.nodes
+
+  def __ne__(self, other):
+    return not self.__eq__(other)
+
+  def __hash__(self):
+    return hash(self.nodes)
+
+  def __reduce__(self):
+    return (Structure, (self.nodes, False))
+
+  # support to unpickle the structures saved by the old versions, whose state is the __dict__
+  def __setstate__(self, state):
+    if isinstance(state, tuple): state = state[-1]
+    Structure.__init__(self, state['nodes'], False)
+
+  def __copy__(self):
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  # return a new structure, where the op of the `edge_id`-th input of the `node_id`-th node (0-based) is replaced by `op_name`.
+  def replace_op(self, node_id, edge_id, op_name):
+    nodes = list( self.nodes )
+    node_info = list( nodes[node_id] )
+    node_info[edge_id] = (op_name, node_info[edge_id][1])
+    nodes[node_id] = tuple( node_info )
+    return Structure(nodes, False)
 
   def tolist(self, remove_str):
     # convert this class to the list, if remove_str is 'none', then remove the 'none' operation.
@@ -56,12 +102,43 @@ class Structure:
     return self.nodes[index]
 
   def tostr(self):
-    strings = []
-    for node_info in self.nodes:
-      string = '|'.join([x[0]+'~{:}'.format(x[1]) for x in node_info])
-      string = '|{:}|'.format(string)
-      strings.append( string )
-    return '+'.join(strings)
+    if 'str' not in self._cache:
+      strings = []
+      for node_info in self.nodes:
+        string = '|'.join([x[0]+'~{:}'.format(x[1]) for x in node_info])
+        string = '|{:}|'.format(string)
+        strings.append( string )
+      self._cache['str'] = '+'.join(strings)
+    return self._cache['str']
+
+  # The integer encoding of a structure, whose i-th node has exactly one op from each of the 0~(i-1)-th nodes in order.
+  # The op indexes (in `op_names`) of all edges form a base-len(op_names) integer, where the first edge is the most significant digit.
+  # For NAS-Bench-201 (op_names = NAS_BENCH_201), it is the same as the encoding in nas_201_api/encoding.py.
+  def tocode(self, op_names):
+    key = ('code', tuple(op_names))
+    if key not in self._cache:
+      code = 0
+      for i, node_info in enumerate(self.nodes):
+        if len(node_info) != i+1: raise ValueError('the {:}-th node should have {:} inputs instead of {:}'.format(i+1, i+1, node_info))
+        for j, (op, xin) in enumerate(node_info):
+          if xin != j: raise ValueError('the {:}-th input of the {:}-th node should come from the {:}-th node : {:}'.format(j, i+1, j, node_info))
+          code = code * len(op_names) + op_names.index(op)
+      self._cache[key] = code
+    return self._cache[key]
+
+  @staticmethod
+  def fromcode(code, op_names, max_nodes):
+    num_edges = max_nodes * (max_nodes - 1) // 2
+    assert 0 <= code < len(op_names) ** num_edges, 'invalid code : {:}'.format(code)
+    ops = [None] * num_edges
+    for i in range(num_edges-1, -1, -1):
+      code, index = divmod(code, len(op_names))
+      ops[i] = op_names[index]
+    genotypes, k = [], 0
+    for i in range(1, max_nodes):
+      genotypes.append( tuple( (ops[k+j], j) for j in range(i) ) )
+      k += i
+    return Structure(genotypes, False)
 
   def check_valid(self):
     nodes = {0: True}
@@ -77,6 +154,11 @@ class Structure:
   def to_unique_str(self, consider_zero=False):
     # this is used to identify the isomorphic cell, which rerquires the prior knowledge of operation
     # two operations are special, i.e., none and skip_connect
+    key = ('unique', consider_zero)
+    if key not in self._cache: self._cache[key] = self._to_unique_str(consider_zero)
+    return self._cache[key]
+
+  def _to_unique_str(self, consider_zero):
     nodes = {0: '0'}
     for i_node, node_info in enumerate(self.nodes):
       cur_node = []
@@ -102,7 +184,7 @@ class Structure:
     return True
 
   def __repr__(self):
-    return ('{name}({node_num} nodes with {node_info})'.format(name=self.__class__.__name__, node_info=self.tostr(), **self.__dict__))
+    return ('{name}({node_num} nodes with {node_info})'.format(name=self.__class__.__name__, node_num=self.node_num, node_info=self.tostr()))
 
   def __len__(self):
     return len(self.nodes) + 1
@@ -113,15 +195,19 @@ class Structure:
   @staticmethod
   def str2structure(xstr):
     assert isinstance(xstr, str), 'must take string (not {:}) as input'.format(type(xstr))
-    nodestrs = xstr.split('+')
     genotypes = []
-    for i, node_str in enumerate(nodestrs):
-      inputs = list(filter(lambda x: x != '', node_str.split('|')))
-      for xinput in inputs: assert len(xinput.split('~')) == 2, 'invalid input length : {:}'.format(xinput)
-      inputs = ( xi.split('~') for xi in inputs )
-      input_infos = tuple( (op, int(IDX)) for (op, IDX) in inputs)
-      genotypes.append( input_infos )
-    return Structure( genotypes )
+    for i, node_str in enumerate(xstr.split('+')):
+      input_infos = []
+      for xinput in node_str.split('|'):
+        if xinput == '': continue
+        op_and_index = xinput.split('~')
+        assert len(op_and_index) == 2, 'invalid input length : {:}'.format(xinput)
+        xin = int(op_and_index[1])
+        assert xin <= i, 'invalid in-node : {:}'.format(xinput)
+        input_infos.append( (op_and_index[0], xin) )
+      assert len(input_infos) >= 1, 'invalid node string : {:}'.format(node_str)
+      genotypes.append( tuple(input_infos) )
+    return Structure( genotypes, False )
 
   @staticmethod
   def str2fullstructure(xstr, default_name='none'):
@@ -144,21 +230,70 @@ class Structure:
   def gen_all(search_space, num, return_ori):
     assert isinstance(search_space, list) or isinstance(search_space, tuple), 'invalid class of search-space : {:}'.format(type(search_space))
     assert num >= 2, 'There should be at least two nodes in a neural cell instead of {:}'.format(num)
-    all_archs = get_combination(search_space, 1)
-    for i, arch in enumerate(all_archs):
-      all_archs[i] = [ tuple(arch) ]
-  
-    for inode in range(2, num):
-      cur_nodes = get_combination(search_space, inode)
-      new_all_archs = []
-      for previous_arch in all_archs:
-        for cur_node in cur_nodes:
-          new_all_archs.append( previous_arch + [tuple(cur_node)] )
-      all_archs = new_all_archs
+    all_archs = StructureSpace(search_space, num)
     if return_ori:
-      return all_archs
+      return [list(arch.nodes) for arch in all_archs]
     else:
-      return [Structure(x) for x in all_archs]
+      return list(all_archs)
+
+
+"""
+A lazy enumerator of all cells with `max_nodes` nodes, where each edge selects one op from `op_names`.
+The rank of a cell is its integer encoding (see `Structure.tocode`), which is also its position in `Structure.gen_all`.
+It does not materialize the space: `space[rank]` and `space.rank(arch)` are computed on the fly,
+and `space.shard(i, k)` only enumerates the i-th of the k contiguous shards.
+"""
+class StructureSpace(object):
+
+  def __init__(self, op_names, max_nodes):
+    assert max_nodes >= 2, 'There should be at least two nodes in a neural cell instead of {:}'.format(max_nodes)
+    self.op_names  = tuple(op_names)
+    self.max_nodes = max_nodes
+    self.num_edges = max_nodes * (max_nodes - 1) // 2
+    self.total     = len(self.op_names) ** self.num_edges
+
+  def __repr__(self):
+    return ('{name}({total} archs with {max_nodes} nodes and ops={op_names})'.format(name=self.__class__.__name__, **self.__dict__))
+
+  def __len__(self):
+    return self.total
+
+  def __getitem__(self, rank):
+    if rank < 0: rank += self.total
+    if not 0 <= rank < self.total: raise IndexError('invalid rank : {:} vs {:}'.format(rank, self.total))
+    return Structure.fromcode(rank, self.op_names, self.max_nodes)
+
+  # return the rank of an architecture (a Structure or its string), raise ValueError if it is not in this space
+  def rank(self, arch):
+    if isinstance(arch, str): arch = Structure.str2structure(arch)
+    if len(arch) != self.max_nodes: raise ValueError('{:} should have {:} nodes'.format(arch, self.max_nodes))
+    return arch.tocode(self.op_names)
+
+  def __contains__(self, arch):
+    try:
+      self.rank(arch)
+      return True
+    except ValueError:
+      return False
+
+  def __iter__(self):
+    return self.iterate(0, self.total)
+
+  # yield the architectures whose ranks are in [start, end)
+  def iterate(self, start, end):
+    for rank in range(start, end):
+      yield Structure.fromcode(rank, self.op_names, self.max_nodes)
+
+  # return the ranks in the `index`-th of the `num_shards` contiguous shards, which have almost the same size
+  def shard_range(self, index, num_shards):
+    assert 0 <= index < num_shards, 'invalid shard : {:} / {:}'.format(index, num_shards)
+    return range(self.total * index // num_shards, self.total * (index+1) // num_shards)
+
+  # yield the (rank, architecture) pairs in the `index`-th of the `num_shards` shards
+  def shard(self, index, num_shards):
+    ranks = self.shard_range(index, num_shards)
+    for rank, arch in zip(ranks, self.iterate(ranks.start, ranks.stop)):
+      yield rank, arch
 
 
 
@@ -6,7 +6,9 @@ import warnings
 import torch.nn as nn
 import torch.nn.functional as F
 from copy import deepcopy
-from ..cell_operations import OPS
+from ..cell_operations import OPS, is_zero_op, sum_nonzero
+from .fused_cells      import fused_plan, fused_forward
+from .sparse_cells     import sparse_gdas_forward
 
 
 # This module is used for NAS-Bench-201, represents a small search space with a complete DAG
@@ -31,22 +33,35 @@ class NAS201SearchCell(nn.Module):
     self.edge_keys  = sorted(list(self.edges.keys()))
     self.edge2index = {key:i for i, key in enumerate(self.edge_keys)}
     self.num_edges  = len(self.edges)
+    self.fused      = False
+    self._fused_plan = None
 
   def extra_repr(self):
     string = 'info :: {max_nodes} nodes, inC={in_dim}, outC={out_dim}'.format(**self.__dict__)
     return string
 
+  # materialize the zero output of the node i, if all its inputs are symbolic zeros (see sum_nonzero in cell_operations.py)
+  def zero_node(self, i, inputs):
+    zero_op = [op for op in self.edges['{:}<-0'.format(i)] if getattr(op, 'is_zero', False)][0]
+    return zero_op(inputs)
+
   def forward(self, inputs, weightss):
+    if self.fused: return self.forward_fused(inputs, weightss)
     nodes = [inputs]
     for i in range(1, self.max_nodes):
       inter_nodes = []
       for j in range(i):
         node_str = '{:}<-{:}'.format(i, j)
         weights  = weightss[ self.edge2index[node_str] ]
-        inter_nodes.append( sum( layer(nodes[j]) * w for layer, w in zip(self.edges[node_str], weights) ) )
-      nodes.append( sum(inter_nodes) )
+        inter_nodes.extend( layer(nodes[j]) * w for layer, w in zip(self.edges[node_str], weights) if not is_zero_op(layer) )
+      nodes.append( sum_nonzero(inter_nodes, lambda: self.zero_node(i, inputs)) )
     return nodes[-1]
 
+  # the same as forward, but the candidates of the edges from the same node are computed together (see fused_cells.py)
+  def forward_fused(self, inputs, weightss):
+    if self._fused_plan is None: self._fused_plan = fused_plan(self)
+    return fused_forward(self, inputs, weightss, self._fused_plan)
+
   # GDAS
   def forward_gdas(self, inputs, hardwts, index):
     nodes   = [inputs]
@@ -56,11 +71,15 @@ class NAS201SearchCell(nn.Module):
         node_str = '{:}<-{:}'.format(i, j)
         weights  = hardwts[ self.edge2index[node_str] ]
         argmaxs  = index[ self.edge2index[node_str] ].item()
-        weigsum  = sum( weights[_ie] * edge(nodes[j]) if _ie == argmaxs else weights[_ie] for _ie, edge in enumerate(self.edges[node_str]) )
-        inter_nodes.append( weigsum )
-      nodes.append( sum(inter_nodes) )
+        # the selected zero op contributes weights[argmaxs] * 0, whose value and gradients are zero
+        inter_nodes.extend( weights[_ie] * edge(nodes[j]) if _ie == argmaxs else weights[_ie] for _ie, edge in enumerate(self.edges[node_str]) if _ie != argmaxs or not is_zero_op(edge) )
+      nodes.append( sum_nonzero(inter_nodes, lambda: self.zero_node(i, inputs)) )
     return nodes[-1]
 
+  # GDAS with a GDASPlan shared by all cells, which skips the `none` edges and the nodes not reaching the output (see sparse_cells.py)
+  def forward_gdas_sparse(self, inputs, plan):
+    return sparse_gdas_forward(self, inputs, plan)
+
   # joint
   def forward_joint(self, inputs, weightss):
     nodes = [inputs]
@@ -70,9 +89,8 @@ class NAS201SearchCell(nn.Module):
         node_str = '{:}<-{:}'.format(i, j)
         weights  = weightss[ self.edge2index[node_str] ]
         #aggregation = sum( layer(nodes[j]) * w for layer, w in zip(self.edges[node_str], weights) ) / weights.numel()
-        aggregation = sum( layer(nodes[j]) * w for layer, w in zip(self.edges[node_str], weights) )
-        inter_nodes.append( aggregation )
-      nodes.append( sum(inter_nodes) )
+        inter_nodes.extend( layer(nodes[j]) * w for layer, w in zip(self.edges[node_str], weights) if not is_zero_op(layer) )
+      nodes.append( sum_nonzero(inter_nodes, lambda: self.zero_node(i, inputs)) )
     return nodes[-1]
 
   # uniform random sampling per iteration, SETN
@@ -90,8 +108,8 @@ class NAS201SearchCell(nn.Module):
         if has_non_zero: break
       inter_nodes = []
       for j, select_op in enumerate(sops):
-        inter_nodes.append( select_op(nodes[j]) )
-      nodes.append( sum(inter_nodes) )
+        if not is_zero_op(select_op): inter_nodes.append( select_op(nodes[j]) )
+      nodes.append( sum_nonzero(inter_nodes, lambda: self.zero_node(i, inputs)) )
     return nodes[-1]
 
   # select the argmax
@@ -102,9 +120,10 @@ class NAS201SearchCell(nn.Module):
       for j in range(i):
         node_str = '{:}<-{:}'.format(i, j)
         weights  = weightss[ self.edge2index[node_str] ]
-        inter_nodes.append( self.edges[node_str][ weights.argmax().item() ]( nodes[j] ) )
+        select_op = self.edges[node_str][ weights.argmax().item() ]
+        if not is_zero_op(select_op): inter_nodes.append( select_op( nodes[j] ) )
         #inter_nodes.append( sum( layer(nodes[j]) * w for layer, w in zip(self.edges[node_str], weights) ) )
-      nodes.append( sum(inter_nodes) )
+      nodes.append( sum_nonzero(inter_nodes, lambda: self.zero_node(i, inputs)) )
     return nodes[-1]
 
   # forward with a specific structure
@@ -116,8 +135,8 @@ class NAS201SearchCell(nn.Module):
       for op_name, j in cur_op_node:
         node_str = '{:}<-{:}'.format(i, j)
         op_index = self.op_names.index( op_name )
-        inter_nodes.append( self.edges[node_str][op_index]( nodes[j] ) )
-      nodes.append( sum(inter_nodes) )
+        if not is_zero_op(self.edges[node_str][op_index]): inter_nodes.append( self.edges[node_str][op_index]( nodes[j] ) )
+      nodes.append( sum_nonzero(inter_nodes, lambda: self.zero_node(i, inputs)) )
     return nodes[-1]
 
 
@@ -131,11 +150,18 @@ class MixedOp(nn.Module):
       op = OPS[primitive](C, C, stride, affine, track_running_stats)
       self._ops.append(op)
 
+  # return None (a symbolic zero) if the selected op is zero
   def forward_gdas(self, x, weights, index):
+    if is_zero_op(self._ops[index]): return None
     return self._ops[index](x) * weights[index]
 
   def forward_darts(self, x, weights):
-    return sum(w * op(x) for w, op in zip(weights, self._ops))
+    features = [w * op(x) for w, op in zip(weights, self._ops) if not is_zero_op(op)]
+    return sum(features) if len(features) > 0 else None
+
+  def forward_zero(self, x):
+    zero_op = [op for op in self._ops if getattr(op, 'is_zero', False)][0]
+    return zero_op(x)
 
 
 # Learning Transferable Architectures for Scalable Image Recognition, CVPR 2018
@@ -176,7 +202,7 @@ class NASNetSearchCell(nn.Module):
         weights = weightss[ self.edge2index[node_str] ]
         index   = indexs[ self.edge2index[node_str] ].item()
         clist.append( op.forward_gdas(h, weights, index) )
-      states.append( sum(clist) )
+      states.append( sum_nonzero(clist, lambda: self.edges['{:}<-0'.format(i)].forward_zero(states[0])) )
 
     return torch.cat(states[-self._multiplier:], dim=1)
 
@@ -192,6 +218,6 @@ class NASNetSearchCell(nn.Module):
         op = self.edges[ node_str ]
         weights = weightss[ self.edge2index[node_str] ]
         clist.append( op.forward_darts(h, weights) )
-      states.append( sum(clist) )
+      states.append( sum_nonzero(clist, lambda: self.edges['{:}<-0'.format(i)].forward_zero(states[0])) )
 
     return torch.cat(states[-self._multiplier:], dim=1)
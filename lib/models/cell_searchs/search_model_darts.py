@@ -8,6 +8,7 @@ import torch.nn as nn
 from copy import deepcopy
 from ..cell_operations import ResNetBasicblock
 from .search_cells     import NAS201SearchCell as SearchCell
+from .checkpoint_cells import checkpoint_cell, stage_flags
 from .genotypes        import Structure
 
 
@@ -38,6 +39,8 @@ class TinyNetworkDarts(nn.Module):
       C_prev = cell.out_dim
     self.op_names   = deepcopy( search_space )
     self._Layer     = len(self.cells)
+    self.layer_reductions = layer_reductions
+    self.checkpoints      = [False] * len(self.cells)
     self.edge2index = edge2index
     self.lastact    = nn.Sequential(nn.BatchNorm2d(C_prev), nn.ReLU(inplace=True))
     self.global_pooling = nn.AdaptiveAvgPool2d(1)
@@ -50,6 +53,15 @@ class TinyNetworkDarts(nn.Module):
     xlist+= list( self.classifier.parameters() )
     return xlist
 
+  # use the fused mixed operations in the search cells or not (see fused_cells.py)
+  def set_fused(self, fused):
+    for cell in self.cells:
+      if isinstance(cell, SearchCell): cell.fused = fused
+
+  # checkpoint the search cells in each stage or not (see checkpoint_cells.py)
+  def set_checkpoint(self, stages):
+    self.checkpoints = stage_flags(self.layer_reductions, stages)
+
   def get_alphas(self):
     return [self.arch_parameters]
 
@@ -84,7 +96,9 @@ class TinyNetworkDarts(nn.Module):
 
     feature = self.stem(inputs)
     for i, cell in enumerate(self.cells):
-      if isinstance(cell, SearchCell):
+      if isinstance(cell, SearchCell) and self.checkpoints[i] and torch.is_grad_enabled():
+        feature = checkpoint_cell(cell, cell, feature, alphas)
+      elif isinstance(cell, SearchCell):
         feature = cell(feature, alphas)
       else:
         feature = cell(feature)
@@ -6,6 +6,7 @@ import torch.nn as nn
 from copy import deepcopy
 from typing import List, Text, Dict
 from .search_cells     import NASNetSearchCell as SearchCell
+from .checkpoint_cells import checkpoint_cell, stage_flags
 from .genotypes        import Structure
 
 
@@ -38,6 +39,8 @@ class NASNetworkDARTS(nn.Module):
       C_prev_prev, C_prev, reduction_prev = C_prev, multiplier*C_curr, reduction
     self.op_names   = deepcopy( search_space )
     self._Layer     = len(self.cells)
+    self.layer_reductions = layer_reductions
+    self.checkpoints      = [False] * len(self.cells)
     self.edge2index = edge2index
     self.lastact    = nn.Sequential(nn.BatchNorm2d(C_prev), nn.ReLU(inplace=True))
     self.global_pooling = nn.AdaptiveAvgPool2d(1)
@@ -51,6 +54,10 @@ class NASNetworkDARTS(nn.Module):
     xlist+= list( self.classifier.parameters() )
     return xlist
 
+  # checkpoint the search cells in each stage or not (see checkpoint_cells.py)
+  def set_checkpoint(self, stages) -> None:
+    self.checkpoints = stage_flags(self.layer_reductions, stages)
+
   def get_alphas(self) -> List[torch.nn.Parameter]:
     return [self.arch_normal_parameters, self.arch_reduce_parameters]
 
@@ -99,7 +106,10 @@ class NASNetworkDARTS(nn.Module):
     for i, cell in enumerate(self.cells):
       if cell.reduction: ww = reduce_w
       else             : ww = normal_w
-      s0, s1 = s1, cell.forward_darts(s0, s1, ww)
+      if self.checkpoints[i] and torch.is_grad_enabled():
+        s0, s1 = s1, checkpoint_cell(cell, cell.forward_darts, s0, s1, ww)
+      else:
+        s0, s1 = s1, cell.forward_darts(s0, s1, ww)
     out = self.lastact(s1)
     out = self.global_pooling( out )
     out = out.view(out.size(0), -1)
@@ -6,6 +6,7 @@ import torch.nn as nn
 from copy import deepcopy
 from ..cell_operations import ResNetBasicblock
 from .search_cells     import NAS201SearchCell as SearchCell
+from .sparse_cells     import GDASPlan
 from .genotypes        import Structure
 
 
@@ -43,6 +44,7 @@ class TinyNetworkGDAS(nn.Module):
     self.classifier = nn.Linear(C_prev, num_classes)
     self.arch_parameters = nn.Parameter( 1e-3*torch.randn(num_edge, len(search_space)) )
     self.tau        = 10
+    self.sparse     = False
 
   def get_weights(self):
     xlist = list( self.stem.parameters() ) + list( self.cells.parameters() )
@@ -56,6 +58,10 @@ class TinyNetworkGDAS(nn.Module):
   def get_tau(self):
     return self.tau
 
+  # skip the sampled `none` edges and the nodes not reaching the output or not (see sparse_cells.py)
+  def set_sparse(self, sparse):
+    self.sparse = sparse
+
   def get_alphas(self):
     return [self.arch_parameters]
 
@@ -97,9 +103,12 @@ class TinyNetworkGDAS(nn.Module):
         continue
       else: break
 
+    plan = GDASPlan(hardwts, index, self.max_nodes, self.edge2index, self.op_names) if self.sparse else None
     feature = self.stem(inputs)
     for i, cell in enumerate(self.cells):
-      if isinstance(cell, SearchCell):
+      if isinstance(cell, SearchCell) and plan is not None:
+        feature = cell.forward_gdas_sparse(feature, plan)
+      elif isinstance(cell, SearchCell):
         feature = cell.forward_gdas(feature, hardwts, index)
       else:
         feature = cell(feature)
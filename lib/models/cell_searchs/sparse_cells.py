@@ -0,0 +1,53 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The sparse execution of NAS201SearchCell.forward_gdas.
+# In GDAS, the output of the edge e is `hardwts[e,a] * op_a(x) + sum_{k != a} hardwts[e,k]`, where a is the sampled op.
+# The values of hardwts are one-hot, but all of them receive the gradients, so the sparse execution keeps:
+#   * `selected[e] = hardwts[e,a]`, which scales the output of the sampled op;
+#   * `rests[e] = sum_{k != a} hardwts[e,k]`, which is a scalar (zero in value) added to the target node.
+# The sampled indexes are copied to the host once per forward, and `GDASPlan` is shared by all cells:
+#   * the edges whose sampled op is `none` are not computed, since their outputs are zero;
+#   * the nodes that do not reach the output through the other edges are not computed, since they receive zero gradients.
+# The ops of the skipped edges and nodes do not update their BN statistics, as the ops that are not sampled.
+############################################################################################
+import torch
+
+
+class GDASPlan(object):
+
+  def __init__(self, hardwts, index, max_nodes, edge2index, op_names):
+    indexes = index.view(-1).tolist() # the only synchronization between the host and the device
+    self.max_nodes = max_nodes
+    self.selected  = hardwts.gather(1, index).view(-1)
+    self.rests     = (hardwts * torch.ones_like(hardwts).scatter_(1, index, 0.)).sum(dim=-1)
+    is_none = {node_str: op_names[indexes[e]] == 'none' for node_str, e in edge2index.items()}
+    # find the nodes reaching the output, from the last node to the first node
+    needed = [False] * (max_nodes - 1) + [True]
+    for i in range(max_nodes-1, 0, -1):
+      for j in range(i):
+        if needed[i] and not is_none['{:}<-{:}'.format(i, j)]: needed[j] = True
+    self.nodes = [] # (node, [(source, edge-name, edge-index, op-index)], the indexes of all edges to this node)
+    for i in range(1, max_nodes):
+      if not needed[i]: continue
+      edges = []
+      for j in range(i):
+        node_str = '{:}<-{:}'.format(i, j)
+        if not is_none[node_str]: edges.append( (j, node_str, edge2index[node_str], indexes[edge2index[node_str]]) )
+      self.nodes.append( (i, edges, [edge2index['{:}<-{:}'.format(i, j)] for j in range(i)]) )
+    self.node_rests = {i: self.rests[xedges].sum() for i, _, xedges in self.nodes}
+    self.zero_ops   = {i: indexes[edge2index['{:}<-0'.format(i)]] for i, edges, _ in self.nodes if len(edges) == 0}
+
+  def __repr__(self):
+    return ('{name}({num} nodes, {edges} edges to compute)'.format(name=self.__class__.__name__, num=len(self.nodes), edges=sum(len(edges) for _, edges, _ in self.nodes)))
+
+
+def sparse_gdas_forward(cell, inputs, plan):
+  nodes = {0: inputs}
+  for i, edges, _ in plan.nodes:
+    if len(edges) == 0: # all edges to this node are none
+      node = cell.edges['{:}<-0'.format(i)][ plan.zero_ops[i] ](inputs)
+    else:
+      node = sum( plan.selected[e] * cell.edges[node_str][op_index]( nodes[j] ) for j, node_str, e, op_index in edges )
+    nodes[i] = node + plan.node_rests[i]
+  return nodes[cell.max_nodes - 1]
@@ -3,5 +3,15 @@
 ##################################################
 from .api import NASBench201API
 from .api import ArchResults, ResultsCount
+from .store import BenchmarkStore, convert_to_store, append_delta, compact_store
+from .tables import MetricTables
+from .query_engine import QueryEngine
+from .cache import StatsCache
+from .views import ArchResultsView, ResultsCountView, CopyOnWriteArchResults, CopyOnWriteResultsCount
+from .encoding import str2code, code2str, arch2code, mutate_code
+from .isomorphism import EquivalenceIndex
+from .weights import WeightStore, write_weight_store, strip_weights
+from .shared import share_api, release_shared, release_stale_shared
+from .server import QueryServer, NASBench201Client
 
 NAS_BENCH_201_API_VERSION="v1.1"
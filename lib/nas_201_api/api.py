@@ -7,8 +7,17 @@
 #
 #
 #
-import os, sys, copy, random, torch, numpy as np
+import os, sys, copy, random, threading, torch, numpy as np
 from collections import OrderedDict, defaultdict
+from .store import is_store, BenchmarkStore, LazyArchInfos
+from .shared import is_shared, SharedData
+from .tables import MetricTables
+from .query_engine import QueryEngine
+from .cache import StatsCache
+from .views import ArchResultsView, CopyOnWriteArchResults
+from .encoding import str2code, num_codes
+from .isomorphism import EquivalenceIndex
+from .weights import WeightStore
 
 
 def print_information(information, extra_info=None, show=False):
@@ -42,35 +51,89 @@ This is the class for API of NAS-Bench-201.
 """
 class NASBench201API(object):
 
-  """ The initialization function that takes the dataset file path (or a dict loaded from that path) as input. """
-  def __init__(self, file_path_or_dict, verbose=True):
-    if isinstance(file_path_or_dict, str):
-      if verbose: print('try to create the NAS-Bench-201 api from {:}'.format(file_path_or_dict))
-      assert os.path.isfile(file_path_or_dict), 'invalid path : {:}'.format(file_path_or_dict)
-      file_path_or_dict = torch.load(file_path_or_dict)
-    elif isinstance(file_path_or_dict, dict):
-      file_path_or_dict = copy.deepcopy( file_path_or_dict )
-    else: raise ValueError('invalid type : {:} not in [str, dict]'.format(type(file_path_or_dict)))
-    assert isinstance(file_path_or_dict, dict), 'It should be a dict instead of {:}'.format(type(file_path_or_dict))
+  """ The initialization function that takes the dataset file path (or a dict loaded from that path) as input.
+      The file path can also be a store directory created by `convert_to_store` (see store.py),
+      in which case the results of an architecture are loaded lazily when it is queried for the first time.
+      `query_mode` decides what `query_by_index` and `query_meta_info_by_index` return (see views.py):
+        -- 'copy' : a deep copy of the ArchResults, which can be freely modified (the default and the slowest).
+        -- 'view' : a read-only ArchResultsView sharing the data with this API, nothing is copied.
+        -- 'cow'  : a CopyOnWriteArchResults, which is a view until it is modified for the first time.
+      The file path can also be a shared directory created by `share_api` (see shared.py), which is memory-mapped, so that
+      many worker processes on a host share one copy of the benchmark. Such an API is pickled as its path, and it is
+      cheap to send it to (or re-create it in) a worker process. All APIs are thread-safe for queries. """
+  def __init__(self, file_path_or_dict, verbose=True, query_mode='copy'):
     self.verbose = verbose # [TODO] a flag indicating whether to print more logs
-    keys = ('meta_archs', 'arch2infos', 'evaluated_indexes')
-    for key in keys: assert key in file_path_or_dict, 'Can not find key[{:}] in the dict'.format(key)
-    self.meta_archs = copy.deepcopy( file_path_or_dict['meta_archs'] )
-    self.arch2infos_less = OrderedDict()
-    self.arch2infos_full = OrderedDict()
-    for xkey in sorted(list(file_path_or_dict['arch2infos'].keys())):
-      all_info = file_path_or_dict['arch2infos'][xkey]
-      self.arch2infos_less[xkey] = ArchResults.create_from_state_dict( all_info['less'] )
-      self.arch2infos_full[xkey] = ArchResults.create_from_state_dict( all_info['full'] )
-    self.evaluated_indexes = sorted(list(file_path_or_dict['evaluated_indexes']))
-    self.archstr2index = {}
-    for idx, arch in enumerate(self.meta_archs):
-      #assert arch.tostr() not in self.archstr2index, 'This [{:}]-th arch {:} already in the dict ({:}).'.format(idx, arch, self.archstr2index[arch.tostr()])
-      assert arch not in self.archstr2index, 'This [{:}]-th arch {:} already in the dict ({:}).'.format(idx, arch, self.archstr2index[arch])
-      self.archstr2index[ arch ] = idx
+    self.set_query_mode(query_mode)
+    self.store   = None
+    self.weights = None
+    self._tables = dict()
+    self._engines = dict()
+    self._equivalence = None
+    self.filename = file_path_or_dict if isinstance(file_path_or_dict, str) else None
+    self._stats_cache = None
+    self.shared  = None
+    self._lock   = threading.RLock()
+    if is_shared(file_path_or_dict):
+      if verbose: print('try to create the NAS-Bench-201 api from the shared directory {:}'.format(file_path_or_dict))
+      self.shared = SharedData(file_path_or_dict)
+      self.meta_archs = self.shared.meta_archs
+      if self.shared.store is not None:
+        self.store = BenchmarkStore(self.shared.store)
+        self.arch2infos_less = LazyArchInfos(self.store, 'less', ArchResults.create_from_state_dict)
+        self.arch2infos_full = LazyArchInfos(self.store, 'full', ArchResults.create_from_state_dict)
+        if os.path.isdir(os.path.join(self.shared.store, 'weights')): self.set_weight_dir(os.path.join(self.shared.store, 'weights'))
+      else: # only the queries based on the tables are supported
+        self.arch2infos_less, self.arch2infos_full = OrderedDict(), OrderedDict()
+      self.evaluated_indexes = [int(x) for x in self.shared.evaluated]
+      for key in ('less', 'full'):
+        if self.shared.tables_dir(key) is not None: self._tables[key] = MetricTables.load(self.shared.tables_dir(key))
+    elif is_store(file_path_or_dict):
+      if verbose: print('try to create the NAS-Bench-201 api from the store {:}'.format(file_path_or_dict))
+      self.store = BenchmarkStore(file_path_or_dict)
+      self.meta_archs = self.store.meta_archs
+      self.arch2infos_less = LazyArchInfos(self.store, 'less', ArchResults.create_from_state_dict)
+      self.arch2infos_full = LazyArchInfos(self.store, 'full', ArchResults.create_from_state_dict)
+      self.evaluated_indexes = list(self.store.evaluated_indexes)
+      if os.path.isdir(os.path.join(file_path_or_dict, 'weights')): self.set_weight_dir(os.path.join(file_path_or_dict, 'weights'))
+    else:
+      if isinstance(file_path_or_dict, str):
+        if verbose: print('try to create the NAS-Bench-201 api from {:}'.format(file_path_or_dict))
+        assert os.path.isfile(file_path_or_dict), 'invalid path : {:}'.format(file_path_or_dict)
+        file_path_or_dict = torch.load(file_path_or_dict)
+      elif isinstance(file_path_or_dict, dict):
+        file_path_or_dict = copy.deepcopy( file_path_or_dict )
+      else: raise ValueError('invalid type : {:} not in [str, dict]'.format(type(file_path_or_dict)))
+      assert isinstance(file_path_or_dict, dict), 'It should be a dict instead of {:}'.format(type(file_path_or_dict))
+      keys = ('meta_archs', 'arch2infos', 'evaluated_indexes')
+      for key in keys: assert key in file_path_or_dict, 'Can not find key[{:}] in the dict'.format(key)
+      self.meta_archs = copy.deepcopy( file_path_or_dict['meta_archs'] )
+      self.arch2infos_less = OrderedDict()
+      self.arch2infos_full = OrderedDict()
+      for xkey in sorted(list(file_path_or_dict['arch2infos'].keys())):
+        all_info = file_path_or_dict['arch2infos'][xkey]
+        self.arch2infos_less[xkey] = ArchResults.create_from_state_dict( all_info['less'] )
+        self.arch2infos_full[xkey] = ArchResults.create_from_state_dict( all_info['full'] )
+      self.evaluated_indexes = sorted(list(file_path_or_dict['evaluated_indexes']))
+    # the sidecar cache of the tables (see cache.py) is opt-in, e.g., api.set_cache_dir(api.default_cache_dir())
+    self.cache_dir = None
+    # code2index[code] is the index of the architecture whose integer encoding is `code` (see encoding.py), -1 if it is not in the search space
+    if self.shared is not None: # archstr2index is replaced by `code2index` (see query_index_by_arch)
+      self.archstr2index = None
+      self.index2code = self.shared.index2code
+      self.code2index = self.shared.code2index
+    else:
+      self.archstr2index = {}
+      for idx, arch in enumerate(self.meta_archs):
+        #assert arch.tostr() not in self.archstr2index, 'This [{:}]-th arch {:} already in the dict ({:}).'.format(idx, arch, self.archstr2index[arch.tostr()])
+        assert arch not in self.archstr2index, 'This [{:}]-th arch {:} already in the dict ({:}).'.format(idx, arch, self.archstr2index[arch])
+        self.archstr2index[ arch ] = idx
+      self.index2code = np.array([str2code(arch) for arch in self.meta_archs], dtype=np.int64)
+      self.code2index = np.full(num_codes(), -1, dtype=np.int64)
+      self.code2index[self.index2code] = np.arange(len(self.meta_archs), dtype=np.int64)
 
+  # the architecture strings are immutable, so they are returned without copy
   def __getitem__(self, index):
-    return copy.deepcopy( self.meta_archs[index] )
+    return self.meta_archs[index]
 
   def __len__(self):
     return len(self.meta_archs)
@@ -78,6 +141,29 @@ class NASBench201API(object):
   def __repr__(self):
     return ('{name}({num}/{total} architectures)'.format(name=self.__class__.__name__, num=len(self.evaluated_indexes), total=len(self.meta_archs)))
 
+  # an API created from a shared directory is pickled as its path, and the other APIs are pickled without the lock
+  def __reduce_ex__(self, protocol):
+    if self.shared is not None: return (NASBench201API, (self.shared.root, False, self.query_mode))
+    return super(NASBench201API, self).__reduce_ex__(protocol)
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    state.pop('_lock', None)
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._lock = threading.RLock()
+
+  def set_query_mode(self, query_mode):
+    assert query_mode in ('copy', 'view', 'cow'), 'invalid query mode : {:}'.format(query_mode)
+    self.query_mode = query_mode
+
+  def _wrap_arch_results(self, archresult):
+    if self.query_mode == 'view'  : return ArchResultsView(archresult)
+    elif self.query_mode == 'cow' : return CopyOnWriteArchResults(archresult)
+    else                          : return copy.deepcopy(archresult)
+
   def random(self):
     return random.randint(0, len(self.meta_archs)-1)
 
@@ -89,14 +175,55 @@ class NASBench201API(object):
   #   Otherwise, it will return an int in [0, the-number-of-candidates-in-the-search-space).
   def query_index_by_arch(self, arch):
     if isinstance(arch, str):
-      if arch in self.archstr2index: arch_index = self.archstr2index[ arch ]
-      else                         : arch_index = -1
+      arch_index = self._query_index_by_str( arch )
     elif hasattr(arch, 'tostr'):
-      if arch.tostr() in self.archstr2index: arch_index = self.archstr2index[ arch.tostr() ]
-      else                                 : arch_index = -1
+      arch_index = self._query_index_by_str( arch.tostr() )
     else: arch_index = -1
     return arch_index
 
+  def _query_index_by_str(self, arch_str):
+    if self.archstr2index is not None:
+      return self.archstr2index.get(arch_str, -1)
+    try:
+      arch_index = self.query_index_by_code( str2code(arch_str) )
+    except (ValueError, KeyError):
+      return -1
+    if arch_index != -1 and self.meta_archs[arch_index] != arch_str: arch_index = -1
+    return arch_index
+
+  # The same as query_index_by_arch but uses the integer encoding of the architecture (see encoding.py), which is a single array read.
+  # The input can be an int or a NumPy array of ints, and it returns -1 for the codes that are not in the search space.
+  def query_index_by_code(self, code):
+    if isinstance(code, (int, np.integer)):
+      if 0 <= code < len(self.code2index): return int(self.code2index[code])
+      else: return -1
+    codes = np.asarray(code, dtype=np.int64)
+    valid = (codes >= 0) & (codes < len(self.code2index))
+    return np.where(valid, self.code2index[np.where(valid, codes, 0)], -1)
+
+  # return the integer encoding of the `index`-th architecture
+  def query_code_by_index(self, index):
+    return int(self.index2code[index])
+
+  # return the equivalence classes of all architectures (see isomorphism.py), which are computed once and cached on disk.
+  # The cache is saved in `cache_dir`, which is the directory of the benchmark file (or store) by default.
+  def get_equivalence(self, cache_dir=None):
+    if self._equivalence is None:
+      if cache_dir is None and self.filename is not None:
+        cache_dir = self.filename if self.store is not None or self.shared is not None else os.path.dirname(os.path.abspath(self.filename))
+      self._equivalence = EquivalenceIndex.load_or_create(self.meta_archs, cache_dir, self.verbose)
+    return self._equivalence
+
+  # return the smallest index of the architectures that are isomorphic to the `index`-th architecture.
+  def canonical_index(self, index):
+    assert 0 <= index < len(self), 'invalid index : {:}'.format(index)
+    return self.get_equivalence().canonical_index(index)
+
+  # return the sorted indexes of all architectures that are isomorphic to the `index`-th architecture (including itself).
+  def equivalence_class(self, index):
+    assert 0 <= index < len(self), 'invalid index : {:}'.format(index)
+    return self.get_equivalence().equivalence_class(index)
+
   # Overwrite all information of the 'index'-th architecture in the search space.
   # It will load its data from 'archive_root'.
   def reload(self, archive_root, index):
@@ -108,6 +235,22 @@ class NASBench201API(object):
     assert isinstance(xdata, dict) and 'full' in xdata and 'less' in xdata, 'invalid format of data in {:}'.format(xfile_path)
     self.arch2infos_less[index] = ArchResults.create_from_state_dict( xdata['less'] )
     self.arch2infos_full[index] = ArchResults.create_from_state_dict( xdata['full'] )
+    self._tables.clear()
+    self._engines.clear()
+    self.set_cache_dir(None) # the data in memory is different from the benchmark file
+
+  # Load the delta shards that are appended into the store (see `append_delta` in store.py) after this API is created.
+  # The architectures in these deltas are re-created from the store when they are queried next time.
+  def refresh_store(self):
+    assert self.store is not None, 'refresh_store is only supported for the API created from a store'
+    touched = self.store.refresh()
+    self.arch2infos_less.invalidate(touched)
+    self.arch2infos_full.invalidate(touched)
+    self.evaluated_indexes = list(self.store.evaluated_indexes)
+    self._tables.clear()
+    self._engines.clear()
+    self._stats_cache = None # the fingerprint of the store is changed
+    return touched
   
   # This function is used to query the information of a specific archiitecture
   # 'arch' can be an architecture index or an architecture string
@@ -145,7 +288,7 @@ class NASBench201API(object):
     if use_12epochs_result: basestr, arch2infos = '12epochs' , self.arch2infos_less
     else                  : basestr, arch2infos = '200epochs', self.arch2infos_full
     assert arch_index in arch2infos, 'arch_index [{:}] does not in arch2info with {:}'.format(arch_index, basestr)
-    archInfo = copy.deepcopy( arch2infos[ arch_index ] )
+    archInfo = self._wrap_arch_results( arch2infos[ arch_index ] )
     if dataname is None: return archInfo
     else:
       assert dataname in archInfo.get_dataset_names(), 'invalid dataset-name : {:}'.format(dataname)
@@ -156,12 +299,66 @@ class NASBench201API(object):
     if use_12epochs_result: basestr, arch2infos = '12epochs' , self.arch2infos_less
     else                  : basestr, arch2infos = '200epochs', self.arch2infos_full
     assert arch_index in arch2infos, 'arch_index [{:}] does not in arch2info with {:}'.format(arch_index, basestr)
-    archInfo = copy.deepcopy( arch2infos[ arch_index ] )
+    archInfo = self._wrap_arch_results( arch2infos[ arch_index ] )
     return archInfo
 
+  # This function returns the columnar view (MetricTables in tables.py) of all architectures, which is created at the first call.
+  # It can be used for the vectorized queries over all architectures, e.g.,
+  #   tables = api.get_tables()
+  #   indexes, accuracies = tables.topk('cifar100', 'x-test', 10, Param_max=1.0)
+  #   indexes = tables.pareto_front('cifar10', 'ori-test', 'flops')
+  def get_tables(self, use_12epochs_result=False):
+    key = 'less' if use_12epochs_result else 'full'
+    if key not in self._tables:
+      with self._lock: # the tables are created only once if several threads ask for them at the same time
+        if key not in self._tables:
+          cache  = self.get_stats_cache()
+          tables = None if cache is None else cache.load_tables(key)
+          if tables is None:
+            tables = MetricTables.create_from_api(self, use_12epochs_result)
+            if cache is not None: cache.save_tables(key, tables)
+          self._tables[key] = tables
+    return self._tables[key]
+
+  # the default directory of the sidecar cache, which is next to the benchmark file or inside the store (None if there is no file)
+  def default_cache_dir(self):
+    if self.filename is None or self.shared is not None: return None
+    elif self.store is None: return '{:}.cache'.format(self.filename)
+    else                   : return os.path.join(self.filename, 'cache')
+
+  # Set the directory of the sidecar cache (see cache.py), where the tables are saved after they are created for the first time,
+  # so that the following processes load (memory-map) them instantly. None (the default) disables the cache.
+  def set_cache_dir(self, cache_dir):
+    self.cache_dir, self._stats_cache = cache_dir, None
+
+  def get_stats_cache(self):
+    if self._stats_cache is None and self.cache_dir is not None and self.filename is not None:
+      self._stats_cache = StatsCache(self.cache_dir, self.filename, self.verbose)
+    return self._stats_cache
+
+  # return the multi-objective query engine (see query_engine.py) over the columnar tables, which caches the sorted orders and Pareto fronts.
+  # ========= Some examlpes for using this function:
+  #   engine = api.get_query_engine()
+  #   indexes, accs = engine.topk('cifar10', 'ori-test', 10, constraints={'latency': 0.02})
+  #   front = engine.pareto_front('cifar100', 'x-test', ('accuracy', 'latency', 'params'))
+  #   indexes, scores = engine.rank_weighted('ImageNet16-120', 'x-test', {'accuracy': 1.0, 'flops': 0.2}, k=10)
+  def get_query_engine(self, use_12epochs_result=False):
+    key = 'less' if use_12epochs_result else 'full'
+    if key not in self._engines:
+      with self._lock:
+        if key not in self._engines: self._engines[key] = QueryEngine(self.get_tables(use_12epochs_result))
+    return self._engines[key]
+
   def find_best(self, dataset, metric_on_set, FLOP_max=None, Param_max=None, use_12epochs_result=False):
     if use_12epochs_result: basestr, arch2infos = '12epochs' , self.arch2infos_less
     else                  : basestr, arch2infos = '200epochs', self.arch2infos_full
+    # use the tables if they are already created (or loaded), otherwise a one-off query does not build the tables of all architectures
+    key = 'less' if use_12epochs_result else 'full'
+    if key in self._tables:
+      best_index, highest_accuracy = self._tables[key].find_best(dataset, metric_on_set, FLOP_max, Param_max)
+      if best_index != -1 and best_index in arch2infos: # the tables save float32 values, return the same accuracy as `get_metrics`
+        highest_accuracy = arch2infos[best_index].get_metrics(dataset, metric_on_set)['accuracy']
+      return best_index, highest_accuracy
     best_index, highest_accuracy = -1, None
     for i, idx in enumerate(self.evaluated_indexes):
       info = arch2infos[idx].get_comput_costs(dataset)
@@ -179,7 +376,7 @@ class NASBench201API(object):
   # return the topology structure of the `index`-th architecture
   def arch(self, index):
     assert 0 <= index < len(self.meta_archs), 'invalid index : {:} vs. {:}.'.format(index, len(self.meta_archs))
-    return copy.deepcopy(self.meta_archs[index])
+    return self.meta_archs[index]
 
   """
   This function is used to obtain the trained weights of the `index`-th architecture on `dataset` with the seed of `seed`
@@ -193,8 +390,24 @@ class NASBench201API(object):
   def get_net_param(self, index, dataset, seed, use_12epochs_result=False):
     if use_12epochs_result: basestr, arch2infos = '12epochs' , self.arch2infos_less
     else                  : basestr, arch2infos = '200epochs', self.arch2infos_full
+    kind = 'less' if use_12epochs_result else 'full'
+    if self.weights is not None and self.weights.has(kind, dataset):
+      seeds = self.weights.seeds(kind, dataset, index)
+      # only read the bytes of the requested network from the weight store, the metric records are not touched
+      if seed is not None and seed in seeds: return self.weights.read(kind, dataset, index, seed)
+      # the trials added after the weight store is written (e.g., by append_delta) keep their weights in the records
+      if seed is None:
+        params = self.weights.read(kind, dataset, index, None)
+        for xseed, xparams in arch2infos[index].get_net_param(dataset, None).items():
+          if xseed not in params: params[xseed] = xparams
+        return params
     archresult = arch2infos[index]
     return archresult.get_net_param(dataset, seed)
+
+  # Use the weight store at `weight_dir` (see weights.py) for `get_net_param`, which is detected automatically for a store with the 'weights' directory.
+  def set_weight_dir(self, weight_dir):
+    if self.weights is not None: self.weights.close()
+    self.weights = None if weight_dir is None else WeightStore(weight_dir)
   
   """
   This function is used to obtain the configuration for the `index`-th architecture on `dataset`.
@@ -296,6 +509,42 @@ class NASBench201API(object):
         xifo['est-valid-accuracy'] = est_valid_info['accuracy']
       return xifo
 
+  # The batched version of `get_more_info`, which returns a dict of float64 arrays with the same keys as `get_more_info`.
+  # `indexes` is a list or an array of architecture indexes.
+  # `seed_policy` decides which trial is used for each architecture:
+  #   'random'   : randomly select one trial for each architecture, sampled by `rng` (a np.random.RandomState, an integer seed or None).
+  #                The same `rng` state always gives the same results.
+  #   'mean'     : average all trials (the same as is_random=False in `get_more_info`).
+  #   an integer : use the trial with this random seed.
+  # It is based on the columnar tables (see `get_tables`), and a metric that is not available is NaN.
+  def get_more_info_batch(self, indexes, dataset, iepoch=None, use_12epochs_result=False, seed_policy='random', rng=None):
+    tables  = self.get_tables(use_12epochs_result)
+    indexes = np.asarray(indexes, dtype=np.int64)
+    slots   = tables.select_trials(indexes, dataset, seed_policy, rng)
+    total   = int(tables.epochs[tables.epoch_slot(iepoch)]) + 1
+    def gather(setname, metric):
+      return tables.gather(indexes, dataset, setname, iepoch, slots, metric)
+    xifo = {'train-loss'    : gather('train', 'loss'),
+            'train-accuracy': gather('train', 'accuracy'),
+            'train-all-time': gather('train', 'all_time')}
+    xifo['train-per-time'] = xifo['train-all-time'] / total
+    if dataset == 'cifar10-valid':
+      xifo['valid-loss']     = gather('x-valid', 'loss')
+      xifo['valid-accuracy'] = gather('x-valid', 'accuracy')
+      xifo['valid-all-time'] = gather('x-valid', 'all_time')
+      xifo['valid-per-time'] = xifo['valid-all-time'] / total
+      xifo['test-loss']      = gather('ori-test', 'loss')
+      xifo['test-accuracy']  = gather('ori-test', 'accuracy')
+    else:
+      test_set = 'ori-test' if dataset == 'cifar10' else 'x-test'
+      xifo['test-loss']          = gather(test_set, 'loss')
+      xifo['test-accuracy']      = gather(test_set, 'accuracy')
+      xifo['valid-loss']         = gather('x-valid', 'loss')
+      xifo['valid-accuracy']     = gather('x-valid', 'accuracy')
+      xifo['est-valid-loss']     = gather('ori-test', 'loss')
+      xifo['est-valid-accuracy'] = gather('ori-test', 'accuracy')
+    return xifo
+
   """
   This function will print the information of a specific (or all) architecture(s).
   If the index < 0: it will loop for all architectures and print their information one by one.
@@ -390,8 +639,15 @@ class ArchResults(object):
     self.all_results  = dict()
     self.dataset_seed = dict()
     self.clear_net_done = False
+    self._comput_costs = dict() # the cache of get_comput_costs, which is not saved in the state-dict
 
   def get_comput_costs(self, dataset):
+    if '_comput_costs' not in self.__dict__: self._comput_costs = dict() # the ArchResults pickled by the old versions
+    if dataset not in self._comput_costs:
+      self._comput_costs[dataset] = self._get_comput_costs(dataset)
+    return dict( self._comput_costs[dataset] )
+
+  def _get_comput_costs(self, dataset):
     x_seeds = self.dataset_seed[dataset]
     results = [self.all_results[ (dataset, seed) ] for seed in x_seeds]
 
@@ -527,10 +783,12 @@ class ArchResults(object):
     assert (dataset_name, seed) not in self.all_results
     self.all_results[ (dataset_name, seed) ] = result
     self.clear_net_done = False
+    self.__dict__.get('_comput_costs', dict()).pop(dataset_name, None)
 
   def state_dict(self):
     state_dict = dict()
     for key, value in self.__dict__.items():
+      if key.startswith('_'): continue # the caches
       if key == 'all_results': # contain the class of ResultsCount
         xvalue = dict()
         assert isinstance(value, dict), 'invalid type of value for {:} : {:}'.format(key, type(value))
@@ -553,6 +811,7 @@ class ArchResults(object):
       else: xvalue = value
       new_state_dict[key] = xvalue
     self.__dict__.update(new_state_dict)
+    self._comput_costs = dict()
 
   @staticmethod
   def create_from_state_dict(state_dict_or_file):
@@ -578,62 +837,99 @@ class ArchResults(object):
     
 
 
+# convert the per-epoch values (a dict of {epoch: value}, a list or an array) into a dense float64 array, NaN for the missing epochs.
+def to_epoch_array(values, epochs):
+  if values is None: return None
+  array = np.full(epochs, np.nan, dtype=np.float64)
+  if isinstance(values, dict):
+    for iepoch, value in values.items():
+      if 0 <= iepoch < epochs: array[iepoch] = value
+  else:
+    values = np.asarray(values, dtype=np.float64)[:epochs]
+    array[:len(values)] = values
+  return array
+
+
+# the prefix sums of the per-epoch time costs, where the missing values are counted as 0.
+def to_cumtimes(times):
+  if times is None: return None
+  return np.cumsum(np.where(np.isnan(times), 0, times))
+
+
+def readonly(array):
+  if array is None: return None
+  array = array.view()
+  array.flags.writeable = False
+  return array
+
+
 """
 This class (ResultsCount) is used to save the information of one trial for a single architecture.
 I did not write much comment for this class, because it is the lowest-level class in NAS-Bench-201 API, which will be rarely called.
 If you have any question regarding this class, please open an issue or email me.
+The per-epoch results are saved in dense arrays with the length of `epochs` (NaN for the missing epochs):
+  -- train_acc1es, train_acc5es, train_losses, train_times : arrays for the training set (train_acc5es and train_times can be None).
+  -- eval_acc1es, eval_losses, eval_times : dicts of {eval-name: array}, eval_times is empty if the time is not available.
+  -- train_cumtimes and eval_cumtimes are the prefix sums of the time costs, so that the accumulated time of an epoch is O(1).
+The old state-dicts, where eval_* are dicts with the '{name}@{epoch}' keys, are converted when they are loaded.
 """
 class ResultsCount(object):
 
   def __init__(self, name, state_dict, train_accs, train_losses, params, flop, arch_config, seed, epochs, latency):
     self.name           = name
     self.net_state_dict = state_dict
-    self.train_acc1es = copy.deepcopy(train_accs)
+    self.epochs     = epochs
+    self.train_acc1es = None
     self.train_acc5es = None
-    self.train_losses = copy.deepcopy(train_losses)
+    self.train_losses = None
     self.train_times  = None
+    self.train_cumtimes = None
+    if epochs is not None:
+      self.update_train_info(train_accs, None, train_losses, None)
     self.arch_config  = copy.deepcopy(arch_config)
     self.params     = params
     self.flop       = flop
     self.seed       = seed
-    self.epochs     = epochs
     self.latency    = latency
     # evaluation results
     self.reset_eval()
 
   def update_train_info(self, train_acc1es, train_acc5es, train_losses, train_times):
-    self.train_acc1es = train_acc1es
-    self.train_acc5es = train_acc5es
-    self.train_losses = train_losses
-    self.train_times  = train_times
+    self.train_acc1es = to_epoch_array(train_acc1es, self.epochs)
+    self.train_acc5es = to_epoch_array(train_acc5es, self.epochs)
+    self.train_losses = to_epoch_array(train_losses, self.epochs)
+    self.train_times  = to_epoch_array(train_times , self.epochs)
+    self.train_cumtimes = to_cumtimes(self.train_times)
 
   def reset_eval(self):
     self.eval_names  = []
     self.eval_acc1es = {}
     self.eval_times  = {}
     self.eval_losses = {}
+    self.eval_cumtimes = {}
 
   def update_latency(self, latency):
     self.latency = copy.deepcopy( latency )
 
+  def _add_eval(self, name, accs, losses, times):
+    assert name not in self.eval_names, '{:} has already been added into eval-names'.format(name)
+    self.eval_names.append( name )
+    self.eval_acc1es[name] = to_epoch_array(accs, self.epochs)
+    self.eval_losses[name] = to_epoch_array(losses, self.epochs)
+    if times is not None:
+      self.eval_times[name]    = to_epoch_array(times, self.epochs)
+      self.eval_cumtimes[name] = to_cumtimes(self.eval_times[name])
+
+  # the inputs are dicts with the '{name}@{epoch}' keys
   def update_eval(self, accs, losses, times):  # new version
-    data_names = set([x.split('@')[0] for x in accs.keys()])
+    data_names = sorted(set([x.split('@')[0] for x in accs.keys()]))
     for data_name in data_names:
-      assert data_name not in self.eval_names, '{:} has already been added into eval-names'.format(data_name)
-      self.eval_names.append( data_name )
-      for iepoch in range(self.epochs):
-        xkey = '{:}@{:}'.format(data_name, iepoch)
-        self.eval_acc1es[ xkey ] = accs[ xkey ]
-        self.eval_losses[ xkey ] = losses[ xkey ]
-        self.eval_times [ xkey ] = times[ xkey ]
+      xkeys = ['{:}@{:}'.format(data_name, iepoch) for iepoch in range(self.epochs)]
+      self._add_eval(data_name, [accs[x] for x in xkeys], [losses[x] for x in xkeys], [times[x] for x in xkeys])
 
+  # the inputs are dicts with the epoch keys
   def update_OLD_eval(self, name, accs, losses): # old version
-    assert name not in self.eval_names, '{:} has already added'.format(name)
-    self.eval_names.append( name )
-    for iepoch in range(self.epochs):
-      if iepoch in accs:
-        self.eval_acc1es['{:}@{:}'.format(name,iepoch)] = accs[iepoch]
-        self.eval_losses['{:}@{:}'.format(name,iepoch)] = losses[iepoch]
+    self._add_eval(name, accs, losses, None)
 
   def __repr__(self):
     num_eval = len(self.eval_names)
@@ -652,11 +948,10 @@ class ResultsCount(object):
 
   # get the information regarding time
   def get_times(self):
-    if self.train_times is not None and isinstance(self.train_times, dict):
-      train_times = list( self.train_times.values() )
-      time_info = {'T-train@epoch': np.mean(train_times), 'T-train@total': np.sum(train_times)}
+    if self.train_times is not None:
+      time_info = {'T-train@epoch': np.mean(self.train_times), 'T-train@total': np.sum(self.train_times)}
       for name in self.eval_names:
-        xtimes = [self.eval_times['{:}@{:}'.format(name,i)] for i in range(self.epochs)]
+        xtimes = self.eval_times[name]
         time_info['T-{:}@epoch'.format(name)] = np.mean(xtimes)
         time_info['T-{:}@total'.format(name)] = np.sum(xtimes)
     else:
@@ -674,12 +969,12 @@ class ResultsCount(object):
     if iepoch is None: iepoch = self.epochs-1
     assert 0 <= iepoch < self.epochs, 'invalid iepoch={:} < {:}'.format(iepoch, self.epochs)
     if self.train_times is not None:
-      xtime = self.train_times[iepoch]
-      atime = sum([self.train_times[i] for i in range(iepoch+1)])
+      xtime = float(self.train_times[iepoch])
+      atime = float(self.train_cumtimes[iepoch])
     else: xtime, atime = None, None
     return {'iepoch'  : iepoch,
-            'loss'    : self.train_losses[iepoch],
-            'accuracy': self.train_acc1es[iepoch],
+            'loss'    : float(self.train_losses[iepoch]),
+            'accuracy': float(self.train_acc1es[iepoch]),
             'cur_time': xtime,
             'all_time': atime}
 
@@ -687,16 +982,31 @@ class ResultsCount(object):
   def get_eval(self, name, iepoch=None):
     if iepoch is None: iepoch = self.epochs-1
     assert 0 <= iepoch < self.epochs, 'invalid iepoch={:} < {:}'.format(iepoch, self.epochs)
-    if isinstance(self.eval_times,dict) and len(self.eval_times) > 0:
-      xtime = self.eval_times['{:}@{:}'.format(name,iepoch)]
-      atime = sum([self.eval_times['{:}@{:}'.format(name,i)] for i in range(iepoch+1)])
+    if name not in self.eval_acc1es or np.isnan(self.eval_acc1es[name][iepoch]): raise KeyError('{:}@{:}'.format(name, iepoch))
+    if name in self.eval_times:
+      xtime = float(self.eval_times[name][iepoch])
+      atime = float(self.eval_cumtimes[name][iepoch])
     else: xtime, atime = None, None
     return {'iepoch'  : iepoch,
-            'loss'    : self.eval_losses['{:}@{:}'.format(name,iepoch)],
-            'accuracy': self.eval_acc1es['{:}@{:}'.format(name,iepoch)],
+            'loss'    : float(self.eval_losses[name][iepoch]),
+            'accuracy': float(self.eval_acc1es[name][iepoch]),
             'cur_time': xtime,
             'all_time': atime}
 
+  # get the learning curves of all epochs on 'train' or an evaluation set, each value is a read-only array (None if not available).
+  def get_curves(self, name):
+    if name == 'train':
+      return {'loss'    : readonly(self.train_losses),
+              'accuracy': readonly(self.train_acc1es),
+              'cur_time': readonly(self.train_times),
+              'all_time': readonly(self.train_cumtimes)}
+    elif name in self.eval_names:
+      return {'loss'    : readonly(self.eval_losses[name]),
+              'accuracy': readonly(self.eval_acc1es[name]),
+              'cur_time': readonly(self.eval_times.get(name, None)),
+              'all_time': readonly(self.eval_cumtimes.get(name, None))}
+    else: raise ValueError('invalid name : {:} not in {:}'.format(name, ['train'] + self.eval_names))
+
   def get_net_param(self):
     return self.net_state_dict
 
@@ -716,8 +1026,29 @@ class ResultsCount(object):
     return _state_dict
 
   def load_state_dict(self, state_dict):
+    if 'eval_cumtimes' not in state_dict:
+      state_dict = ResultsCount.convert_legacy_state_dict(state_dict)
     self.__dict__.update(state_dict)
 
+  # convert the old state-dict (the per-epoch values are saved in dicts) into the dense arrays
+  @staticmethod
+  def convert_legacy_state_dict(state_dict):
+    state_dict, epochs = dict(state_dict), state_dict['epochs']
+    for key in ('train_acc1es', 'train_acc5es', 'train_losses', 'train_times'):
+      state_dict[key] = to_epoch_array(state_dict.get(key, None), epochs)
+    state_dict['train_cumtimes'] = to_cumtimes(state_dict['train_times'])
+    eval_acc1es, eval_losses, eval_times = state_dict['eval_acc1es'], state_dict['eval_losses'], state_dict.get('eval_times', None)
+    has_time = isinstance(eval_times, dict) and len(eval_times) > 0
+    for key in ('eval_acc1es', 'eval_losses', 'eval_times', 'eval_cumtimes'): state_dict[key] = dict()
+    for name in state_dict['eval_names']:
+      xkeys = ['{:}@{:}'.format(name, iepoch) for iepoch in range(epochs)]
+      state_dict['eval_acc1es'][name] = np.array([eval_acc1es.get(x, np.nan) for x in xkeys], dtype=np.float64)
+      state_dict['eval_losses'][name] = np.array([eval_losses.get(x, np.nan) for x in xkeys], dtype=np.float64)
+      if has_time:
+        state_dict['eval_times'][name]    = np.array([eval_times.get(x, np.nan) for x in xkeys], dtype=np.float64)
+        state_dict['eval_cumtimes'][name] = to_cumtimes(state_dict['eval_times'][name])
+    return state_dict
+
   @staticmethod
   def create_from_state_dict(state_dict):
     x = ResultsCount(None, None, None, None, None, None, None, None, None, None)
@@ -0,0 +1,100 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The sidecar cache of the derived statistics (the columnar MetricTables, see tables.py) of a benchmark file or store.
+# The cache is a directory (e.g., NAS-Bench-201-v1_0-e61699.pth.cache) with:
+#   fingerprint.json : the (name, size, mtime) of the source files and the MD5 checksum of their contents.
+#   tables-{name}/   : the .npy files of a MetricTables, which are memory-mapped when loaded.
+# If the size or mtime of a source file changes, the checksum is re-computed. The cache is kept (with the new stats)
+# if the contents are the same (e.g., the file is copied), otherwise all cached tables are removed.
+# For a store, the source files are the small meta.pth and index.npy files of its base and delta shards.
+############################################################################################
+import os, json, shutil, hashlib
+from .tables import MetricTables
+
+
+def source_files(source):
+  if os.path.isfile(source): return [source]
+  files = [os.path.join(source, 'meta.pth'), os.path.join(source, 'index.npy')]
+  xdir  = os.path.join(source, 'deltas')
+  if os.path.isdir(xdir):
+    for name in sorted(os.listdir(xdir)):
+      if name.isdigit(): files += [os.path.join(xdir, name, 'meta.pth'), os.path.join(xdir, name, 'index.npy')]
+  return files
+
+
+def file_stats(source):
+  stats = []
+  for xfile in source_files(source):
+    xstat = os.stat(xfile)
+    stats.append( [os.path.relpath(xfile, os.path.dirname(source)), xstat.st_size, xstat.st_mtime_ns] )
+  return stats
+
+
+def checksum(source, chunk_size=1<<24):
+  md5 = hashlib.md5()
+  for xfile in source_files(source):
+    md5.update( os.path.basename(xfile).encode('utf-8') )
+    with open(xfile, 'rb') as cfile:
+      for chunk in iter(lambda: cfile.read(chunk_size), b''): md5.update(chunk)
+  return md5.hexdigest()
+
+
+class StatsCache(object):
+
+  def __init__(self, root, source, verbose=False):
+    self.root    = root
+    self.source  = source
+    self.verbose = verbose
+    self._valid  = None
+
+  def __repr__(self):
+    return ('{name}(root={root}, source={source})'.format(name=self.__class__.__name__, root=self.root, source=self.source))
+
+  def _fingerprint_path(self):
+    return os.path.join(self.root, 'fingerprint.json')
+
+  # check (only once) whether the cache matches the source, and reset the cache if it does not.
+  def is_valid(self):
+    if self._valid is None:
+      stats, xpath = file_stats(self.source), self._fingerprint_path()
+      fingerprint  = None
+      if os.path.isfile(xpath):
+        with open(xpath, 'r') as cfile: fingerprint = json.load(cfile)
+      if fingerprint is not None and fingerprint['stats'] == stats:
+        self._valid = True
+      else:
+        xchecksum = checksum(self.source)
+        matched   = fingerprint is not None and fingerprint['checksum'] == xchecksum
+        try:
+          if not matched and os.path.isdir(self.root):
+            if self.verbose: print('the cache in {:} is out of date, remove it'.format(self.root))
+            shutil.rmtree(self.root)
+          os.makedirs(self.root, exist_ok=True)
+          with open(xpath, 'w') as cfile: json.dump({'stats': stats, 'checksum': xchecksum}, cfile)
+          self._valid = True
+        except OSError as e: # the cache is optional, e.g., the directory may be read-only
+          if self.verbose: print('fail to write the cache into {:} : {:}'.format(self.root, e))
+          self._valid = matched
+    return self._valid
+
+  def load_tables(self, name):
+    xdir = os.path.join(self.root, 'tables-{:}'.format(name))
+    if not self.is_valid() or not os.path.isfile(os.path.join(xdir, 'meta.json')): return None
+    if self.verbose: print('load the cached tables from {:}'.format(xdir))
+    return MetricTables.load(xdir)
+
+  def save_tables(self, name, tables):
+    if not self.is_valid(): return None
+    xdir = os.path.join(self.root, 'tables-{:}'.format(name))
+    temp = '{:}.tmp-{:}'.format(xdir, os.getpid())
+    try:
+      tables.save(temp)
+      if os.path.isdir(xdir): shutil.rmtree(xdir)
+      os.rename(temp, xdir)
+      if self.verbose: print('save the tables into {:}'.format(xdir))
+      return xdir
+    except OSError as e:
+      if self.verbose: print('fail to save the tables into {:} : {:}'.format(xdir, e))
+      shutil.rmtree(temp, ignore_errors=True)
+      return None
@@ -0,0 +1,108 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The integer encoding of the cells in NAS-Bench-201.
+# A cell with 4 nodes has 6 edges (1<-0, 2<-0, 2<-1, 3<-0, 3<-1, 3<-2), and each edge selects one of 5 operations.
+# The code of a cell is the base-5 integer of its operation indexes, where the first edge (1<-0) is the most significant digit, i.e.,
+#   code = op(1<-0) * 5^5 + op(2<-0) * 5^4 + op(2<-1) * 5^3 + op(3<-0) * 5^2 + op(3<-1) * 5 + op(3<-2)
+# Therefore, the code is in [0, 15625) and equals to the rank of this cell in `CellStructure.gen_all`.
+# The operation index is the same as `str2matrix` in api.py: 0 for none, 1 for skip_connect, 2 for nor_conv_1x1, 3 for nor_conv_3x3, 4 for avg_pool_3x3.
+############################################################################################
+import random, numpy as np
+
+
+NAS_BENCH_201_OPS = ('none', 'skip_connect', 'nor_conv_1x1', 'nor_conv_3x3', 'avg_pool_3x3')
+OP2INDEX = {op: i for i, op in enumerate(NAS_BENCH_201_OPS)}
+
+
+def num_edges(max_nodes=4):
+  return max_nodes * (max_nodes - 1) // 2
+
+
+def num_codes(max_nodes=4, num_ops=len(NAS_BENCH_201_OPS)):
+  return num_ops ** num_edges(max_nodes)
+
+
+# the list of (to-node, from-node) for each digit in the code, from the most significant digit to the least significant digit
+def edge_list(max_nodes=4):
+  return [(i, j) for i in range(1, max_nodes) for j in range(i)]
+
+
+def str2ops(arch_str):
+  ops = []
+  for node_str in arch_str.split('+'):
+    inputs = [x for x in node_str.split('|') if x != '']
+    # the inputs are ordered by the input-node index, e.g., '|skip_connect~0|nor_conv_3x3~1|'
+    for xi, xinput in enumerate(inputs):
+      op_name, xin = xinput.split('~')
+      if int(xin) != xi: raise ValueError('the {:}-th input of {:} should come from the {:}-th node'.format(xi, node_str, xi))
+      ops.append( OP2INDEX[op_name] )
+  return ops
+
+
+def ops2code(ops, num_ops=len(NAS_BENCH_201_OPS)):
+  code = 0
+  for op in ops: code = code * num_ops + op
+  return code
+
+
+def code2ops(code, max_nodes=4, num_ops=len(NAS_BENCH_201_OPS)):
+  total = num_edges(max_nodes)
+  assert 0 <= code < num_ops ** total, 'invalid code : {:}'.format(code)
+  ops = [0] * total
+  for i in range(total-1, -1, -1):
+    code, ops[i] = divmod(code, num_ops)
+  return ops
+
+
+def str2code(arch_str):
+  return ops2code( str2ops(arch_str) )
+
+
+def code2lists(code, max_nodes=4):
+  ops, genotypes, k = code2ops(code, max_nodes), [], 0
+  for i in range(1, max_nodes):
+    xlist = []
+    for j in range(i):
+      xlist.append( (NAS_BENCH_201_OPS[ops[k]], j) )
+      k += 1
+    genotypes.append( tuple(xlist) )
+  return genotypes
+
+
+def code2str(code, max_nodes=4):
+  strings = []
+  for node_info in code2lists(code, max_nodes):
+    strings.append( '|{:}|'.format('|'.join(['{:}~{:}'.format(op, xin) for op, xin in node_info])) )
+  return '+'.join(strings)
+
+
+# encode an architecture string, an integer code or an object with the `tostr` function (e.g., CellStructure)
+def arch2code(arch):
+  if isinstance(arch, (int, np.integer)): return int(arch)
+  elif isinstance(arch, str): return str2code(arch)
+  elif hasattr(arch, 'tostr'): return str2code(arch.tostr())
+  else: raise ValueError('invalid type of arch : {:}'.format(type(arch)))
+
+
+# randomly switch the operation on one edge to another operation
+def mutate_code(code, max_nodes=4, num_ops=len(NAS_BENCH_201_OPS), rng=random):
+  total = num_edges(max_nodes)
+  digit = rng.randint(0, total-1)
+  base  = num_ops ** (total - 1 - digit)
+  xop   = (code // base) % num_ops
+  nop   = (xop + rng.randint(1, num_ops-1)) % num_ops
+  return code + (nop - xop) * base
+
+
+# The vectorized version of `code2ops` and `ops2code` : [N] int64 array <-> [N, num-edges] int64 array.
+def codes2ops(codes, max_nodes=4, num_ops=len(NAS_BENCH_201_OPS)):
+  codes = np.asarray(codes, dtype=np.int64)
+  bases = num_ops ** np.arange(num_edges(max_nodes)-1, -1, -1, dtype=np.int64)
+  return (codes[..., None] // bases) % num_ops
+
+
+def ops2codes(ops, num_ops=len(NAS_BENCH_201_OPS)):
+  ops   = np.asarray(ops, dtype=np.int64)
+  bases = num_ops ** np.arange(ops.shape[-1]-1, -1, -1, dtype=np.int64)
+  return (ops * bases).sum(axis=-1)
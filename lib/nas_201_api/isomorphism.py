@@ -0,0 +1,92 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The equivalence classes of the cells in NAS-Bench-201, where the cells in the same class compute the same function.
+# The canonical form follows `Structure.to_unique_str(consider_zero=True)`, i.e., 'skip_connect' is the identity,
+# 'none' and any operation on a zero input are zero. In addition, the zero terms are removed from the sum of a node,
+# and a node whose inputs are all zero is zero, so that the cells only differ in the edges downstream of 'none' are merged.
+# The canonical index of a class is the smallest index of its cells. It is saved in a .npy file named by the fingerprint
+# of 'meta_archs', so that it is only computed once for a benchmark file.
+############################################################################################
+import os, hashlib, numpy as np
+
+
+ZERO = '#'
+
+
+def unique_str(arch_str):
+  nodes = {0: '0'}
+  for inode, node_str in enumerate(arch_str.split('+')):
+    terms = []
+    for xinput in node_str.split('|'):
+      if xinput == '': continue
+      op, xin = xinput.split('~')
+      xin = nodes[int(xin)]
+      if op == 'none' or xin == ZERO: continue
+      elif op == 'skip_connect': terms.append( xin )
+      else: terms.append( '(' + xin + ')@' + op )
+    nodes[inode+1] = '+'.join(sorted(terms)) if len(terms) > 0 else ZERO
+  return nodes[len(nodes)-1]
+
+
+def fingerprint(meta_archs):
+  return hashlib.md5( '\n'.join(meta_archs).encode('utf-8') ).hexdigest()
+
+
+class EquivalenceIndex(object):
+
+  def __init__(self, canonical):
+    self.canonical = np.asarray(canonical, dtype=np.int64)
+    # sort the indexes by their class, and members[starts[i]:starts[i]+counts[i]] is the class of canonical index
+    self.members   = np.argsort(self.canonical, kind='stable')
+    classes, starts, counts = np.unique(self.canonical[self.members], return_index=True, return_counts=True)
+    self.starts    = np.full(len(self.canonical), -1, dtype=np.int64)
+    self.counts    = np.zeros(len(self.canonical), dtype=np.int64)
+    self.starts[classes], self.counts[classes] = starts, counts
+    self.num_classes = len(classes)
+
+  def __repr__(self):
+    return ('{name}({num} classes over {total} architectures)'.format(name=self.__class__.__name__, num=self.num_classes, total=len(self.canonical)))
+
+  def __len__(self):
+    return len(self.canonical)
+
+  def canonical_index(self, index):
+    return int(self.canonical[index])
+
+  # return the sorted indexes of all architectures in the same class of the `index`-th architecture
+  def equivalence_class(self, index):
+    xclass = self.canonical[index]
+    start  = self.starts[xclass]
+    return self.members[start:start+self.counts[xclass]].tolist()
+
+  # return the canonical indexes of all classes
+  def classes(self):
+    return np.nonzero(self.counts)[0]
+
+  @staticmethod
+  def create_from_archs(meta_archs):
+    str2canonical, canonical = dict(), np.zeros(len(meta_archs), dtype=np.int64)
+    for index, arch_str in enumerate(meta_archs):
+      canonical[index] = str2canonical.setdefault(unique_str(arch_str), index)
+    return EquivalenceIndex(canonical)
+
+  # load the cached index from `cache_dir` if it exists, otherwise create it and try to save it into `cache_dir`.
+  @staticmethod
+  def load_or_create(meta_archs, cache_dir=None, verbose=False):
+    cache_path = None if cache_dir is None else os.path.join(cache_dir, 'NAS-Bench-201-isomorphism-{:}.npy'.format(fingerprint(meta_archs)))
+    if cache_path is not None and os.path.isfile(cache_path):
+      canonical = np.load(cache_path)
+      if len(canonical) == len(meta_archs):
+        if verbose: print('load the equivalence classes from {:}'.format(cache_path))
+        return EquivalenceIndex(canonical)
+    index = EquivalenceIndex.create_from_archs(meta_archs)
+    if cache_path is not None:
+      try:
+        temp_path = '{:}.{:}.tmp.npy'.format(cache_path[:-4], os.getpid())
+        np.save(temp_path, index.canonical)
+        os.replace(temp_path, cache_path)
+        if verbose: print('save the equivalence classes into {:}'.format(cache_path))
+      except OSError as e: # the cache is optional, e.g., the directory may be read-only
+        if verbose: print('fail to save the equivalence classes into {:} : {:}'.format(cache_path, e))
+    return index
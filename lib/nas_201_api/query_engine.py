@@ -0,0 +1,137 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# A multi-objective query engine over the columnar tables (see tables.py).
+# An objective is 'accuracy' (higher is better), 'loss', 'flops', 'params' or 'latency' (lower is better),
+# where accuracy and loss are averaged over trials on (dataset, setname, iepoch), and the costs only depend on the dataset.
+# -- topk          : the top-k architectures of an objective under the upper bounds of the costs.
+# -- pareto_front  : the non-dominated architectures of two or more objectives under the upper bounds of the costs.
+# -- rank_weighted : the architectures ranked by a weighted sum of the min-max normalized objectives.
+# The objective values, the sorted orders and the unconstrained Pareto fronts are computed at the first query and cached,
+# so a repeated query with different bounds only needs a few vectorized operations over the cached order.
+############################################################################################
+import numpy as np
+from .tables import COSTS
+
+
+OBJECTIVES = ('accuracy', 'loss') + COSTS
+HIGHER_IS_BETTER = ('accuracy',)
+
+
+class QueryEngine(object):
+
+  def __init__(self, tables):
+    self.tables  = tables
+    self._values = dict()
+    self._orders = dict()
+    self._fronts = dict()
+    self._ranges = dict()
+
+  def __repr__(self):
+    return ('{name}({tables}, {num} cached objectives, {fronts} cached fronts)'.format(name=self.__class__.__name__, tables=self.tables, num=len(self._values), fronts=len(self._fronts)))
+
+  def clear(self):
+    for cache in (self._values, self._orders, self._fronts, self._ranges): cache.clear()
+
+  def _key(self, objective, dataset, setname, iepoch):
+    assert objective in OBJECTIVES, 'invalid objective : {:} not in {:}'.format(objective, OBJECTIVES)
+    if objective in COSTS: return (objective, dataset)
+    else                 : return (objective, dataset, setname, iepoch)
+
+  # return the [arch] array of an objective, where lower is better (accuracy is negated) and NaN is +inf.
+  def values(self, objective, dataset, setname=None, iepoch=None):
+    key = self._key(objective, dataset, setname, iepoch)
+    if key not in self._values:
+      if objective in COSTS: values = self.tables.costs(dataset)[objective].astype(np.float64)
+      else                 : values = self.tables.seed_mean(dataset, setname, iepoch, objective)
+      if objective in HIGHER_IS_BETTER: values = -values
+      values = np.where(np.isnan(values) | ~self.tables.evaluated, np.inf, values)
+      values.flags.writeable = False
+      self._values[key] = values
+    return self._values[key]
+
+  # return the indexes of the valid architectures in the ascending order of an objective (i.e., from the best to the worst).
+  def order(self, objective, dataset, setname=None, iepoch=None):
+    key = self._key(objective, dataset, setname, iepoch)
+    if key not in self._orders:
+      values = self.values(objective, dataset, setname, iepoch)
+      valid  = np.nonzero(np.isfinite(values))[0]
+      order  = valid[np.argsort(values[valid], kind='stable')]
+      order.flags.writeable = False
+      self._orders[key] = order
+    return self._orders[key]
+
+  # `constraints` is a dict of {cost: upper-bound}, e.g., {'flops': 100, 'latency': 0.02}
+  def _satisfy(self, indexes, dataset, constraints):
+    mask = np.ones(len(indexes), dtype=bool)
+    if constraints is None: return mask
+    for cost, bound in constraints.items():
+      assert cost in COSTS, 'invalid constraint : {:} not in {:}'.format(cost, COSTS)
+      if bound is None: continue
+      mask &= self.values(cost, dataset)[indexes] <= bound
+    return mask
+
+  def _original(self, objective, values):
+    return -values if objective in HIGHER_IS_BETTER else values
+
+  # return the indexes and values of the top-k architectures of `objective`, which satisfy `constraints`.
+  def topk(self, dataset, setname, k, objective='accuracy', iepoch=None, constraints=None):
+    order = self.order(objective, dataset, setname, iepoch)
+    order = order[self._satisfy(order, dataset, constraints)][:k]
+    return order, self._original(objective, self.values(objective, dataset, setname, iepoch)[order])
+
+  # return the indexes of the non-dominated architectures on `objectives`, in the order of the first objective (from the best).
+  def pareto_front(self, dataset, setname, objectives=('accuracy', 'params'), iepoch=None, constraints=None):
+    assert len(objectives) >= 2, 'there should be at least two objectives instead of {:}'.format(objectives)
+    key = tuple(self._key(x, dataset, setname, iepoch) for x in objectives)
+    if key not in self._fronts:
+      self._fronts[key] = self._skyline(dataset, setname, objectives, iepoch, None)
+    front = self._fronts[key]
+    if constraints is None or all(bound is None for bound in constraints.values()): return front.copy()
+    # bounding the costs that are objectives keeps the points on the unconstrained front non-dominated and does not add new points
+    if all(cost in objectives for cost, bound in constraints.items() if bound is not None):
+      return front[self._satisfy(front, dataset, constraints)]
+    return self._skyline(dataset, setname, objectives, iepoch, constraints)
+
+  def _skyline(self, dataset, setname, objectives, iepoch, constraints):
+    values = np.stack([self.values(x, dataset, setname, iepoch) for x in objectives], axis=1)
+    valid  = np.nonzero(np.isfinite(values).all(axis=1))[0]
+    valid  = valid[self._satisfy(valid, dataset, constraints)]
+    # sort by all objectives lexicographically, then a point can only be dominated by the points before it
+    order  = valid[np.lexsort(values[valid].T[::-1])]
+    if len(objectives) == 2:
+      second = values[order, 1]
+      keep   = np.concatenate(([True], second[1:] < np.minimum.accumulate(second)[:-1])) if len(order) > 0 else np.zeros(0, dtype=bool)
+      return order[keep]
+    front = []
+    for index in order:
+      if len(front) > 0:
+        xfront = values[front]
+        if ((xfront <= values[index]).all(axis=1) & (xfront < values[index]).any(axis=1)).any(): continue
+      front.append( index )
+    return np.array(front, dtype=np.int64)
+
+  # the (min, max) of an objective over the valid architectures, which is used for normalization
+  def _range(self, objective, dataset, setname, iepoch):
+    key = self._key(objective, dataset, setname, iepoch)
+    if key not in self._ranges:
+      order  = self.order(objective, dataset, setname, iepoch)
+      values = self.values(objective, dataset, setname, iepoch)
+      self._ranges[key] = (values[order[0]], values[order[-1]]) if len(order) > 0 else (0., 1.)
+    return self._ranges[key]
+
+  # rank the architectures by the weighted sum of the objectives, which are min-max normalized into [0, 1] with 0 as the best.
+  # `weights` is a dict of {objective: weight}, e.g., {'accuracy': 1.0, 'latency': 0.5}, and the weights should be positive.
+  # It returns the indexes and scores (lower is better) of the top-k architectures.
+  def rank_weighted(self, dataset, setname, weights, k=None, iepoch=None, constraints=None):
+    assert len(weights) > 0, 'invalid weights : {:}'.format(weights)
+    scores = np.zeros(len(self.tables.evaluated), dtype=np.float64)
+    for objective, weight in weights.items():
+      assert weight > 0, 'the weight of {:} should be positive instead of {:}'.format(objective, weight)
+      xmin, xmax = self._range(objective, dataset, setname, iepoch)
+      scores += weight * (self.values(objective, dataset, setname, iepoch) - xmin) / max(xmax - xmin, 1e-12)
+    valid = np.nonzero(np.isfinite(scores))[0]
+    valid = valid[self._satisfy(valid, dataset, constraints)]
+    order = valid[np.argsort(scores[valid], kind='stable')]
+    if k is not None: order = order[:k]
+    return order, scores[order]
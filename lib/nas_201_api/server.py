@@ -0,0 +1,236 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# A local query server, which holds one NASBench201API and answers the queries of many short-lived clients,
+# so that a client does not load the benchmark and the memory does not grow with the number of clients.
+# The address is a path of a Unix socket (e.g., /tmp/NAS-Bench-201.sock) or a 'host:port' string (e.g., localhost:7201).
+# Protocol: each message is an 8-byte (little-endian uint64) length followed by a pickled object.
+#   request  : a list of calls, each call is (method-name, args, kwargs).
+#   response : a list of (True, result) or (False, exception), one for each call.
+# Only the methods in `QUERY_METHODS` (of the API) and `SERVER_METHODS` (of QueryServer) are served.
+# The messages are pickled, so only bind the server to a local address.
+############################################################################################
+import os, copy, socket, struct, pickle, random, threading, socketserver
+from collections import OrderedDict
+
+
+QUERY_METHODS = ('__len__', 'arch', 'query_index_by_arch', 'query_index_by_code', 'query_code_by_index',
+                 'get_more_info', 'get_more_info_batch', 'get_cost_info', 'find_best', 'canonical_index', 'equivalence_class')
+SERVER_METHODS = ('get_more_info_batch_rng',)
+# the results of these methods are cached by the client if they are deterministic (see `NASBench201Client._cacheable`)
+CACHEABLE_METHODS = ('__len__', 'arch', 'query_index_by_arch', 'query_index_by_code', 'query_code_by_index',
+                     'get_more_info', 'get_cost_info', 'find_best', 'canonical_index', 'equivalence_class')
+
+
+def parse_address(address):
+  if isinstance(address, tuple): return socket.AF_INET, address
+  if ':' in address and os.sep not in address:
+    host, port = address.rsplit(':', 1)
+    return socket.AF_INET, (host, int(port))
+  return socket.AF_UNIX, address
+
+
+def recv_exact(sock, size):
+  buffer, received = bytearray(size), 0
+  view = memoryview(buffer)
+  while received < size:
+    num = sock.recv_into(view[received:], size - received)
+    if num == 0: return None # the connection is closed
+    received += num
+  return buffer
+
+
+def send_message(sock, obj):
+  data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+  sock.sendall(struct.pack('<Q', len(data)) + data)
+
+
+def recv_message(sock):
+  header = recv_exact(sock, 8)
+  if header is None: return None
+  size, = struct.unpack('<Q', header)
+  data = recv_exact(sock, size)
+  if data is None: return None
+  return pickle.loads(data)
+
+
+class QueryHandler(socketserver.BaseRequestHandler):
+
+  def handle(self):
+    while True:
+      calls = recv_message(self.request)
+      if calls is None: break
+      send_message(self.request, [self.server.query_server.dispatch(*call) for call in calls])
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+  daemon_threads = True
+  allow_reuse_address = True
+
+
+class QueryServer(object):
+
+  def __init__(self, api, address):
+    self.api = api
+    self.family, self.address = parse_address(address)
+    if self.family == socket.AF_UNIX:
+      if os.path.exists(self.address): os.remove(self.address) # a stale socket of a dead server
+      self.server = ThreadingUnixServer(self.address, QueryHandler)
+    else:
+      self.server = ThreadingTCPServer(self.address, QueryHandler)
+      self.address = self.server.server_address # the real port if the port is 0
+    self.server.query_server = self
+
+  def __repr__(self):
+    return ('{name}({api}, address={address})'.format(name=self.__class__.__name__, api=self.api, address=self.address))
+
+  def dispatch(self, name, args, kwargs):
+    try:
+      if name in SERVER_METHODS: return (True, getattr(self, name)(*args, **kwargs))
+      if name not in QUERY_METHODS: raise ValueError('invalid method : {:} not in {:}'.format(name, QUERY_METHODS + SERVER_METHODS))
+      return (True, getattr(self.api, name)(*args, **kwargs))
+    except Exception as e:
+      try   : pickle.dumps(e)
+      except Exception: e = RuntimeError('{:}: {:}'.format(type(e).__name__, e))
+      return (False, e)
+
+  # `rng` is a copy of the RandomState of the client, and its advanced state is sent back to the client
+  def get_more_info_batch_rng(self, indexes, dataset, iepoch, use_12epochs_result, seed_policy, rng):
+    info = self.api.get_more_info_batch(indexes, dataset, iepoch, use_12epochs_result, seed_policy, rng)
+    return info, rng.get_state()
+
+  def serve_forever(self):
+    self.server.serve_forever()
+
+  # serve in a daemon thread, which is used when the server is started by a search script
+  def start(self):
+    thread = threading.Thread(target=self.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+  def shutdown(self):
+    self.server.shutdown()
+    self.server.server_close()
+    if self.family == socket.AF_UNIX and os.path.exists(self.address): os.remove(self.address)
+
+
+"""
+A drop-in replacement of NASBench201API for the query functions, which forwards the queries to a QueryServer.
+The deterministic results are kept in a LRU cache with `cache_size` entries (0 disables the cache).
+`call_many` sends many queries in one round-trip, e.g.,
+  infos = client.call_many([('get_more_info', (index, 'cifar10-valid', None, True, False), {}) for index in indexes])
+"""
+class NASBench201Client(object):
+
+  def __init__(self, address, cache_size=65536):
+    self.family, self.address = parse_address(address)
+    self.cache_size = cache_size
+    self._cache = OrderedDict()
+    self._lock  = threading.Lock()
+    self._sock  = socket.socket(self.family, socket.SOCK_STREAM)
+    self._sock.connect(self.address)
+    self._num   = None
+    self.hits, self.misses = 0, 0
+
+  def __repr__(self):
+    return ('{name}(address={address}, {num}/{size} cached, hits={hits}, misses={misses})'.format(name=self.__class__.__name__, address=self.address, num=len(self._cache), size=self.cache_size, hits=self.hits, misses=self.misses))
+
+  def close(self):
+    if self._sock is not None:
+      self._sock.close()
+      self._sock = None
+
+  def _cacheable(self, name, args, kwargs):
+    if self.cache_size <= 0 or name not in CACHEABLE_METHODS: return False
+    # a random trial is selected by `get_more_info` (is_random=True by default), which should not be cached
+    if name == 'get_more_info':
+      is_random = kwargs['is_random'] if 'is_random' in kwargs else (args[4] if len(args) > 4 else True)
+      if isinstance(is_random, bool) and is_random: return False
+    return True
+
+  def _key(self, name, args, kwargs):
+    key = (name, args, tuple(sorted(kwargs.items())))
+    try:
+      hash(key)
+      return key
+    except TypeError: # e.g., a list in the arguments
+      return None
+
+  # `calls` is a list of (method-name, args, kwargs), and the results are returned in the same order.
+  def call_many(self, calls):
+    results, keys, missing = [None] * len(calls), [None] * len(calls), []
+    with self._lock:
+      for i, (name, args, kwargs) in enumerate(calls):
+        args = tuple(args)
+        if self._cacheable(name, args, kwargs): keys[i] = self._key(name, args, kwargs)
+        if keys[i] is not None and keys[i] in self._cache:
+          self._cache.move_to_end(keys[i])
+          results[i] = copy.deepcopy(self._cache[keys[i]]) # the caller may modify the returned dict
+          self.hits += 1
+        else:
+          missing.append( i )
+      if len(missing) == 0: return results
+      self.misses += len(missing)
+      send_message(self._sock, [(calls[i][0], tuple(calls[i][1]), calls[i][2]) for i in missing])
+      responses = recv_message(self._sock)
+      if responses is None: raise ConnectionError('the query server at {:} is closed'.format(self.address))
+      for i, (ok, result) in zip(missing, responses):
+        if not ok: raise result
+        if keys[i] is not None:
+          self._cache[keys[i]] = result
+          if len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+          result = copy.deepcopy(result)
+        results[i] = result
+    return results
+
+  def call(self, name, *args, **kwargs):
+    return self.call_many([(name, args, kwargs)])[0]
+
+  def __len__(self):
+    if self._num is None: self._num = self.call('__len__')
+    return self._num
+
+  def random(self):
+    return random.randint(0, len(self)-1)
+
+  def arch(self, index):
+    return self.call('arch', index)
+
+  def query_index_by_arch(self, arch):
+    if hasattr(arch, 'tostr'): arch = arch.tostr() # send the string instead of the object
+    return self.call('query_index_by_arch', arch)
+
+  def query_index_by_code(self, code):
+    return self.call('query_index_by_code', code)
+
+  def query_code_by_index(self, index):
+    return self.call('query_code_by_index', index)
+
+  def get_more_info(self, index, dataset, iepoch=None, use_12epochs_result=False, is_random=True):
+    return self.call('get_more_info', index, dataset, iepoch, use_12epochs_result, is_random)
+
+  # the same as NASBench201API.get_more_info_batch, where a RandomState `rng` is advanced as it is used locally
+  def get_more_info_batch(self, indexes, dataset, iepoch=None, use_12epochs_result=False, seed_policy='random', rng=None):
+    if rng is None or (isinstance(rng, int) and not isinstance(rng, bool)):
+      return self.call('get_more_info_batch', indexes, dataset, iepoch, use_12epochs_result, seed_policy, rng)
+    if not hasattr(rng, 'get_state') or not hasattr(rng, 'set_state'):
+      raise ValueError('invalid rng : {:}, which should be None, an integer seed or a numpy RandomState'.format(type(rng)))
+    info, state = self.call('get_more_info_batch_rng', indexes, dataset, iepoch, use_12epochs_result, seed_policy, rng)
+    rng.set_state(state)
+    return info
+
+  def get_cost_info(self, index, dataset, use_12epochs_result=False):
+    return self.call('get_cost_info', index, dataset, use_12epochs_result)
+
+  def find_best(self, dataset, metric_on_set, FLOP_max=None, Param_max=None, use_12epochs_result=False):
+    return self.call('find_best', dataset, metric_on_set, FLOP_max, Param_max, use_12epochs_result)
+
+  def canonical_index(self, index):
+    return self.call('canonical_index', index)
+
+  def equivalence_class(self, index):
+    return self.call('equivalence_class', index)
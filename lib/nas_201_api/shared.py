@@ -0,0 +1,102 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# Share one copy of NAS-Bench-201 among the processes on a host.
+# `share_api` saves the read-only data of an API into a directory, which is in the POSIX shared memory (/dev/shm) by default:
+#   shared.json          : the version, the number of architectures and the store directory (if the API is created from a store).
+#   meta_archs.npy       : the architecture strings.
+#   evaluated.npy        : the evaluated indexes.
+#   index2code.npy       : see encoding.py.
+#   code2index.npy       : see encoding.py.
+#   tables-{less,full}/  : the columnar tables (see tables.py).
+# `NASBench201API(shared_dir)` memory-maps these files, so that the creation does not parse anything and
+# all processes share the same physical pages. The results of each architecture are read from the store, thus only an API
+# created from a store can be shared, and a single-file benchmark should be converted by `convert_to_store` (see store.py) first.
+# The default directory (/dev/shm/NAS-Bench-201-shared-{pid}) is removed when the process exits, and the directories left by
+# the dead processes (e.g., killed by a signal) are removed by the next `share_api` with the default directory.
+############################################################################################
+import os, re, json, atexit, shutil, tempfile, numpy as np
+
+
+SHARED_VERSION = 'v1'
+
+
+def is_shared(path):
+  return isinstance(path, str) and os.path.isdir(path) and os.path.isfile(os.path.join(path, 'shared.json'))
+
+
+def default_shared_root():
+  return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def is_alive(pid):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError: # the process exists but belongs to another user
+    return True
+  return True
+
+
+# remove the default shared directories (and the temporary ones) of the dead processes in `root`
+def release_stale_shared(root=None, verbose=True):
+  root = default_shared_root() if root is None else root
+  for name in sorted(os.listdir(root)):
+    match = re.match(r'^NAS-Bench-201-shared-(\d+)(\.tmp-\d+)?$', name)
+    if match is None or is_alive(int(match.group(1))): continue
+    if verbose: print('remove the stale shared directory {:}'.format(os.path.join(root, name)))
+    shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def release_at_exit(shared_dir, pid):
+  if os.getpid() == pid: release_shared(shared_dir) # not in the forked processes
+
+
+def share_api(api, save_dir=None, kinds=('less', 'full'), verbose=True):
+  if api.store is None:
+    raise ValueError('only the API created from a store can be shared, please convert {:} by convert_to_store first'.format(api.filename))
+  if save_dir is None:
+    release_stale_shared(verbose=verbose)
+    save_dir = os.path.join(default_shared_root(), 'NAS-Bench-201-shared-{:}'.format(os.getpid()))
+    atexit.register(release_at_exit, save_dir, os.getpid())
+  temp_dir = '{:}.tmp-{:}'.format(save_dir.rstrip(os.sep), os.getpid())
+  os.makedirs(temp_dir, exist_ok=False)
+  np.save(os.path.join(temp_dir, 'meta_archs.npy'), np.array(list(api.meta_archs)))
+  np.save(os.path.join(temp_dir, 'evaluated.npy'), np.array(sorted(list(api.evaluated_indexes)), dtype=np.int64))
+  np.save(os.path.join(temp_dir, 'index2code.npy'), api.index2code)
+  np.save(os.path.join(temp_dir, 'code2index.npy'), api.code2index)
+  for kind in kinds:
+    api.get_tables(kind == 'less').save(os.path.join(temp_dir, 'tables-{:}'.format(kind)))
+  store_dir = os.path.abspath(api.store.root)
+  with open(os.path.join(temp_dir, 'shared.json'), 'w') as cfile:
+    json.dump({'version': SHARED_VERSION, 'num': len(api), 'store': store_dir, 'kinds': list(kinds)}, cfile)
+  if os.path.isdir(save_dir): shutil.rmtree(save_dir)
+  os.rename(temp_dir, save_dir)
+  if verbose: print('share {:} into {:}'.format(api, save_dir))
+  return save_dir
+
+
+def release_shared(shared_dir):
+  if is_shared(shared_dir): shutil.rmtree(shared_dir)
+
+
+class SharedData(object):
+
+  def __init__(self, root):
+    assert is_shared(root), 'invalid shared directory : {:}'.format(root)
+    self.root = root
+    with open(os.path.join(root, 'shared.json'), 'r') as cfile:
+      self.meta = json.load(cfile)
+    assert self.meta['version'] == SHARED_VERSION, 'invalid version : {:} vs {:}'.format(self.meta['version'], SHARED_VERSION)
+    self.meta_archs = np.load(os.path.join(root, 'meta_archs.npy'), mmap_mode='r')
+    self.evaluated  = np.load(os.path.join(root, 'evaluated.npy'), mmap_mode='r')
+    self.index2code = np.load(os.path.join(root, 'index2code.npy'), mmap_mode='r')
+    self.code2index = np.load(os.path.join(root, 'code2index.npy'), mmap_mode='r')
+    self.store      = self.meta['store']
+
+  def tables_dir(self, kind):
+    return os.path.join(self.root, 'tables-{:}'.format(kind)) if kind in self.meta['kinds'] else None
+
+  def __repr__(self):
+    return ('{name}({num} architectures, store={store}, root={root})'.format(name=self.__class__.__name__, num=self.meta['num'], store=self.store, root=self.root))
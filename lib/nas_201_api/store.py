@@ -0,0 +1,291 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# A lazy and memory-mapped on-disk layout of NAS-Bench-201.
+# A store is a directory with three files (and an optional 'weights' directory, see weights.py):
+#   meta.pth    : a small dict with 'meta_archs', 'evaluated_indexes' and 'version'.
+#   index.npy   : an int64 array with the shape of [number-of-archs, 2, 2].
+#                 index[i, k] is the (offset, length) of the record for the i-th arch in records.bin,
+#                 where k=0 is the 12-epoch ('less') record and k=1 is the 200-epoch ('full') record.
+#                 A record that does not exist is marked by (-1, 0).
+#   records.bin : the concatenation of all records, each record is the `torch.save`d state-dict of an ArchResults.
+# Opening a store only reads meta.pth and memory-maps the others,
+# and a record is deserialized only when its architecture is queried for the first time.
+#
+# A store is append-only. New trials (e.g., new seeds or datasets of some architectures) are appended as a delta shard
+# by `append_delta`, which is a directory deltas/NNNNN with its own index.npy, records.bin and meta.pth (the evaluated indexes).
+# When an architecture is read, its base record and the records in all deltas (in the order of NNNNN) are merged,
+# where a (dataset, seed) trial in a later shard overwrites the same trial in an earlier shard.
+# `compact_store` folds all deltas into the base shard.
+############################################################################################
+import io, os, mmap, shutil, threading, torch, numpy as np
+from collections.abc import MutableMapping
+from .weights import write_weight_store, strip_weights
+
+
+STORE_VERSION = 'v1'
+STORE_KINDS   = ('less', 'full')
+
+
+def is_store(path):
+  return isinstance(path, str) and os.path.isdir(path) and os.path.isfile(os.path.join(path, 'meta.pth'))
+
+
+# merge the state-dict of an ArchResults in a delta shard into that in an earlier shard, without modifying both of them
+def merge_state_dicts(base, delta):
+  if base is None: return delta
+  merged       = dict(base)
+  all_results  = dict(base['all_results'])
+  dataset_seed = {key: list(value) for key, value in base['dataset_seed'].items()}
+  for (dataset, seed), result in delta['all_results'].items():
+    all_results[(dataset, seed)] = result
+    seeds = dataset_seed.setdefault(dataset, [])
+    if seed not in seeds: dataset_seed[dataset] = sorted(seeds + [seed])
+  merged['all_results'], merged['dataset_seed'] = all_results, dataset_seed
+  merged['clear_net_done'] = base.get('clear_net_done', False) and delta.get('clear_net_done', False)
+  return merged
+
+
+# A pair of index.npy and records.bin in the base directory or a delta directory of a store.
+class RecordShard(object):
+
+  def __init__(self, root, num_archs):
+    self.root  = root
+    self.index = np.load(os.path.join(root, 'index.npy'), mmap_mode='r')
+    assert self.index.shape == (num_archs, len(STORE_KINDS), 2), 'invalid index shape : {:}'.format(self.index.shape)
+    self._records = None
+    self._lock    = threading.Lock()
+
+  def _open_records(self):
+    if self._records is None:
+      with self._lock:
+        if self._records is None:
+          with open(os.path.join(self.root, 'records.bin'), 'rb') as cfile:
+            # an empty records.bin (e.g., a shard without any record) can not be memory-mapped
+            if os.fstat(cfile.fileno()).st_size == 0: self._records = b''
+            else: self._records = mmap.mmap(cfile.fileno(), 0, access=mmap.ACCESS_READ)
+    return self._records
+
+  def existing(self, kind):
+    return np.nonzero(self.index[:, STORE_KINDS.index(kind), 0] >= 0)[0]
+
+  def has(self, arch_index, kind):
+    offset, length = self.index[arch_index, STORE_KINDS.index(kind)]
+    return offset >= 0
+
+  def read(self, arch_index, kind):
+    offset, length = (int(x) for x in self.index[arch_index, STORE_KINDS.index(kind)])
+    if offset < 0: return None
+    records = self._open_records()
+    return torch.load(io.BytesIO(records[offset:offset+length]), map_location='cpu')
+
+  def close(self):
+    if self._records is not None:
+      if isinstance(self._records, mmap.mmap): self._records.close()
+      self._records = None
+
+
+# Write index.npy and records.bin for `arch2infos` ({arch-index: {'less': state-dict, 'full': state-dict}}) into `save_dir`.
+def write_shard(save_dir, num_archs, arch2infos, verbose=True):
+  index  = np.full((num_archs, len(STORE_KINDS), 2), -1, dtype=np.int64)
+  index[:, :, 1] = 0
+  offset = 0
+  with open(os.path.join(save_dir, 'records.bin'), 'wb') as cfile:
+    for i, arch_index in enumerate(sorted(list(arch2infos.keys()))):
+      for k, kind in enumerate(STORE_KINDS):
+        if kind not in arch2infos[arch_index]: continue
+        buffer = io.BytesIO()
+        torch.save(arch2infos[arch_index][kind], buffer)
+        record = buffer.getvalue()
+        cfile.write( record )
+        index[arch_index, k] = (offset, len(record))
+        offset += len(record)
+      if verbose and (i % 1000 == 0 or i + 1 == len(arch2infos)):
+        print('write [{:05d}/{:05d}] architectures, {:.1f} MB written.'.format(i+1, len(arch2infos), offset / 1e6))
+  np.save(os.path.join(save_dir, 'index.npy'), index)
+  return offset
+
+
+def delta_dirs(root):
+  xdir = os.path.join(root, 'deltas')
+  if not os.path.isdir(xdir): return []
+  return [os.path.join(xdir, x) for x in sorted(os.listdir(xdir)) if x.isdigit()]
+
+
+class BenchmarkStore(object):
+
+  def __init__(self, root):
+    assert is_store(root), 'invalid store directory : {:}'.format(root)
+    self.root = root
+    meta = torch.load(os.path.join(root, 'meta.pth'), map_location='cpu')
+    assert meta['version'] == STORE_VERSION, 'invalid store version : {:} vs {:}'.format(meta['version'], STORE_VERSION)
+    self.meta_archs        = meta['meta_archs']
+    self.evaluated_indexes = sorted(list(meta['evaluated_indexes']))
+    self.base   = RecordShard(root, len(self.meta_archs))
+    self.index  = self.base.index
+    self.deltas = []
+    self.refresh()
+
+  # load the delta shards appended after this store is opened, and return the indexes of the architectures in these shards
+  def refresh(self):
+    touched, evaluated = set(), set(self.evaluated_indexes)
+    for xdir in delta_dirs(self.root)[len(self.deltas):]:
+      shard = RecordShard(xdir, len(self.meta_archs))
+      for kind in STORE_KINDS: touched.update( shard.existing(kind).tolist() )
+      evaluated.update( torch.load(os.path.join(xdir, 'meta.pth'), map_location='cpu')['evaluated_indexes'] )
+      self.deltas.append( shard )
+    self.evaluated_indexes = sorted(list(evaluated))
+    return sorted(list(touched))
+
+  def shards(self):
+    return [self.base] + self.deltas
+
+  def existing(self, kind):
+    return set().union( *[shard.existing(kind).tolist() for shard in self.shards()] )
+
+  def has(self, arch_index, kind):
+    return any(shard.has(arch_index, kind) for shard in self.shards())
+
+  # return the state-dict of the ArchResults for the `arch_index`-th architecture, or None if it does not exist.
+  # The records in the base shard and all delta shards are merged.
+  def read(self, arch_index, kind):
+    state_dict = None
+    for shard in self.shards():
+      record = shard.read(arch_index, kind)
+      if record is not None: state_dict = merge_state_dicts(state_dict, record)
+    return state_dict
+
+  def close(self):
+    for shard in self.shards(): shard.close()
+
+  def __repr__(self):
+    return ('{name}({num}/{total} architectures, {deltas} deltas, root={root})'.format(name=self.__class__.__name__, num=len(self.evaluated_indexes), total=len(self.meta_archs), deltas=len(self.deltas), root=self.root))
+
+
+"""
+A dict-like container of ArchResults, which are created from the store when they are touched for the first time.
+It can be used in the same way as the `arch2infos_less` and `arch2infos_full` dicts of NASBench201API.
+"""
+class LazyArchInfos(MutableMapping):
+
+  def __init__(self, store, kind, create_fn):
+    assert kind in STORE_KINDS, 'invalid kind : {:}'.format(kind)
+    self.store     = store
+    self.kind      = kind
+    self.create_fn = create_fn
+    self._keys     = store.existing(kind) & set(store.evaluated_indexes)
+    self._cache    = dict()
+    self._lock     = threading.Lock()
+
+  # thread-safe: if several threads create the same ArchResults at the same time, all of them get the first one.
+  def __getitem__(self, arch_index):
+    if arch_index not in self._cache:
+      if arch_index not in self._keys: raise KeyError(arch_index)
+      value = self.create_fn( self.store.read(arch_index, self.kind) )
+      with self._lock:
+        return self._cache.setdefault(arch_index, value)
+    return self._cache[arch_index]
+
+  # the same as __getitem__ but does not keep the created ArchResults, which is used to scan all architectures once.
+  def peek(self, arch_index):
+    if arch_index in self._cache: return self._cache[arch_index]
+    if arch_index not in self._keys: raise KeyError(arch_index)
+    return self.create_fn( self.store.read(arch_index, self.kind) )
+
+  def __setitem__(self, arch_index, value):
+    self._keys.add( arch_index )
+    self._cache[arch_index] = value
+
+  def __delitem__(self, arch_index):
+    self._keys.remove( arch_index )
+    self._cache.pop(arch_index, None)
+
+  def __contains__(self, arch_index):
+    return arch_index in self._keys
+
+  def __iter__(self):
+    return iter(sorted(self._keys))
+
+  def __len__(self):
+    return len(self._keys)
+
+  # drop the cached ArchResults of `arch_indexes` (e.g., the architectures in the new deltas), which will be re-created from the store.
+  def invalidate(self, arch_indexes):
+    existing = self.store.existing(self.kind) & set(self.store.evaluated_indexes)
+    for arch_index in arch_indexes:
+      self._cache.pop(arch_index, None)
+      if arch_index in existing: self._keys.add( arch_index )
+
+  def num_loaded(self):
+    return len(self._cache)
+
+  def __repr__(self):
+    return ('{name}({kind}, {loaded}/{num} loaded)'.format(name=self.__class__.__name__, kind=self.kind, loaded=len(self._cache), num=len(self._keys)))
+
+
+# Convert the single-file benchmark (e.g., NAS-Bench-201-v1_0-e61699.pth) or the dict loaded from it into a store at `save_dir`.
+# If `split_weights` is True, the trained weights are moved into the weight store at `save_dir`/weights (see weights.py).
+def convert_to_store(file_path_or_dict, save_dir, verbose=True, split_weights=False):
+  if isinstance(file_path_or_dict, str):
+    if verbose: print('load the NAS-Bench-201 file from {:}'.format(file_path_or_dict))
+    file_path_or_dict = torch.load(file_path_or_dict, map_location='cpu')
+  assert isinstance(file_path_or_dict, dict), 'It should be a dict instead of {:}'.format(type(file_path_or_dict))
+  for key in ('meta_archs', 'arch2infos', 'evaluated_indexes'): assert key in file_path_or_dict, 'Can not find key[{:}] in the dict'.format(key)
+  os.makedirs(save_dir, exist_ok=True)
+  meta_archs = file_path_or_dict['meta_archs']
+  arch2infos = file_path_or_dict['arch2infos']
+  if split_weights:
+    write_weight_store(os.path.join(save_dir, 'weights'), arch2infos, verbose)
+    arch2infos = {arch_index: strip_weights(infos) for arch_index, infos in arch2infos.items()}
+  write_shard(save_dir, len(meta_archs), arch2infos, verbose)
+  torch.save({'meta_archs': list(meta_archs),
+              'evaluated_indexes': sorted(list(file_path_or_dict['evaluated_indexes'])),
+              'version': STORE_VERSION}, os.path.join(save_dir, 'meta.pth'))
+  if verbose: print('save the store into {:}'.format(save_dir))
+  return save_dir
+
+
+# Append the new trials in `arch2infos` ({arch-index: {'less': state-dict, 'full': state-dict}}) into the store as a delta shard.
+# The delta is written into a temporary directory and then renamed, so that readers never see a partial delta.
+def append_delta(store_dir, arch2infos, evaluated_indexes=None, verbose=True):
+  assert is_store(store_dir), 'invalid store directory : {:}'.format(store_dir)
+  meta_archs = torch.load(os.path.join(store_dir, 'meta.pth'), map_location='cpu')['meta_archs']
+  for arch_index in arch2infos.keys(): assert 0 <= arch_index < len(meta_archs), 'invalid arch index : {:}'.format(arch_index)
+  if evaluated_indexes is None: evaluated_indexes = arch2infos.keys()
+  xdir = os.path.join(store_dir, 'deltas')
+  os.makedirs(xdir, exist_ok=True)
+  temp_dir = os.path.join(xdir, '.tmp-{:}'.format(os.getpid()))
+  os.makedirs(temp_dir, exist_ok=False)
+  write_shard(temp_dir, len(meta_archs), arch2infos, verbose)
+  torch.save({'evaluated_indexes': sorted(list(evaluated_indexes))}, os.path.join(temp_dir, 'meta.pth'))
+  existing  = delta_dirs(store_dir)
+  delta_dir = os.path.join(xdir, '{:05d}'.format(int(os.path.basename(existing[-1])) + 1 if len(existing) > 0 else 0))
+  os.rename(temp_dir, delta_dir)
+  if verbose: print('append {:} architectures into {:}'.format(len(arch2infos), delta_dir))
+  return delta_dir
+
+
+# Fold all delta shards of a store into its base shard. Please do not read or append the store during compaction.
+def compact_store(store_dir, verbose=True):
+  store = BenchmarkStore(store_dir)
+  if len(store.deltas) == 0:
+    if verbose: print('there is no delta in {:}'.format(store_dir))
+    return store_dir
+  arch2infos = dict()
+  for kind in STORE_KINDS:
+    for arch_index in sorted(list(store.existing(kind))):
+      arch2infos.setdefault(arch_index, dict())[kind] = store.read(arch_index, kind)
+  temp_dir = os.path.join(store_dir, '.compact-{:}'.format(os.getpid()))
+  os.makedirs(temp_dir, exist_ok=False)
+  write_shard(temp_dir, len(store.meta_archs), arch2infos, verbose)
+  torch.save({'meta_archs': list(store.meta_archs),
+              'evaluated_indexes': store.evaluated_indexes,
+              'version': STORE_VERSION}, os.path.join(temp_dir, 'meta.pth'))
+  num_deltas = len(store.deltas)
+  store.close()
+  for xfile in ('records.bin', 'index.npy', 'meta.pth'):
+    os.replace(os.path.join(temp_dir, xfile), os.path.join(store_dir, xfile))
+  os.rmdir(temp_dir)
+  shutil.rmtree(os.path.join(store_dir, 'deltas'))
+  if verbose: print('fold {:} deltas into the base of {:}'.format(num_deltas, store_dir))
+  return store_dir
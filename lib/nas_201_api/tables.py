@@ -0,0 +1,208 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The columnar view of NAS-Bench-201, where the results of all architectures are saved in dense NumPy arrays.
+# -- 'accuracy', 'loss', 'all_time' : float32 arrays of [arch, dataset, setname, trial, epoch], NaN for missing values.
+#    'all_time' is the accumulated time cost from the first epoch to the current epoch.
+# -- 'seed'                         : int64 array of [arch, dataset, trial], -1 for the missing trials.
+# -- 'flops', 'params', 'latency'   : float32 arrays of [arch, dataset], averaged over trials (NaN if not available).
+# -- 'evaluated'                    : bool array of [arch].
+# -- 'epochs'                       : int64 array of [epoch-slot], the training epoch saved in each slot.
+# The queries (find_best, topk, pareto_front, etc) are vectorized over all architectures.
+############################################################################################
+import os, json, numpy as np
+
+
+DATASETS = ('cifar10-valid', 'cifar10', 'cifar100', 'ImageNet16-120')
+SETNAMES = ('train', 'x-valid', 'x-test', 'ori-test')
+METRICS  = ('accuracy', 'loss', 'all_time')
+COSTS    = ('flops', 'params', 'latency')
+
+
+def nanmean(values, axis):
+  # the mean over the non-NaN values, which is NaN (without a warning) if all values are NaN
+  valid  = ~np.isnan(values)
+  sums   = np.where(valid, values, 0).sum(axis=axis, dtype=np.float64)
+  counts = valid.sum(axis=axis)
+  return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+# return the per-epoch accuracy, loss and accumulated time of a ResultsCount on the `setname` set, NaN for missing values.
+def result_curves(result, setname):
+  if setname != 'train' and setname not in result.eval_names: return None
+  curves = result.get_curves(setname)
+  times  = curves['all_time'] if curves['all_time'] is not None else np.full(result.epochs, np.nan)
+  return curves['accuracy'], curves['loss'], times
+
+
+class MetricTables(object):
+
+  def __init__(self, meta, arrays):
+    self.meta      = dict(meta)
+    self.datasets  = list(meta['datasets'])
+    self.setnames  = list(meta['setnames'])
+    self.arrays    = arrays
+    for key, value in arrays.items(): setattr(self, key, value)
+    self.num_archs = len(self.evaluated)
+
+  def __repr__(self):
+    return ('{name}({num}/{total} architectures, {datasets}, {trials} trials, {epochs} epochs)'.format(name=self.__class__.__name__, num=int(self.evaluated.sum()), total=self.num_archs, datasets=self.datasets, trials=self.seed.shape[-1], epochs=len(self.epochs)))
+
+  def nbytes(self):
+    return sum(value.nbytes for value in self.arrays.values())
+
+  def dataset_index(self, dataset):
+    if dataset not in self.datasets: raise ValueError('invalid dataset : {:} not in {:}'.format(dataset, self.datasets))
+    return self.datasets.index(dataset)
+
+  def setname_index(self, setname):
+    if setname not in self.setnames: raise ValueError('invalid setname : {:} not in {:}'.format(setname, self.setnames))
+    return self.setnames.index(setname)
+
+  # the slot of the `iepoch`-th epoch, None indicates the last training epoch.
+  def epoch_slot(self, iepoch):
+    if iepoch is None: return len(self.epochs) - 1
+    slots = np.nonzero(self.epochs == iepoch)[0]
+    if len(slots) == 0: raise ValueError('the {:}-th epoch is not saved in {:}'.format(iepoch, self.epochs))
+    return int(slots[0])
+
+  # return the [arch, trial] array of `metric` on (dataset, setname, iepoch).
+  def trials(self, dataset, setname, iepoch=None, metric='accuracy'):
+    assert metric in METRICS, 'invalid metric : {:}'.format(metric)
+    return self.arrays[metric][:, self.dataset_index(dataset), self.setname_index(setname), :, self.epoch_slot(iepoch)]
+
+  # return the [arch] array of `metric` averaged over all trials.
+  def seed_mean(self, dataset, setname, iepoch=None, metric='accuracy'):
+    return nanmean(self.trials(dataset, setname, iepoch, metric), axis=-1)
+
+  # return the trial slot of each architecture in `indexes` for the `seed_policy`:
+  #   'random'   : a randomly selected trial for each architecture, sampled by `rng` (a np.random.RandomState, an integer seed or None)
+  #   'mean'     : None, which means averaging all trials
+  #   an integer : the trial whose random seed is this integer
+  def select_trials(self, indexes, dataset, seed_policy='random', rng=None):
+    seeds = self.seed[indexes, self.dataset_index(dataset)]
+    if isinstance(seed_policy, str) and seed_policy == 'mean':
+      return None
+    elif isinstance(seed_policy, str) and seed_policy == 'random':
+      if rng is None or isinstance(rng, int): rng = np.random.RandomState(rng)
+      counts = (seeds >= 0).sum(axis=-1)
+      slots  = (rng.random_sample(len(seeds)) * counts).astype(np.int64)
+      return np.minimum(slots, np.maximum(counts - 1, 0))
+    elif isinstance(seed_policy, (int, np.integer)) and not isinstance(seed_policy, bool):
+      matched = seeds == seed_policy
+      if not matched.any(axis=-1).all(): raise ValueError('can not find random seed ({:}) for all architectures on {:}'.format(seed_policy, dataset))
+      return matched.argmax(axis=-1)
+    else:
+      raise ValueError('invalid seed_policy : {:}'.format(seed_policy))
+
+  # return the [len(indexes)] array of `metric` on the trials of `slots` (the output of `select_trials`).
+  def gather(self, indexes, dataset, setname, iepoch=None, slots=None, metric='accuracy'):
+    assert metric in METRICS, 'invalid metric : {:}'.format(metric)
+    values = self.arrays[metric][indexes, self.dataset_index(dataset), self.setname_index(setname), :, self.epoch_slot(iepoch)]
+    if slots is None: return nanmean(values, axis=-1)
+    else            : return values[np.arange(len(values)), slots].astype(np.float64)
+
+  def costs(self, dataset):
+    index = self.dataset_index(dataset)
+    return {key: self.arrays[key][:, index] for key in COSTS}
+
+  # return a [arch] bool mask of the evaluated architectures that satisfy all constraints.
+  def constraint_mask(self, dataset, FLOP_max=None, Param_max=None, latency_max=None):
+    costs = self.costs(dataset)
+    mask  = self.evaluated.copy()
+    if FLOP_max    is not None: mask &= costs['flops']   <= FLOP_max
+    if Param_max   is not None: mask &= costs['params']  <= Param_max
+    if latency_max is not None: mask &= costs['latency'] <= latency_max
+    return mask
+
+  def find_best(self, dataset, setname, FLOP_max=None, Param_max=None, latency_max=None, iepoch=None):
+    accs  = self.seed_mean(dataset, setname, iepoch)
+    valid = self.constraint_mask(dataset, FLOP_max, Param_max, latency_max) & ~np.isnan(accs)
+    if not valid.any(): return -1, None
+    best_index = int(np.argmax(np.where(valid, accs, -np.inf)))
+    return best_index, float(accs[best_index])
+
+  # return the indexes and accuracies of the top-k architectures in the descending order of accuracy.
+  def topk(self, dataset, setname, k, FLOP_max=None, Param_max=None, latency_max=None, iepoch=None):
+    accs  = self.seed_mean(dataset, setname, iepoch)
+    valid = np.nonzero(self.constraint_mask(dataset, FLOP_max, Param_max, latency_max) & ~np.isnan(accs))[0]
+    order = valid[np.argsort(-accs[valid], kind='stable')][:k]
+    return order, accs[order]
+
+  # return the indexes of the architectures on the Pareto front of (higher accuracy, lower `cost`), in the ascending order of `cost`.
+  def pareto_front(self, dataset, setname, cost='params', FLOP_max=None, Param_max=None, latency_max=None, iepoch=None):
+    assert cost in COSTS, 'invalid cost : {:}'.format(cost)
+    accs  = self.seed_mean(dataset, setname, iepoch)
+    costs = self.costs(dataset)[cost]
+    valid = np.nonzero(self.constraint_mask(dataset, FLOP_max, Param_max, latency_max) & ~np.isnan(accs) & ~np.isnan(costs))[0]
+    if len(valid) == 0: return valid
+    order = valid[np.lexsort((-accs[valid], costs[valid]))]
+    xaccs = accs[order]
+    keep  = np.concatenate(([True], xaccs[1:] > np.maximum.accumulate(xaccs)[:-1]))
+    return order[keep]
+
+  # save all arrays as .npy files and the meta information as meta.json into `save_dir`
+  def save(self, save_dir):
+    os.makedirs(save_dir, exist_ok=True)
+    for key, value in self.arrays.items():
+      np.save(os.path.join(save_dir, '{:}.npy'.format(key)), value)
+    meta = {key: value.item() if isinstance(value, np.generic) else value for key, value in self.meta.items()}
+    meta['datasets'], meta['setnames'], meta['arrays'] = list(meta['datasets']), list(meta['setnames']), sorted(list(self.arrays.keys()))
+    with open(os.path.join(save_dir, 'meta.json'), 'w') as cfile:
+      json.dump(meta, cfile)
+    return save_dir
+
+  # load the tables saved by `save`, the arrays are memory-mapped (read-only) by default
+  @staticmethod
+  def load(save_dir, mmap_mode='r'):
+    with open(os.path.join(save_dir, 'meta.json'), 'r') as cfile:
+      meta = json.load(cfile)
+    arrays = {key: np.load(os.path.join(save_dir, '{:}.npy'.format(key)), mmap_mode=mmap_mode) for key in meta.pop('arrays')}
+    return MetricTables(meta, arrays)
+
+  @staticmethod
+  def create_from_api(api, use_12epochs_result=False, epochs=None):
+    arch2infos = api.arch2infos_less if use_12epochs_result else api.arch2infos_full
+    # avoid caching every ArchResults of a lazy store when scanning all of them
+    read_fn    = arch2infos.peek if hasattr(arch2infos, 'peek') else arch2infos.__getitem__
+    indexes    = [x for x in api.evaluated_indexes if x in arch2infos]
+    assert len(indexes) > 0, 'there is no evaluated architecture'
+    first      = read_fn(indexes[0])
+    total      = max(result.get_total_epoch() for result in first.all_results.values())
+    epochs     = np.arange(total, dtype=np.int64) if epochs is None else np.array(sorted(epochs), dtype=np.int64)
+    assert len(epochs) > 0 and epochs.min() >= 0 and epochs.max() < total, 'invalid epochs : {:}'.format(epochs)
+    num, trials, shape = len(api), 3, (len(DATASETS), len(SETNAMES))
+
+    arrays = {key: np.full((num,) + shape + (trials, len(epochs)), np.nan, dtype=np.float32) for key in METRICS}
+    arrays['seed']      = np.full((num, len(DATASETS), trials), -1, dtype=np.int64)
+    arrays.update( {key: np.full((num, len(DATASETS)), np.nan, dtype=np.float32) for key in COSTS} )
+    arrays['evaluated'] = np.zeros(num, dtype=bool)
+    arrays['epochs']    = epochs
+    for arch_index in indexes:
+      archresult = first if arch_index == indexes[0] else read_fn(arch_index)
+      arrays['evaluated'][arch_index] = True
+      for dataset in archresult.get_dataset_names():
+        if dataset not in DATASETS: continue
+        ida, seeds = DATASETS.index(dataset), archresult.dataset_seed[dataset]
+        if len(seeds) > trials: # enlarge the trial axis
+          extra  = len(seeds) - trials
+          for key in METRICS:
+            arrays[key] = np.concatenate((arrays[key], np.full(arrays[key].shape[:3] + (extra, len(epochs)), np.nan, dtype=np.float32)), axis=3)
+          arrays['seed'] = np.concatenate((arrays['seed'], np.full((num, len(DATASETS), extra), -1, dtype=np.int64)), axis=2)
+          trials = len(seeds)
+        results = [archresult.all_results[(dataset, seed)] for seed in seeds]
+        for itrial, (seed, result) in enumerate(zip(seeds, results)):
+          if result.epochs != total: raise ValueError('{:}-th arch on {:} is trained with {:} epochs instead of {:}'.format(arch_index, dataset, result.epochs, total))
+          arrays['seed'][arch_index, ida, itrial] = seed
+          for iset, setname in enumerate(SETNAMES):
+            curves = result_curves(result, setname)
+            if curves is None: continue
+            for key, curve in zip(METRICS, curves):
+              arrays[key][arch_index, ida, iset, itrial] = curve[epochs]
+        latencies = [x.get_latency() for x in results]
+        latencies = [x for x in latencies if x > 0]
+        arrays['flops'] [arch_index, ida] = np.mean([x.flop for x in results])
+        arrays['params'][arch_index, ida] = np.mean([x.params for x in results])
+        if len(latencies) > 0: arrays['latency'][arch_index, ida] = np.mean(latencies)
+    meta = {'datasets': DATASETS, 'setnames': SETNAMES, 'total_epoch': total, 'use_12epochs_result': use_12epochs_result}
+    return MetricTables(meta, arrays)
@@ -0,0 +1,165 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# Read-only and copy-on-write wrappers of ArchResults and ResultsCount, which avoid the deep copy in the query functions.
+# Aliasing guarantees:
+# -- ArchResultsView / ResultsCountView share the data with the API without copying anything.
+#    Any method that modifies the data raises a TypeError, and dict/list attributes are returned as read-only
+#    MappingProxyType/tuple objects, and NumPy arrays are returned as read-only views. Tensors (e.g., the weights returned by `get_net_param`) are still shared
+#    with the API, please do not modify them in-place.
+# -- CopyOnWriteArchResults behaves the same as ArchResultsView until a modification happens,
+#    then it deep-copies the ArchResults once and all following reads and writes go to its private copy.
+#    The ResultsCount objects returned by its `query` and `all_results` are CopyOnWriteResultsCount, whose modification
+#    deep-copies the ArchResults in the same way and then modifies the corresponding ResultsCount in the private copy.
+############################################################################################
+import copy, numpy as np
+from types import MappingProxyType
+
+
+def _freeze(value):
+  if isinstance(value, np.ndarray):
+    value = value.view()
+    value.flags.writeable = False
+    return value
+  elif isinstance(value, dict):
+    # the per-epoch results of ResultsCount are dicts of arrays, which are frozen as well
+    if any(isinstance(x, np.ndarray) for x in value.values()): return MappingProxyType( {key: _freeze(x) for key, x in value.items()} )
+    else: return MappingProxyType(value)
+  elif isinstance(value, list): return tuple(value)
+  else: return value
+
+
+class ReadOnlyView(object):
+
+  __slots__ = ('_target',)
+  MUTATORS  = ('load_state_dict',)
+
+  def __init__(self, target):
+    object.__setattr__(self, '_target', target)
+
+  def __getattr__(self, name):
+    if name in self.MUTATORS: raise TypeError('{:} is read-only, can not call {:}'.format(self.__class__.__name__, name))
+    return _freeze( getattr(self._target, name) )
+
+  def __setattr__(self, name, value):
+    raise TypeError('{:} is read-only, can not set {:}'.format(self.__class__.__name__, name))
+
+  def __delattr__(self, name):
+    raise TypeError('{:} is read-only, can not delete {:}'.format(self.__class__.__name__, name))
+
+  def __repr__(self):
+    return repr(self._target)
+
+  def __reduce__(self):
+    return (self.__class__, (self._target,))
+
+  def __deepcopy__(self, memo):
+    return copy.deepcopy(self._target, memo)
+
+  def state_dict(self):
+    return copy.deepcopy( self._target.state_dict() )
+
+  # return a private and modifiable deep copy of the wrapped object
+  def copy(self):
+    return copy.deepcopy( self._target )
+
+
+class ResultsCountView(ReadOnlyView):
+
+  __slots__ = ()
+  MUTATORS  = ('update_train_info', 'reset_eval', 'update_latency', 'update_eval', 'update_OLD_eval', 'load_state_dict')
+
+
+class ArchResultsView(ReadOnlyView):
+
+  __slots__ = ()
+  MUTATORS  = ('update', 'load_state_dict', 'clear_params')
+
+  def __getattr__(self, name):
+    if name == 'all_results':
+      return MappingProxyType( {key: ResultsCountView(value) for key, value in self._target.all_results.items()} )
+    elif name == 'dataset_seed':
+      return MappingProxyType( {key: tuple(value) for key, value in self._target.dataset_seed.items()} )
+    return super(ArchResultsView, self).__getattr__(name)
+
+  def query(self, dataset, seed=None):
+    results = self._target.query(dataset, seed)
+    if seed is None: return MappingProxyType( {key: ResultsCountView(value) for key, value in results.items()} )
+    else           : return ResultsCountView(results)
+
+
+class CopyOnWriteArchResults(object):
+
+  __slots__ = ('_target', '_owned')
+
+  def __init__(self, target):
+    object.__setattr__(self, '_target', target)
+    object.__setattr__(self, '_owned', False)
+
+  # deep-copy the shared ArchResults (only once) and return the private copy
+  def materialize(self):
+    if not self._owned:
+      object.__setattr__(self, '_target', copy.deepcopy(self._target))
+      object.__setattr__(self, '_owned', True)
+    return self._target
+
+  def is_copied(self):
+    return self._owned
+
+  def __getattr__(self, name):
+    if self._owned: return getattr(self._target, name)
+    elif name in ArchResultsView.MUTATORS: return getattr(self.materialize(), name)
+    elif name == 'all_results':
+      return MappingProxyType( {key: CopyOnWriteResultsCount(self, key) for key in self._target.all_results.keys()} )
+    else: return getattr(ArchResultsView(self._target), name)
+
+  def query(self, dataset, seed=None):
+    if self._owned: return self._target.query(dataset, seed)
+    results = self._target.query(dataset, seed)
+    if seed is None: return MappingProxyType( {xseed: CopyOnWriteResultsCount(self, (dataset, xseed)) for xseed in results.keys()} )
+    else           : return CopyOnWriteResultsCount(self, (dataset, seed))
+
+  def __setattr__(self, name, value):
+    setattr(self.materialize(), name, value)
+
+  def __delattr__(self, name):
+    delattr(self.materialize(), name)
+
+  def __repr__(self):
+    return repr(self._target)
+
+  def __reduce__(self):
+    return (self.__class__, (self._target,))
+
+  def __deepcopy__(self, memo):
+    return copy.deepcopy(self._target, memo)
+
+
+# The ResultsCount of `key` in a CopyOnWriteArchResults, which always refers to the current (shared or private) ArchResults of its parent.
+class CopyOnWriteResultsCount(object):
+
+  __slots__ = ('_parent', '_key')
+
+  def __init__(self, parent, key):
+    object.__setattr__(self, '_parent', parent)
+    object.__setattr__(self, '_key', key)
+
+  def _current(self):
+    return self._parent._target.all_results[self._key]
+
+  def __getattr__(self, name):
+    if self._parent.is_copied(): return getattr(self._current(), name)
+    elif name in ResultsCountView.MUTATORS: return getattr(self._parent.materialize().all_results[self._key], name)
+    else: return getattr(ResultsCountView(self._current()), name)
+
+  def __setattr__(self, name, value):
+    setattr(self._parent.materialize().all_results[self._key], name, value)
+
+  def __delattr__(self, name):
+    delattr(self._parent.materialize().all_results[self._key], name)
+
+  def __repr__(self):
+    return repr(self._current())
+
+  def __deepcopy__(self, memo):
+    return copy.deepcopy(self._current(), memo)
@@ -0,0 +1,173 @@
+##################################################
+# Copyright (c) Xuanyi Dong [GitHub D-X-Y], 2020 #
+############################################################################################
+# The on-demand store of the trained weights in NAS-Bench-201, which is separated from the metric records.
+# For each (kind, dataset), where kind is 'less' (12 epochs) or 'full' (200 epochs), there are two files:
+#   {kind}-{dataset}.bin       : the concatenation of the networks, each network is a safetensors-style blob:
+#                                8 bytes (little-endian uint64) of the header size N, N bytes of the JSON header,
+#                                and the raw bytes of all tensors. The header maps each parameter name to its
+#                                dtype, shape and [begin, end) byte offsets relative to the end of the header.
+#   {kind}-{dataset}.index.npy : an int64 array of [number-of-networks, 4], each row is (arch-index, seed, offset, length),
+#                                sorted by (arch-index, seed).
+# Identical networks are saved only once (content-addressed by their SHA-1), and several rows may point to the same blob.
+# Reading a network only memory-maps the .bin file and copies the bytes of that network.
+############################################################################################
+import os, json, mmap, struct, hashlib, threading, torch, numpy as np
+from collections import OrderedDict
+
+
+WEIGHT_KINDS = ('less', 'full')
+DTYPES = {'float32': np.float32, 'float64': np.float64, 'float16': np.float16,
+          'int64'  : np.int64  , 'int32'  : np.int32  , 'int16'  : np.int16,
+          'int8'   : np.int8   , 'uint8'  : np.uint8  , 'bool'   : np.bool_}
+
+
+def weight_file_names(kind, dataset):
+  return '{:}-{:}.bin'.format(kind, dataset), '{:}-{:}.index.npy'.format(kind, dataset)
+
+
+def serialize_params(params):
+  header, buffers, offset = OrderedDict(), [], 0
+  for name, tensor in params.items():
+    array = tensor.detach().cpu().contiguous().numpy()
+    dtype = array.dtype.name
+    assert dtype in DTYPES, 'unsupported dtype {:} for {:}'.format(dtype, name)
+    data  = array.tobytes()
+    header[name] = {'dtype': dtype, 'shape': list(array.shape), 'data_offsets': [offset, offset + len(data)]}
+    buffers.append( data )
+    offset += len(data)
+  header = json.dumps(header).encode('utf-8')
+  return struct.pack('<Q', len(header)) + header + b''.join(buffers)
+
+
+def deserialize_params(buffer, offset=0):
+  header_size, = struct.unpack('<Q', buffer[offset:offset+8])
+  header = json.loads( bytes(buffer[offset+8:offset+8+header_size]).decode('utf-8'), object_pairs_hook=OrderedDict )
+  start, params = offset + 8 + header_size, OrderedDict()
+  for name, info in header.items():
+    begin, end = info['data_offsets']
+    array = np.frombuffer(buffer, dtype=DTYPES[info['dtype']], count=(end-begin) // np.dtype(DTYPES[info['dtype']]).itemsize, offset=start+begin)
+    # copy out of the read-only memory map, so that the returned tensors own their data
+    params[name] = torch.from_numpy( array.reshape(info['shape']).copy() )
+  return params
+
+
+class WeightFile(object):
+
+  def __init__(self, bin_path, index_path):
+    self.bin_path = bin_path
+    self.index    = np.load(index_path, mmap_mode='r')
+    assert self.index.ndim == 2 and self.index.shape[1] == 4, 'invalid index shape : {:}'.format(self.index.shape)
+    self._weights = None
+    self._lock    = threading.Lock()
+
+  def _open(self):
+    if self._weights is None:
+      with self._lock:
+        if self._weights is None:
+          with open(self.bin_path, 'rb') as cfile:
+            self._weights = mmap.mmap(cfile.fileno(), 0, access=mmap.ACCESS_READ)
+    return self._weights
+
+  def _rows(self, arch_index):
+    left  = np.searchsorted(self.index[:, 0], arch_index, side='left')
+    right = np.searchsorted(self.index[:, 0], arch_index, side='right')
+    return self.index[left:right]
+
+  def seeds(self, arch_index):
+    return [int(x) for x in self._rows(arch_index)[:, 1]]
+
+  def read(self, arch_index, seed):
+    for xarch, xseed, offset, length in self._rows(arch_index):
+      if xseed == seed: return deserialize_params(self._open(), int(offset))
+    raise KeyError('can not find the weights of the {:}-th arch with seed={:} in {:}'.format(arch_index, seed, self.bin_path))
+
+  def close(self):
+    if self._weights is not None:
+      self._weights.close()
+      self._weights = None
+
+
+class WeightStore(object):
+
+  def __init__(self, root):
+    assert os.path.isdir(root), 'invalid weight directory : {:}'.format(root)
+    self.root   = root
+    self._files = dict()
+    self._lock  = threading.Lock()
+
+  def __repr__(self):
+    return ('{name}(root={root}, {num} opened files)'.format(name=self.__class__.__name__, root=self.root, num=len(self._files)))
+
+  def has(self, kind, dataset):
+    return os.path.isfile( os.path.join(self.root, weight_file_names(kind, dataset)[1]) )
+
+  def get_file(self, kind, dataset):
+    assert kind in WEIGHT_KINDS, 'invalid kind : {:}'.format(kind)
+    with self._lock:
+      if (kind, dataset) not in self._files:
+        bin_name, index_name = weight_file_names(kind, dataset)
+        if not self.has(kind, dataset): raise KeyError('there is no weight file for {:} on {:} in {:}'.format(kind, dataset, self.root))
+        self._files[(kind, dataset)] = WeightFile(os.path.join(self.root, bin_name), os.path.join(self.root, index_name))
+      return self._files[(kind, dataset)]
+
+  def seeds(self, kind, dataset, arch_index):
+    return self.get_file(kind, dataset).seeds(arch_index)
+
+  # return the weights of a trial, or a dict of {seed: weights} of all trials if seed is None.
+  def read(self, kind, dataset, arch_index, seed=None):
+    xfile = self.get_file(kind, dataset)
+    if seed is None: return {xseed: xfile.read(arch_index, xseed) for xseed in xfile.seeds(arch_index)}
+    else           : return xfile.read(arch_index, seed)
+
+  def close(self):
+    for xfile in self._files.values(): xfile.close()
+    self._files = dict()
+
+
+# Write the weights of `arch2infos` into a weight store at `save_dir`.
+# `arch2infos` is a dict or an iterable of (arch-index, {'less': state-dict, 'full': state-dict}) pairs,
+# so that the per-architecture archives (e.g., 000157-FULL.pth) can be converted one by one.
+# The state-dicts in `arch2infos` are not modified, use `strip_weights` to obtain the state-dicts without the weights.
+def write_weight_store(save_dir, arch2infos, verbose=True):
+  os.makedirs(save_dir, exist_ok=True)
+  if isinstance(arch2infos, dict): arch2infos = ((key, arch2infos[key]) for key in sorted(list(arch2infos.keys())))
+  cfiles, rows, offsets, digests = dict(), dict(), dict(), dict()
+  try:
+    for i, (arch_index, infos) in enumerate(arch2infos):
+      for kind in WEIGHT_KINDS:
+        if kind not in infos: continue
+        for (dataset, seed), result in infos[kind]['all_results'].items():
+          params = result.get('net_state_dict', None)
+          if params is None: continue
+          key = (kind, dataset)
+          if key not in cfiles:
+            cfiles[key] = open(os.path.join(save_dir, weight_file_names(kind, dataset)[0]), 'wb')
+            rows[key], offsets[key], digests[key] = [], 0, dict()
+          blob   = serialize_params(params)
+          digest = hashlib.sha1(blob).hexdigest()
+          if digest not in digests[key]:
+            cfiles[key].write( blob )
+            digests[key][digest] = (offsets[key], len(blob))
+            offsets[key] += len(blob)
+          rows[key].append( (arch_index, seed) + digests[key][digest] )
+      if verbose and i % 1000 == 0:
+        print('write the weights of {:} architectures, {:.1f} MB written.'.format(i+1, sum(offsets.values()) / 1e6))
+  finally:
+    for cfile in cfiles.values(): cfile.close()
+  for (kind, dataset), xrows in rows.items():
+    index = np.array(sorted(xrows), dtype=np.int64).reshape(-1, 4)
+    np.save(os.path.join(save_dir, weight_file_names(kind, dataset)[1]), index)
+  if verbose: print('save the weights of {:} (kind, dataset) pairs into {:}'.format(len(rows), save_dir))
+  return save_dir
+
+
+# return a copy of `infos` ({'less': state-dict, 'full': state-dict}) whose trials do not have the weights,
+# where the state-dicts of the trials are copied shallowly and `infos` is not modified.
+def strip_weights(infos):
+  xinfos = dict()
+  for kind, state_dict in infos.items():
+    xstate = dict(state_dict)
+    xstate['all_results'] = {key: dict(result, net_state_dict=None) for key, result in state_dict['all_results'].items()}
+    xinfos[kind] = xstate
+  return xinfos
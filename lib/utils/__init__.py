@@ -3,3 +3,4 @@ from .gpu_manager      import GPUManager
 from .flop_benchmark   import get_model_infos
 from .affine_utils     import normalize_points, denormalize_points
 from .affine_utils     import identity2affine, solve2theta, affine2image
+from .memory_utils     import reset_peak_memory, peak_memory_mb, peak_memory_str
@@ -0,0 +1,20 @@
+import sys, torch
+
+
+# reset the peak memory of the GPU (the peak memory of the process on CPU can not be reset)
+def reset_peak_memory():
+  if torch.cuda.is_available(): torch.cuda.reset_max_memory_allocated()
+
+
+# the peak memory (in MB) allocated by PyTorch on GPU, or the peak resident memory of this process on CPU
+def peak_memory_mb():
+  if torch.cuda.is_available(): return torch.cuda.max_memory_allocated() / 1e6
+  import resource
+  usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return usage / 1e6 if sys.platform == 'darwin' else usage / 1e3 # bytes on macOS and KB on Linux
+
+
+# the labeled peak memory for the logs, the value on CPU is the peak over the lifetime of this process, not since `reset_peak_memory`
+def peak_memory_str():
+  if torch.cuda.is_available(): return 'Peak-Memory {:.1f} MB'.format(peak_memory_mb())
+  else                        : return 'Process-Peak-RSS {:.1f} MB'.format(peak_memory_mb())